@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Asynchronous (ASGI) serving mode for the Mood Blaster web app.
+
+The Flask routes are reused unchanged, but each request runs on one of two
+thread pools owned by the event loop:
+
+- an inference pool for /api/analyze_frame (frame decoding + detect_emotion)
+- a small control pool for every other route (game state, start/reset, page)
+
+Slow inferences therefore never hold up cheap endpoints like
+/api/game_state, and the number of frames accepted at once is capped so
+tail latency stays predictable under load.
+
+It also serves a WebSocket stream on /ws/stream that carries binary frames
+up and emotion results plus game-state changes down (see GameStream).
+
+Usage:
+    python asgi_app.py [--host 0.0.0.0] [--port 5000] [--inference-workers N] [--max-inflight M]
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qs
+
+import web_app
+from frame_decoder import MAX_FRAME_BYTES
+from session_registry import SessionLimitReached
+
+# Threads running frame decoding + inference (defaults to the detector pool size)
+INFERENCE_WORKERS = int(os.environ.get('MOODBLASTER_INFERENCE_WORKERS', web_app.DETECTOR_POOL_SIZE))
+# Frames accepted at once (running + queued) before new ones are refused with 503
+MAX_INFLIGHT = int(os.environ.get('MOODBLASTER_MAX_INFLIGHT', INFERENCE_WORKERS * 2))
+# Threads serving every other (cheap) route
+CONTROL_WORKERS = int(os.environ.get('MOODBLASTER_CONTROL_WORKERS', 4))
+
+# Routes whose work is offloaded to the inference pool
+INFERENCE_PATHS = ('/api/analyze_frame',)
+
+# WebSocket carrying frames up and results / game state down
+STREAM_PATH = '/ws/stream'
+
+
+class MoodBlasterASGI:
+    """ASGI application running the Flask app on dedicated inference and control thread pools."""
+
+    def __init__(self, flask_app, inference_workers=INFERENCE_WORKERS, max_inflight=MAX_INFLIGHT,
+                 control_workers=CONTROL_WORKERS):
+        """Initialize the ASGI wrapper.
+
+        Args:
+            flask_app: The Flask application whose routes are served.
+            inference_workers: Threads decoding frames and running detection.
+            max_inflight: Maximum analyze requests running or queued at once.
+            control_workers: Threads serving all other routes.
+        """
+        self.flask_app = flask_app
+        self.inflight = 0
+        self.rejected = 0
+        self.configure(inference_workers, max_inflight, control_workers)
+
+    def configure(self, inference_workers=INFERENCE_WORKERS, max_inflight=MAX_INFLIGHT,
+                  control_workers=CONTROL_WORKERS):
+        """Size the thread pools and the inflight limit (before the server starts; see __init__)."""
+        self.max_inflight = max(1, max_inflight)
+        # Pool threads start with the first task, so replacing unused pools is free
+        self.inference_executor = ThreadPoolExecutor(max_workers=max(1, inference_workers),
+                                                     thread_name_prefix='inference')
+        self.control_executor = ThreadPoolExecutor(max_workers=max(1, control_workers),
+                                                   thread_name_prefix='control')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        elif scope['type'] == 'websocket':
+            await self.websocket(scope, receive, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        """Handle server startup and shutdown."""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.inference_executor.shutdown(wait=False, cancel_futures=True)
+                self.control_executor.shutdown(wait=False, cancel_futures=True)
+                web_app.detector_pool.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        """Route an HTTP request to the inference or control pool."""
+        offload = scope['path'] in INFERENCE_PATHS
+
+        if offload and self.inflight >= self.max_inflight:
+            # Refuse before reading the body so overload costs as little as possible
+            self.rejected += 1
+            await self.send_response(send, 503, [('Content-Type', 'application/json'), ('Retry-After', '1')],
+                                     b'{"error": "Server busy", "success": false}')
+            return
+
+        if offload:
+            self.inflight += 1
+        try:
+            body = await self.read_body(receive, MAX_FRAME_BYTES if offload else None)
+            if body is None:
+                await self.send_response(send, 413, [('Content-Type', 'application/json')],
+                                         b'{"error": "Frame too large", "success": false}')
+                return
+
+            executor = self.inference_executor if offload else self.control_executor
+            loop = asyncio.get_running_loop()
+            status, headers, payload = await loop.run_in_executor(
+                executor, self.run_wsgi, self.build_environ(scope, body)
+            )
+            await self.send_response(send, status, headers, payload)
+        finally:
+            if offload:
+                self.inflight -= 1
+
+    async def websocket(self, scope, receive, send):
+        """Accept a game stream connection on STREAM_PATH."""
+        message = await receive()
+        if message['type'] != 'websocket.connect':
+            return
+        if scope['path'] != STREAM_PATH:
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+
+        try:
+            stream = GameStream(self, scope, send)
+        except SessionLimitReached:
+            # 1013 = try again later
+            await send({'type': 'websocket.close', 'code': 1013})
+            return
+
+        await send({'type': 'websocket.accept'})
+        await stream.run(receive)
+
+    async def read_body(self, receive, limit=None):
+        """Read the full request body, or return None if it exceeds `limit` bytes."""
+        chunks = []
+        size = 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if limit is not None and size > limit:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body', False):
+                break
+        return b''.join(chunks)
+
+    def build_environ(self, scope, body):
+        """Build a WSGI environ for an ASGI HTTP scope."""
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', ''),
+            'PATH_INFO': scope['path'],
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f"HTTP_{name}"
+                if key in environ:
+                    separator = '; ' if key == 'HTTP_COOKIE' else ','
+                    value = f"{environ[key]}{separator}{value}"
+                environ[key] = value
+        return environ
+
+    def run_wsgi(self, environ):
+        """Run the Flask app for one request on the calling (pool) thread."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        result = self.flask_app.wsgi_app(environ, start_response)
+        try:
+            payload = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], payload
+
+    async def send_response(self, send, status, headers, payload):
+        """Send a complete HTTP response."""
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers],
+        })
+        await send({'type': 'http.response.body', 'body': payload})
+
+
+class GameStream:
+    """One player's WebSocket stream.
+
+    Protocol:
+        client -> server: binary messages are encoded frames (JPEG/WebP);
+            text messages are JSON commands {"type": "start_game" | "reset_game"},
+            or {"type": "capture_size", "width": W, "height": H} from clients
+            that scale frames down before sending them (see X-Capture-Size).
+        server -> client: JSON text messages
+            {"type": "session", "token": ...} once after connecting,
+            {"type": "state", "state": {...}} with changed game state fields,
+            {"type": "result", ...compact analyze_frame payload..., "match": ..., "state": {...}}.
+
+    Results include the same pacing advice as the HTTP API; clients should
+    wait for a result and then interval_ms before sending the next frame.
+
+    Matches are scored on the server, so there is no separate submit call.
+    Only the newest frame is analyzed: frames arriving while one is being
+    processed replace each other.
+    """
+
+    def __init__(self, server, scope, send):
+        """Resolve (or create) the game session for this connection."""
+        self.server = server
+        self.send = send
+        token = self.session_token(scope)
+        self.token, self.game, created = web_app.sessions.get_or_create(token)
+        self.last_state = {}
+        self.latest_frame = None
+        self.frame_ready = asyncio.Event()
+        self.capture_size = None
+        self.worker = None
+
+    @staticmethod
+    def session_token(scope):
+        """Read the session token from the cookie or a ?token= query parameter."""
+        for name, value in scope.get('headers', []):
+            if name == b'cookie':
+                cookie = SimpleCookie()
+                cookie.load(value.decode('latin-1'))
+                if web_app.SESSION_COOKIE in cookie:
+                    return cookie[web_app.SESSION_COOKIE].value
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        return query.get('token', [None])[0]
+
+    async def send_json(self, message):
+        await self.send({'type': 'websocket.send', 'text': json.dumps(message)})
+
+    def changed_state(self):
+        """Return game state fields changed since the last push and remember the new state."""
+        web_app.sessions.get(self.token)  # keep the session from idling out while streaming
+        with self.game.lock:
+            current = self.game.get_game_state()
+        delta = web_app.state_delta(self.last_state, current)
+        self.last_state = current
+        return delta
+
+    async def run(self, receive):
+        """Serve the connection until the client disconnects."""
+        await self.send_json({'type': 'session', 'token': self.token})
+        await self.send_json({'type': 'state', 'state': self.changed_state()})
+        self.worker = asyncio.create_task(self.process_frames())
+        self.worker.add_done_callback(self.worker_done)
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message.get('bytes') is not None:
+                    # Supersedes any frame that has not been picked up yet
+                    self.latest_frame = message['bytes']
+                    self.frame_ready.set()
+                elif message.get('text'):
+                    await self.handle_command(message['text'])
+        finally:
+            self.worker.cancel()
+
+    @staticmethod
+    def worker_done(task):
+        """Log why the frame worker stopped, unless the connection closing cancelled it."""
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error in frame stream worker: {task.exception()!r}")
+
+    async def handle_command(self, text):
+        """Apply a game command sent by the client and push the resulting state."""
+        try:
+            command = json.loads(text)
+        except ValueError:
+            return
+        kind = command.get('type') if isinstance(command, dict) else None
+        if kind == 'capture_size':
+            self.capture_size = f"{command.get('width')}x{command.get('height')}"
+            return
+        with self.game.lock:
+            if kind == 'start_game':
+                self.game.start_game()
+            elif kind == 'reset_game':
+                self.game.reset()
+        delta = self.changed_state()
+        if delta:
+            await self.send_json({'type': 'state', 'state': delta})
+
+    async def process_frames(self):
+        """Analyze the newest frame whenever one is available."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.frame_ready.wait()
+            self.frame_ready.clear()
+            data, self.latest_frame = self.latest_frame, None
+            if not data:
+                continue
+
+            if self.server.inflight >= self.server.max_inflight:
+                self.server.rejected += 1
+                busy = {'type': 'result', 'error': 'Server busy', 'success': False}
+                busy.update(web_app.pacing.advice())
+                await self.send_json(busy)
+                continue
+
+            self.server.inflight += 1
+            try:
+                result = await loop.run_in_executor(self.server.inference_executor, self.analyze, data)
+            finally:
+                self.server.inflight -= 1
+
+            result['state'] = self.changed_state()
+            await self.send_json(result)
+
+    def analyze(self, data):
+        """Decode and analyze one frame and score it against the target (runs on the inference pool)."""
+        if len(data) > MAX_FRAME_BYTES:
+            return {'type': 'result', 'error': 'Frame too large', 'success': False}
+        try:
+            frame, source_shape = web_app.frame_decoder.decode_frame(data, web_app.FRAME_COLOR)
+            if frame is None:
+                return {'type': 'result', 'error': 'Could not decode image', 'success': False}
+            source_shape = web_app.capture_shape(self.capture_size, source_shape)
+            payload, status, headers = web_app.analyze_decoded_frame(
+                frame, self.token, 'compact', source_shape=source_shape
+            )
+        except Exception as e:
+            print(f"Error analyzing frame: {e}")
+            return {'type': 'result', 'error': 'Frame analysis failed', 'success': False}
+
+        payload['type'] = 'result'
+        if payload.get('success'):
+            payload['match'] = web_app.apply_detection(self.game, payload.get('emotion'), payload.get('confidence'),
+                                                       payload.get('margin'))
+        return payload
+
+
+app = MoodBlasterASGI(web_app.app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Mood Blaster on an ASGI server (uvicorn).")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--inference-workers', type=int, default=INFERENCE_WORKERS,
+                        help='Threads running frame decoding and emotion detection')
+    parser.add_argument('--max-inflight', type=int, default=MAX_INFLIGHT,
+                        help='Frames accepted at once before new ones get 503')
+    parser.add_argument('--control-workers', type=int, default=CONTROL_WORKERS,
+                        help='Threads serving the other routes')
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: the ASGI server mode needs uvicorn (pip install uvicorn)")
+        return 1
+
+    app.configure(args.inference_workers, args.max_inflight, args.control_workers)
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
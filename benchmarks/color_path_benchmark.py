@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Measure the color conversions and allocations between an encoded frame and MediaPipe.
+
+Compares, per frame, the previous paths with the current ones:
+
+- web binary upload: imdecode to BGR and convert to RGB in the detector,
+  versus decoding straight to RGB (IMREAD_COLOR_RGB)
+- web legacy base64: PIL RGB -> BGR -> RGB, versus handing PIL's RGB through
+- desktop capture: new arrays for the mirrored frame and its RGB copy,
+  versus reusable capture, mirror and RGB buffers
+
+For each path it reports the time per frame and the peak memory allocated
+per frame according to tracemalloc, also expressed in full-frame sizes.
+
+Usage:
+    python benchmarks/color_path_benchmark.py [--image face.jpg] [--sizes 640x480,1280x720]
+"""
+
+import argparse
+import base64
+import tracemalloc
+import cv2
+import numpy as np
+from PIL import Image
+from io import BytesIO
+
+from common import summarize, time_calls, synthetic_frame, load_image, print_table
+from emotion_detector import EmotionDetector
+from frame_decoder import FrameDecoder, decode_data_url
+
+
+def peak_allocation(func, iterations=20):
+    """Return the median peak bytes allocated (and not yet freed) during one call."""
+    func()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = func()
+            _, peak = tracemalloc.get_traced_memory()
+            del result
+            peaks.append(peak - before)
+    finally:
+        tracemalloc.stop()
+    return float(np.median(peaks))
+
+
+def build_paths(frame, quality):
+    """Return {(path, variant): callable} for one frame."""
+    jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg).decode('ascii')
+    decoder = FrameDecoder()
+    detector = EmotionDetector(use_camera=False)
+    detector.face_mesh = None  # only the conversion helpers are used
+
+    def binary_before():
+        bgr = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+    def binary_after():
+        return detector.rgb_frame(decoder.decode(jpeg, 'rgb'), 'rgb')
+
+    def legacy_before():
+        image = Image.open(BytesIO(base64.b64decode(data_url.split(',')[1])))
+        bgr = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+    def legacy_after():
+        return detector.rgb_frame(decode_data_url(data_url, 'rgb'), 'rgb')
+
+    # The desktop loop's camera read is simulated by copying the source frame
+    buffers = {'raw': np.empty_like(frame), 'mirrored': None}
+
+    def desktop_before():
+        raw = frame.copy()
+        mirrored = cv2.flip(raw, 1)
+        return cv2.cvtColor(mirrored, cv2.COLOR_BGR2RGB)
+
+    def desktop_after():
+        np.copyto(buffers['raw'], frame)
+        buffers['mirrored'] = cv2.flip(buffers['raw'], 1, dst=buffers['mirrored'])
+        return detector.rgb_frame(buffers['mirrored'], 'bgr')
+
+    return {
+        ('binary', 'before'): binary_before,
+        ('binary', 'after'): binary_after,
+        ('base64', 'before'): legacy_before,
+        ('base64', 'after'): legacy_after,
+        ('desktop', 'before'): desktop_before,
+        ('desktop', 'after'): desktop_after,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Image to decode (defaults to a synthetic frame)')
+    parser.add_argument('--sizes', default='640x480,1280x720', help='Comma separated WxH list')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.lower().split('x'))
+        frame = load_image(args.image, width, height) if args.image else synthetic_frame(width, height)
+        for (path, variant), func in build_paths(frame, args.quality).items():
+            stats = summarize(time_calls(func, args.iterations))
+            allocated = peak_allocation(func)
+            rows.append({
+                'size': f"{width}x{height}", 'path': path, 'variant': variant,
+                'alloc_kb': round(allocated / 1024, 1),
+                'frames': round(allocated / frame.nbytes, 2),
+                'mean_ms': stats['mean_ms'], 'p95_ms': stats['p95_ms'],
+            })
+
+    print("Encoded frame to MediaPipe-ready RGB, per frame (frames = peak allocation in full-frame sizes):")
+    print_table(rows, ['size', 'path', 'variant', 'alloc_kb', 'frames', 'mean_ms', 'p95_ms'])
+
+
+if __name__ == '__main__':
+    main()
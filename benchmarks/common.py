@@ -0,0 +1,121 @@
+"""
+Shared helpers for the Mood Blaster benchmark scripts.
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+# Make the project modules importable when a benchmark is run as a script
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of a list of samples."""
+    if not samples:
+        return 0.0
+    return float(np.percentile(samples, pct))
+
+
+def summarize(samples_ms):
+    """Summarize latency samples (milliseconds) into mean and tail percentiles."""
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(float(np.mean(samples_ms)), 3) if samples_ms else 0.0,
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p95_ms': round(percentile(samples_ms, 95), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+    }
+
+
+def time_calls(func, iterations, warmup=5):
+    """Call func repeatedly and return per-call latencies in milliseconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def synthetic_frame(width=640, height=480):
+    """Create a deterministic camera-like BGR frame (smooth gradients plus shapes)."""
+    import cv2
+
+    ys, xs = np.mgrid[0:height, 0:width]
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[..., 0] = (xs * 255 // max(width - 1, 1)).astype(np.uint8)
+    frame[..., 1] = (ys * 255 // max(height - 1, 1)).astype(np.uint8)
+    frame[..., 2] = 128
+    cv2.circle(frame, (width // 2, height // 2), min(width, height) // 4, (200, 180, 160), -1)
+    cv2.ellipse(frame, (width // 2, height // 2 + height // 10), (width // 12, height // 30), 0, 0, 180, (40, 40, 120), 3)
+    noise = np.random.default_rng(0).integers(0, 12, size=frame.shape, dtype=np.uint8)
+    return cv2.add(frame, noise)
+
+
+def load_image(path, width=None, height=None):
+    """Load an image from disk (BGR), optionally resized."""
+    import cv2
+
+    frame = cv2.imread(path, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise SystemExit(f"Could not read image: {path}")
+    if width and height:
+        frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table."""
+    widths = [max(len(str(col)), *(len(str(row.get(col, ''))) for row in rows)) for col in columns]
+    print('  '.join(str(col).ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def load_corpus(path, limit=None, width=None, height=None):
+    """Load recorded frames (BGR) from a directory of images or a video file.
+
+    Images are read in file name order. Frames are optionally resized.
+    """
+    import cv2
+
+    frames = []
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path) if name.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names[:limit]:
+            frames.append(load_image(os.path.join(path, name), width, height))
+    else:
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise SystemExit(f"Could not open video: {path}")
+        while limit is None or len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if width and height:
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            frames.append(frame)
+        capture.release()
+    if not frames:
+        raise SystemExit(f"No frames found in {path}")
+    return frames
+
+
+def peak_rss_mb():
+    """Return the peak resident set size of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
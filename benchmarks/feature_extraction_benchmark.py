@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for EmotionDetector feature extraction.
+
+Compares the original per-landmark implementation (kept here as a reference)
+with the vectorized NumPy version, per face and batched across faces, and
+checks that both produce the same features.
+
+Usage:
+    python benchmarks/feature_extraction_benchmark.py [--image face.jpg] [--faces 1,5]
+"""
+
+import argparse
+import math
+import numpy as np
+
+from common import summarize, time_calls, load_image, print_table
+from emotion_detector import EmotionDetector, landmarks_to_array
+
+LEFT_EYEBROW = [70, 63, 105, 66, 107]
+RIGHT_EYEBROW = [296, 334, 293, 300, 276]
+LEFT_EYE_UPPER = [33, 7, 163, 144, 145, 153]
+RIGHT_EYE_UPPER = [362, 382, 381, 380, 374, 373]
+
+
+def _distance(p1, p2):
+    return math.sqrt((p1[0] - p2[0]) ** 2 + (p1[1] - p2[1]) ** 2)
+
+
+def reference_features(landmarks, image_shape):
+    """The original scalar feature extraction, walking landmark objects one by one."""
+    h, w = image_shape[:2]
+
+    left_corner = (int(landmarks[61].x * w), int(landmarks[61].y * h))
+    right_corner = (int(landmarks[291].x * w), int(landmarks[291].y * h))
+    top_lip = (int(landmarks[13].x * w), int(landmarks[13].y * h))
+    bottom_lip = (int(landmarks[14].x * w), int(landmarks[14].y * h))
+    mouth_width = _distance(left_corner, right_corner)
+    mouth_height = _distance(top_lip, bottom_lip)
+    mouth_center_y = (top_lip[1] + bottom_lip[1]) / 2
+    corner_avg_y = (left_corner[1] + right_corner[1]) / 2
+    curvature = (mouth_center_y - corner_avg_y) / mouth_width if mouth_width > 0 else 0
+
+    left_eyebrow_y = np.mean([landmarks[i].y for i in LEFT_EYEBROW]) * h
+    right_eyebrow_y = np.mean([landmarks[i].y for i in RIGHT_EYEBROW]) * h
+    left_eye_y = np.mean([landmarks[i].y for i in LEFT_EYE_UPPER]) * h
+    right_eye_y = np.mean([landmarks[i].y for i in RIGHT_EYE_UPPER]) * h
+    eyebrow_distance = ((left_eye_y - left_eyebrow_y) + (right_eye_y - right_eyebrow_y)) / 2
+
+    def ear(indices):
+        pts = [(int(landmarks[i].x * w), int(landmarks[i].y * h)) for i in indices]
+        horizontal = _distance(pts[0], pts[3])
+        return (_distance(pts[1], pts[5]) + _distance(pts[2], pts[4])) / (2.0 * horizontal) if horizontal > 0 else 0
+
+    eye_ratio = (ear([33, 160, 158, 133, 153, 144]) + ear([362, 385, 387, 263, 373, 380])) / 2
+
+    # Added with the rule classifier; not part of the original code
+    mouth_openness = mouth_height / mouth_width if mouth_width > 0 else 0
+    return curvature, mouth_width, mouth_height, eyebrow_distance, eye_ratio, mouth_openness
+
+
+def detected_landmarks(image_path):
+    """Run FaceMesh once on an image and return its first NormalizedLandmarkList and the frame shape."""
+    import cv2
+
+    frame = load_image(image_path)
+    detector = EmotionDetector(use_camera=False)
+    results = detector.face_mesh.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    detector.cleanup()
+    if not results.multi_face_landmarks:
+        raise SystemExit(f"No face found in {image_path}")
+    return results.multi_face_landmarks[0], frame.shape
+
+
+def synthetic_landmarks():
+    """A face-sized NormalizedLandmarkList (478 points) for runs without an image.
+
+    Built as the protobuf FaceMesh returns, so the conversion takes the same
+    path as in production.
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    rng = np.random.default_rng(7)
+    coords = rng.uniform(0.35, 0.65, size=(478, 3))
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in coords.tolist():
+        landmarks.landmark.add(x=x, y=y, z=z)
+    return landmarks, (480, 640, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Image with a face (defaults to synthetic landmarks)')
+    parser.add_argument('--faces', default='1,5', help='Comma separated face counts')
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    landmarks, shape = detected_landmarks(args.image) if args.image else synthetic_landmarks()
+    # Feature extraction only - no MediaPipe graph needed
+    detector = EmotionDetector.__new__(EmotionDetector)
+
+    expected = np.array(reference_features(landmarks.landmark, shape))
+    actual = detector.extract_features(landmarks_to_array(landmarks), shape)
+    if not np.allclose(expected, actual, rtol=1e-9, atol=1e-9):
+        raise SystemExit(f"Feature mismatch:\n reference  {expected}\n vectorized {actual}")
+
+    rows = []
+    for count in (int(v) for v in args.faces.split(',')):
+        faces = [landmarks] * count
+        points = np.stack([landmarks_to_array(face) for face in faces])
+
+        variants = (
+            ('reference (per landmark)', lambda: [reference_features(face.landmark, shape) for face in faces]),
+            ('to_array + batched', lambda: detector.extract_features_batch(
+                np.stack([landmarks_to_array(face) for face in faces]), shape)),
+            ('batched (arrays ready)', lambda: detector.extract_features_batch(points, shape)),
+        )
+        for name, func in variants:
+            stats = summarize(time_calls(func, args.iterations))
+            rows.append({'faces': count, 'variant': name,
+                         'us_per_face': round(stats['mean_ms'] * 1000 / count, 1),
+                         'p95_us_per_face': round(stats['p95_ms'] * 1000 / count, 1)})
+
+    print("Features match the reference implementation.")
+    print_table(rows, ['faces', 'variant', 'us_per_face', 'p95_us_per_face'])
+
+
+if __name__ == '__main__':
+    main()
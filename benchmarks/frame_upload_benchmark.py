@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare the legacy base64-in-JSON frame upload with the binary upload path.
+
+Reports bytes on the wire and server-side decode latency per frame for both
+paths, and optionally the full /api/analyze_frame request through the Flask
+test client.
+
+Usage:
+    python benchmarks/frame_upload_benchmark.py [--image face.jpg] [--sizes 320x240,640x480,1280x720]
+"""
+
+import argparse
+import base64
+import io
+import json
+import cv2
+
+from common import summarize, time_calls, synthetic_frame, load_image, print_table
+from frame_decoder import FrameDecoder, decode_data_url
+
+
+def legacy_request_body(jpeg_bytes):
+    """Build the JSON body the old client sends (canvas.toDataURL)."""
+    data_url = 'data:image/jpeg;base64,' + base64.b64encode(jpeg_bytes).decode('ascii')
+    return json.dumps({'image': data_url}).encode('utf-8')
+
+
+def benchmark_size(frame, quality, iterations):
+    """Benchmark both upload paths for one frame size."""
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    jpeg_bytes = encoded.tobytes()
+    json_body = legacy_request_body(jpeg_bytes)
+    decoder = FrameDecoder()
+
+    def decode_json():
+        data = json.loads(json_body)
+        return decode_data_url(data['image'])
+
+    def decode_binary():
+        return decoder.decode_stream(io.BytesIO(jpeg_bytes), len(jpeg_bytes))
+
+    json_stats = summarize(time_calls(decode_json, iterations))
+    binary_stats = summarize(time_calls(decode_binary, iterations))
+    height, width = frame.shape[:2]
+
+    return [
+        {'size': f"{width}x{height}", 'path': 'json+base64', 'bytes': len(json_body),
+         'p50_ms': json_stats['p50_ms'], 'p95_ms': json_stats['p95_ms'], 'mean_ms': json_stats['mean_ms']},
+        {'size': f"{width}x{height}", 'path': 'binary', 'bytes': len(jpeg_bytes),
+         'p50_ms': binary_stats['p50_ms'], 'p95_ms': binary_stats['p95_ms'], 'mean_ms': binary_stats['mean_ms']},
+    ]
+
+
+def benchmark_endpoint(frame, quality, iterations):
+    """Time the full /api/analyze_frame request for both payload formats."""
+    import web_app
+
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    jpeg_bytes = encoded.tobytes()
+    json_body = legacy_request_body(jpeg_bytes)
+    client = web_app.app.test_client()
+
+    def post_json():
+        client.post('/api/analyze_frame', data=json_body, content_type='application/json')
+
+    def post_binary():
+        client.post('/api/analyze_frame', data=jpeg_bytes, content_type='image/jpeg')
+
+    height, width = frame.shape[:2]
+    rows = []
+    for name, func, size in (('json+base64', post_json, len(json_body)), ('binary', post_binary, len(jpeg_bytes))):
+        stats = summarize(time_calls(func, iterations, warmup=3))
+        rows.append({'size': f"{width}x{height}", 'path': name, 'bytes': size,
+                     'p50_ms': stats['p50_ms'], 'p95_ms': stats['p95_ms'], 'mean_ms': stats['mean_ms']})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Image to upload (defaults to a synthetic frame)')
+    parser.add_argument('--sizes', default='320x240,640x480,1280x720', help='Comma separated WxH list')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality (browser uses 0.8)')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--endpoint', action='store_true', help='Also time the full Flask request path')
+    args = parser.parse_args()
+
+    decode_rows = []
+    endpoint_rows = []
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.lower().split('x'))
+        if args.image:
+            frame = load_image(args.image, width, height)
+        else:
+            frame = synthetic_frame(width, height)
+        decode_rows.extend(benchmark_size(frame, args.quality, args.iterations))
+        if args.endpoint:
+            endpoint_rows.extend(benchmark_endpoint(frame, args.quality, max(args.iterations // 10, 10)))
+
+    columns = ['size', 'path', 'bytes', 'mean_ms', 'p50_ms', 'p95_ms']
+    print("Decode cost per frame:")
+    print_table(decode_rows, columns)
+    if endpoint_rows:
+        print("\n/api/analyze_frame request latency:")
+        print_table(endpoint_rows, columns)
+
+
+if __name__ == '__main__':
+    main()
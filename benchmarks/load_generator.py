@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Load generator simulating concurrent players against a running web server.
+
+Every simulated player behaves like templates/index.html in HTTP mode:
+
+- POST /api/start_game, then keep its session through the X-Session-Token header
+- stream JPEG frames to /api/analyze_frame?format=compact with one frame in
+  flight, waiting for the server-advised interval (or --fps) between frames
+- poll /api/game_state every 100 ms
+- POST /api/submit_emotion when a detected emotion is a clear match
+  (detection_result.is_clear_match)
+- start a new game when the game is over
+
+Players are added in steps (--clients 1,5,10,20) and each step runs for
+--duration seconds, so concurrency ramps up while earlier players keep
+playing. For every step the tool reports analyzed frames per second and the
+request rate, error rate and latency percentiles of each endpoint.
+
+Frames are encoded once up front, so the advised jpeg_quality is not applied.
+
+Usage:
+    python web_app.py &
+    python benchmarks/load_generator.py --url http://127.0.0.1:5000 --clients 1,5,10,20 --duration 30 --frames corpus/
+"""
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+import cv2
+
+from common import summarize, synthetic_frame, load_corpus, print_table
+from detection_result import is_clear_match
+
+ENDPOINTS = ('start_game', 'analyze_frame', 'game_state', 'submit_emotion')
+
+
+class LoadStats:
+    """Thread-safe per-step, per-endpoint request counters and latencies."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._step = None
+
+    def begin_step(self, clients):
+        """Start collecting a new step and return the previous one."""
+        with self._lock:
+            previous = self._step
+            self._step = {
+                'clients': clients,
+                'started': time.perf_counter(),
+                'endpoints': {name: {'latencies': [], 'errors': 0, 'busy': 0} for name in ENDPOINTS},
+                'frames_analyzed': 0,
+                'frames_cached': 0,
+            }
+            return previous
+
+    def record(self, endpoint, latency_ms, status):
+        with self._lock:
+            entry = self._step['endpoints'][endpoint]
+            entry['latencies'].append(latency_ms)
+            if status is None or status >= 400:
+                entry['errors'] += 1
+            if status == 503:
+                entry['busy'] += 1
+
+    def record_frame(self, cached):
+        with self._lock:
+            self._step['frames_analyzed'] += 1
+            if cached:
+                self._step['frames_cached'] += 1
+
+
+def summarize_step(step, elapsed):
+    """Turn one step's raw counters into a report."""
+    endpoints = {}
+    for name, entry in step['endpoints'].items():
+        requests = len(entry['latencies'])
+        stats = summarize(entry['latencies'])
+        stats.update({
+            'rps': round(requests / elapsed, 1),
+            'errors': entry['errors'],
+            'busy': entry['busy'],
+            'error_rate': round(entry['errors'] / requests, 4) if requests else 0.0,
+        })
+        endpoints[name] = stats
+    return {
+        'clients': step['clients'],
+        'seconds': round(elapsed, 1),
+        'frames_per_second': round(step['frames_analyzed'] / elapsed, 1),
+        'cached_frames': step['frames_cached'],
+        'endpoints': endpoints,
+    }
+
+
+class SimulatedPlayer:
+    """One browser: a frame loop and a game state polling loop, sharing a session."""
+
+    def __init__(self, url, frames, stats, stop, fps=None, poll_interval=0.1, timeout=10.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.frames = frames
+        self.stats = stats
+        self.stop = stop
+        self.interval = 1.0 / fps if fps else None
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.token = None
+        self.stream_id = uuid.uuid4().hex
+        self.state = None
+        self._next_frame = random.randrange(len(frames))
+
+    def request(self, conn, endpoint, method, path, body=None, headers=None):
+        """Send one request and record it; returns (status, JSON body) or (None, None) on failure."""
+        headers = dict(headers or {})
+        if self.token:
+            headers['X-Session-Token'] = self.token
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self.stats.record(endpoint, (time.perf_counter() - start) * 1000, None)
+            return None, None
+        self.stats.record(endpoint, (time.perf_counter() - start) * 1000, status)
+        if endpoint == 'start_game' and response.getheader('X-Session-Token'):
+            self.token = response.getheader('X-Session-Token')
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def connection(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def start_game(self, conn):
+        status, _ = self.request(conn, 'start_game', 'POST', '/api/start_game', b'{}',
+                                 {'Content-Type': 'application/json'})
+        if status == 200:
+            self.state = 'playing'
+        return status == 200
+
+    def run_frames(self):
+        conn = self.connection()
+        while not self.stop.is_set() and not self.start_game(conn):
+            self.stop.wait(1.0)
+        interval = self.interval or 0.2
+        seq = 0
+        while not self.stop.is_set():
+            if self.state == 'game_over':
+                self.start_game(conn)
+            sent = time.perf_counter()
+            seq += 1
+            jpeg = self.frames[self._next_frame]
+            self._next_frame = (self._next_frame + 1) % len(self.frames)
+            status, data = self.request(conn, 'analyze_frame', 'POST', '/api/analyze_frame?format=compact', jpeg,
+                                        {'Content-Type': 'image/jpeg', 'X-Frame-Seq': str(seq),
+                                         'X-Stream-Id': self.stream_id})
+            if data and data.get('success'):
+                self.stats.record_frame(data.get('cached', False))
+                if not self.interval and data.get('interval_ms'):
+                    interval = data['interval_ms'] / 1000
+                matched = is_clear_match(data.get('confidence') or 0.0, data.get('margin'))
+                if data.get('emotion') and self.state == 'playing' and matched:
+                    _, result = self.request(conn, 'submit_emotion', 'POST', '/api/submit_emotion',
+                                             json.dumps({'emotion': data['emotion']}).encode(),
+                                             {'Content-Type': 'application/json'})
+                    if result and result.get('game_state'):
+                        self.state = result['game_state'].get('state')
+            elif not self.interval and (status is None or status == 503):
+                # Back off like the browser does when the server is busy
+                interval = min(2.0, interval * 2)
+            self.stop.wait(max(0.0, interval - (time.perf_counter() - sent)))
+        conn.close()
+
+    def run_polling(self):
+        conn = self.connection()
+        while not self.stop.is_set():
+            started = time.perf_counter()
+            if self.token:
+                _, data = self.request(conn, 'game_state', 'GET', '/api/game_state')
+                if data and data.get('state'):
+                    self.state = data['state']
+            self.stop.wait(max(0.0, self.poll_interval - (time.perf_counter() - started)))
+        conn.close()
+
+    def start(self):
+        threads = [threading.Thread(target=self.run_frames, daemon=True),
+                   threading.Thread(target=self.run_polling, daemon=True)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+
+def encode_frames(frames, quality):
+    return [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes() for frame in frames]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='Server to load')
+    parser.add_argument('--clients', default='1,5,10,20', help='Comma separated player counts, one per step')
+    parser.add_argument('--duration', type=float, default=30.0, help='Seconds per step')
+    parser.add_argument('--fps', type=float, help='Frames per second per player (default: follow server advice)')
+    parser.add_argument('--poll-interval-ms', type=float, default=100, help='Game state polling interval')
+    parser.add_argument('--frames', help='Directory of images or a video file (defaults to a synthetic frame)')
+    parser.add_argument('--limit', type=int, default=100, help='Frames loaded from --frames')
+    parser.add_argument('--size', default='640x480', help='Frame size WxH')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split('x'))
+    if args.frames:
+        frames = load_corpus(args.frames, args.limit, width, height)
+    else:
+        frames = [synthetic_frame(width, height)]
+    jpegs = encode_frames(frames, args.quality)
+
+    steps = [int(v) for v in args.clients.split(',')]
+    stats = LoadStats()
+    stop = threading.Event()
+    players = []
+    threads = []
+    reports = []
+    try:
+        for clients in steps:
+            # Begin the step first so the new players' first requests count towards it
+            stats.begin_step(clients)
+            started = time.perf_counter()
+            while len(players) < clients:
+                player = SimulatedPlayer(args.url, jpegs, stats, stop, args.fps, args.poll_interval_ms / 1000)
+                players.append(player)
+                threads.extend(player.start())
+            time.sleep(args.duration)
+            step = stats.begin_step(clients)
+            report = summarize_step(step, time.perf_counter() - started)
+            reports.append(report)
+            analyze = report['endpoints']['analyze_frame']
+            print(f"{clients} players: {report['frames_per_second']} frames/s, "
+                  f"analyze_frame p95 {analyze['p95_ms']} ms, errors {analyze['error_rate']:.1%}")
+    except KeyboardInterrupt:
+        print("Interrupted")
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=5)
+
+    rows = []
+    for report in reports:
+        for name, endpoint in report['endpoints'].items():
+            rows.append(dict(endpoint, clients=report['clients'], endpoint=name,
+                             fps=report['frames_per_second'] if name == 'analyze_frame' else ''))
+    print()
+    print_table(rows, ['clients', 'endpoint', 'count', 'rps', 'fps', 'errors', 'busy', 'error_rate',
+                       'p50_ms', 'p95_ms', 'p99_ms'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'url': args.url, 'duration': args.duration, 'fps': args.fps,
+                       'frame_size': args.size, 'steps': reports}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
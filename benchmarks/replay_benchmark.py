@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded frame corpus through the detection, rendering and web paths.
+
+Frames come from a directory of images or a video file, so results do not
+depend on a live webcam. Each stage reports throughput, p50/p95/p99 latency
+and the peak RSS of the process after it ran:
+
+- detect: EmotionDetector.detect_emotion on every frame
+- classify: EmotionDetector.classify_emotion on the faces detect found
+- render: UIRenderer.render_game with the detected faces
+- endpoint: the full /api/analyze_frame request through the Flask test client
+
+Write the results with --json and compare two runs (e.g. before and after a
+commit) with --compare. Without --frames a synthetic corpus is used; it has
+no faces, so classify is skipped and detect only measures the no-face path.
+
+Usage:
+    python benchmarks/replay_benchmark.py --record corpus/ --count 300
+    python benchmarks/replay_benchmark.py --frames corpus/ --json before.json
+    python benchmarks/replay_benchmark.py --frames session.mp4 --json after.json --compare before.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import time
+import cv2
+import numpy as np
+
+from common import REPO_ROOT, summarize, synthetic_frame, load_corpus, peak_rss_mb, print_table
+
+STAGES = ('detect', 'classify', 'render', 'endpoint')
+
+
+def record_corpus(directory, count, camera=0):
+    """Save `count` webcam frames as JPEG files for later replay."""
+    os.makedirs(directory, exist_ok=True)
+    capture = cv2.VideoCapture(camera)
+    if not capture.isOpened():
+        raise SystemExit(f"Could not open camera {camera}")
+    saved = 0
+    while saved < count:
+        ok, frame = capture.read()
+        if not ok:
+            break
+        cv2.imwrite(os.path.join(directory, f"frame_{saved:05d}.jpg"), frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
+        saved += 1
+    capture.release()
+    print(f"Recorded {saved} frames to {directory}")
+
+
+def synthetic_corpus(count, width=640, height=480):
+    """Synthetic frames that drift slightly, so consecutive frames are not identical."""
+    base = synthetic_frame(width, height)
+    return [np.roll(base, i * 2, axis=1) for i in range(count)]
+
+
+def run_stage(frames, func, passes, warmup):
+    """Call func(index, frame) for every frame and collect latencies, errors and throughput."""
+    for index, frame in enumerate(frames[:warmup]):
+        try:
+            func(index, frame)
+        except Exception:
+            pass
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for _ in range(passes):
+        for index, frame in enumerate(frames):
+            start = time.perf_counter()
+            try:
+                func(index, frame)
+            except Exception as e:
+                if not errors:
+                    print(f"Warning: {type(e).__name__}: {e}")
+                errors += 1
+            samples.append((time.perf_counter() - start) * 1000)
+    elapsed = time.perf_counter() - started
+
+    result = summarize(samples)
+    result.update({
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'fps': round(len(samples) / elapsed, 1) if elapsed > 0 else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+    })
+    return result
+
+
+def benchmark_detect(frames, detector, passes, warmup):
+    detections = [None] * len(frames)
+
+    def detect(index, frame):
+        detections[index] = detector.detect_emotion(frame)
+
+    return run_stage(frames, detect, passes, warmup), detections
+
+
+def benchmark_classify(frames, detector, detections, passes, warmup):
+    # Only frames in which faces were found; each call classifies all of them
+    with_faces = [(frame, result[2]) for frame, result in zip(frames, detections) if result and result[2]]
+    if not with_faces:
+        return None
+
+    def classify(index, item):
+        frame, faces = item
+        for face in faces:
+            detector.classify_emotion(face.points, frame.shape)
+
+    return run_stage(with_faces, classify, passes, warmup)
+
+
+def benchmark_render(frames, detections, passes, warmup):
+    from ui_renderer import UIRenderer
+
+    renderer = UIRenderer()
+
+    def render(index, frame):
+        emotion, confidence, faces = detections[index] or (None, 0.0, [])
+        renderer.render_game(frame.copy(), 'happy', emotion, confidence, 120, 2, 3, 0.8, faces, 2)
+
+    return run_stage(frames, render, passes, warmup)
+
+
+def benchmark_endpoint(frames, quality, passes, warmup):
+    import web_app
+
+    client = web_app.app.test_client()
+    payloads = [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes() for frame in frames]
+    counters = {'seq': 0, 'cached': 0, 'failed': 0}
+
+    def post(index, frame):
+        counters['seq'] += 1
+        response = client.post('/api/analyze_frame?format=compact', data=payloads[index], headers={
+            'Content-Type': 'image/jpeg',
+            'X-Stream-Id': 'replay',
+            'X-Frame-Seq': str(counters['seq']),
+        })
+        data = response.get_json() or {}
+        if not data.get('success'):
+            counters['failed'] += 1
+        elif data.get('cached'):
+            counters['cached'] += 1
+
+    result = run_stage(frames, post, passes, warmup)
+    result['cached'] = counters['cached']
+    result['failed'] = counters['failed']
+    web_app.detector_pool.close()
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(baseline, current):
+    """Print per-stage throughput and latency changes relative to a baseline run."""
+    def change(old, new):
+        if not old:
+            return ''
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    rows = []
+    for stage, new in current['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old or not new:
+            continue
+        rows.append({
+            'stage': stage,
+            'fps': f"{old['fps']} -> {new['fps']}",
+            'fps_change': change(old['fps'], new['fps']),
+            'p50_change': change(old['p50_ms'], new['p50_ms']),
+            'p95_change': change(old['p95_ms'], new['p95_ms']),
+            'p99_change': change(old['p99_ms'], new['p99_ms']),
+            'rss_mb': f"{old.get('peak_rss_mb')} -> {new.get('peak_rss_mb')}",
+        })
+    print(f"\nCompared with {baseline.get('meta', {}).get('commit') or 'baseline'}:")
+    print_table(rows, ['stage', 'fps', 'fps_change', 'p50_change', 'p95_change', 'p99_change', 'rss_mb'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', help='Directory of images or a video file (defaults to a synthetic corpus)')
+    parser.add_argument('--limit', type=int, help='Use at most this many frames')
+    parser.add_argument('--size', help='Resize frames to WxH')
+    parser.add_argument('--stages', default=','.join(STAGES), help='Comma separated stages to run')
+    parser.add_argument('--passes', type=int, default=1, help='Times the corpus is replayed per stage')
+    parser.add_argument('--warmup', type=int, default=5, help='Frames run before timing each stage')
+    parser.add_argument('--detection-tier', default='standard', help='Detection preset for detect and endpoint')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality of uploaded frames')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results file of an earlier run to compare against')
+    parser.add_argument('--record', metavar='DIR', help='Record webcam frames into DIR and exit')
+    parser.add_argument('--count', type=int, default=300, help='Frames to record')
+    args = parser.parse_args()
+
+    if args.record:
+        record_corpus(args.record, args.count)
+        return
+
+    width = height = None
+    if args.size:
+        width, height = (int(v) for v in args.size.lower().split('x'))
+    if args.frames:
+        frames = load_corpus(args.frames, args.limit, width, height)
+    else:
+        frames = synthetic_corpus(args.limit or 100, width or 640, height or 480)
+    stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise SystemExit(f"Unknown stages: {', '.join(sorted(unknown))}")
+    # The web app reads its detection preset at import time
+    os.environ.setdefault('MOODBLASTER_DETECTION_TIER', args.detection_tier)
+
+    results = {}
+    detections = [None] * len(frames)
+    if {'detect', 'classify', 'render'} & set(stages):
+        from detection_config import DetectionConfig
+        from emotion_detector import EmotionDetector
+
+        detector = EmotionDetector(use_camera=False, config=DetectionConfig.preset(args.detection_tier))
+        if not detector.face_mesh:
+            print("Warning: MediaPipe not available, detection results will be empty")
+        # classify and render replay what detect found, so detect always runs before them
+        results['detect'], detections = benchmark_detect(frames, detector, args.passes, args.warmup)
+        if 'classify' in stages:
+            results['classify'] = benchmark_classify(frames, detector, detections, args.passes, args.warmup)
+        detector.cleanup()
+        if 'detect' not in stages:
+            del results['detect']
+    if 'render' in stages:
+        results['render'] = benchmark_render(frames, detections, args.passes, args.warmup)
+    if 'endpoint' in stages:
+        results['endpoint'] = benchmark_endpoint(frames, args.quality, args.passes, args.warmup)
+
+    height, width = frames[0].shape[:2]
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'corpus': args.frames or 'synthetic',
+            'frames': len(frames),
+            'frame_size': f"{width}x{height}",
+            'frames_with_faces': sum(1 for result in detections if result and result[2]),
+            'passes': args.passes,
+            'detection_tier': args.detection_tier,
+        },
+        'stages': results,
+    }
+
+    rows = []
+    for stage, result in results.items():
+        if result is None:
+            rows.append({'stage': stage, 'count': 'skipped (no faces)'})
+        else:
+            rows.append(dict(result, stage=stage))
+    print(f"{len(frames)} frames ({width}x{height}), {report['meta']['frames_with_faces']} with faces")
+    print_table(rows, ['stage', 'count', 'errors', 'fps', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'peak_rss_mb'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Accuracy/latency tradeoff of the inference resolution policy.
+
+Every frame of a corpus is JPEG encoded at its source size and then decoded
+and analyzed once per candidate max side, the way the web server handles an
+upload (FrameDecoder with a ResolutionPolicy, then detect_emotion with the
+captured size as source_shape). Results are compared with the
+full-resolution run:
+
+- face_recall: share of frames with a face at full resolution in which a face is still found
+- agreement: share of those frames whose primary emotion matches
+- landmark_err: mean landmark distance from the full-resolution landmarks, in % of the frame diagonal
+
+Detectors run in static image mode, so every frame is analyzed on its own
+and resolutions can be compared frame by frame.
+
+Usage:
+    python benchmarks/resolution_benchmark.py --frames corpus/ [--source-size 1280x720] [--sides 960,640,480,320]
+"""
+
+import argparse
+import json
+import time
+import cv2
+import numpy as np
+
+from common import summarize, load_corpus, load_image, print_table
+from detection_config import DetectionConfig
+from emotion_detector import EmotionDetector
+from frame_decoder import FrameDecoder
+from resolution_policy import ResolutionPolicy
+
+
+def analyze(payloads, decoder, detector):
+    """Decode and analyze every payload; return per-frame results and timings (ms)."""
+    results, decode_ms, detect_ms = [], [], []
+    for jpeg in payloads:
+        started = time.perf_counter()
+        frame, source_shape = decoder.decode_frame(jpeg, 'rgb')
+        decoded = time.perf_counter()
+        results.append((frame.shape[:2], detector.detect_emotion(frame, 'rgb', source_shape)))
+        finished = time.perf_counter()
+        decode_ms.append((decoded - started) * 1000)
+        detect_ms.append((finished - decoded) * 1000)
+    return results, decode_ms, detect_ms
+
+
+def compare(reference, results):
+    """Face recall, emotion agreement and landmark error against the full-resolution results."""
+    with_face = found = agree = 0
+    errors = []
+    for (_, (ref_emotion, _, ref_faces)), (_, (emotion, _, faces)) in zip(reference, results):
+        if not ref_faces:
+            continue
+        with_face += 1
+        if not faces:
+            continue
+        found += 1
+        agree += emotion == ref_emotion
+        # Normalized coordinates; sqrt(2) is the frame diagonal
+        delta = faces[0].points[:, :2] - ref_faces[0].points[:, :2]
+        errors.append(float(np.linalg.norm(delta, axis=1).mean()) / np.sqrt(2) * 100)
+    return {
+        'face_recall': round(found / with_face, 3) if with_face else 0.0,
+        'agreement': round(agree / found, 3) if found else 0.0,
+        'landmark_err': round(float(np.mean(errors)), 3) if errors else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', help='Directory of images or a video file')
+    parser.add_argument('--image', help='Single image to use instead of a corpus')
+    parser.add_argument('--limit', type=int, help='Use at most this many frames')
+    parser.add_argument('--source-size', help='Resize frames to WxH first, e.g. to emulate an HD camera')
+    parser.add_argument('--sides', default='960,640,480,320,240', help='Comma separated max sides to compare')
+    parser.add_argument('--quality', type=int, default=80, help='JPEG quality of the uploads')
+    parser.add_argument('--detection-tier', default='standard', help='Detection preset')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    width = height = None
+    if args.source_size:
+        width, height = (int(v) for v in args.source_size.lower().split('x'))
+    if args.frames:
+        frames = load_corpus(args.frames, args.limit, width, height)
+    elif args.image:
+        frames = [load_image(args.image, width, height)]
+    else:
+        raise SystemExit("Pass --frames or --image: the comparison needs frames with faces")
+
+    payloads = [cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, args.quality])[1].tobytes() for frame in frames]
+    detector = EmotionDetector(use_camera=False, config=DetectionConfig.preset(args.detection_tier, static_image_mode=True))
+    if not detector.face_mesh:
+        raise SystemExit("MediaPipe is not available")
+
+    # Warm up the graph so the first resolution is not charged for it
+    analyze(payloads[:3], FrameDecoder(), detector)
+    reference, decode_ms, detect_ms = analyze(payloads, FrameDecoder(), detector)
+
+    source_h, source_w = frames[0].shape[:2]
+    runs = [('source', reference, decode_ms, detect_ms)]
+    for side in (int(v) for v in args.sides.split(',')):
+        if side >= max(source_w, source_h):
+            continue
+        runs.append((side,) + analyze(payloads, FrameDecoder(policy=ResolutionPolicy(side)), detector))
+    detector.cleanup()
+
+    rows = []
+    for side, results, decode_ms, detect_ms in runs:
+        decode, detect = summarize(decode_ms), summarize(detect_ms)
+        total = summarize([a + b for a, b in zip(decode_ms, detect_ms)])
+        fh, fw = results[0][0]
+        row = {
+            'max_side': side, 'frame': f"{fw}x{fh}",
+            'decode_ms': decode['mean_ms'], 'detect_ms': detect['mean_ms'],
+            'total_p50_ms': total['p50_ms'], 'total_p95_ms': total['p95_ms'],
+        }
+        row.update(compare(reference, results))
+        rows.append(row)
+
+    faces = sum(1 for _, result in reference if result[2])
+    print(f"{len(frames)} frames at {source_w}x{source_h}, {faces} with a face at full resolution")
+    print_table(rows, ['max_side', 'frame', 'decode_ms', 'detect_ms', 'total_p50_ms', 'total_p95_ms',
+                       'face_recall', 'agreement', 'landmark_err'])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'source_size': f"{source_w}x{source_h}", 'frames': len(frames), 'rows': rows}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
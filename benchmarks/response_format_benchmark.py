@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare the full and compact /api/analyze_frame response formats.
+
+Builds responses for 1..5 synthetic faces of 468 landmarks each (FaceMesh without iris refinement) and reports
+the serialized size and the time to build and JSON-encode each format.
+
+Usage:
+    python benchmarks/response_format_benchmark.py [--faces 1,5] [--landmarks 61,291,13,14]
+"""
+
+import argparse
+import json
+from types import SimpleNamespace
+import numpy as np
+
+from common import summarize, time_calls, print_table
+from emotion_detector import landmarks_to_array
+from landmark_codec import compact_faces
+
+NUM_LANDMARKS = 468
+
+
+def synthetic_faces(count):
+    """Create detector-style face dicts holding landmark objects and their (N, 3) array."""
+    rng = np.random.default_rng(count)
+    faces = []
+    for i in range(count):
+        center = rng.uniform(0.3, 0.7, size=2)
+        coords = center + rng.normal(scale=0.08, size=(NUM_LANDMARKS, 2))
+        landmarks = [SimpleNamespace(x=float(x), y=float(y), z=0.0) for x, y in coords]
+        faces.append({'landmarks': landmarks, 'points': landmarks_to_array(landmarks),
+                      'emotion': 'happy', 'confidence': 0.9})
+    return faces
+
+
+def full_response(faces):
+    """Legacy response: one {'x', 'y'} dict per landmark, first face sent twice."""
+    all_face_landmarks = [[{'x': lm.x, 'y': lm.y} for lm in face['landmarks']] for face in faces]
+    return json.dumps({
+        'emotion': 'happy',
+        'confidence': 0.9,
+        'face_landmarks': all_face_landmarks[0] if all_face_landmarks else None,
+        'all_faces': all_face_landmarks,
+        'face_count': len(all_face_landmarks),
+        'success': True
+    })
+
+
+def compact_response(faces, indices=None):
+    """Compact response: per-face bbox plus an optional packed landmark subset."""
+    points = np.stack([face['points'] for face in faces])
+    payload = compact_faces(points, [f['emotion'] for f in faces], [f['confidence'] for f in faces], indices)
+    payload.update({'emotion': 'happy', 'confidence': 0.9, 'face_count': len(faces), 'success': True})
+    return json.dumps(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--faces', default='1,5', help='Comma separated face counts')
+    parser.add_argument('--landmarks', default='61,291,13,14', help='Landmark subset for the packed variant')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    indices = np.array([int(v) for v in args.landmarks.split(',')], dtype=np.intp)
+    rows = []
+    for count in (int(v) for v in args.faces.split(',')):
+        faces = synthetic_faces(count)
+        variants = (
+            ('full', lambda: full_response(faces)),
+            ('compact', lambda: compact_response(faces)),
+            (f'compact+{len(indices)}lm', lambda: compact_response(faces, indices)),
+        )
+        for name, func in variants:
+            stats = summarize(time_calls(func, args.iterations))
+            rows.append({'faces': count, 'format': name, 'bytes': len(func()),
+                         'mean_ms': stats['mean_ms'], 'p95_ms': stats['p95_ms']})
+
+    print_table(rows, ['faces', 'format', 'bytes', 'mean_ms', 'p95_ms'])
+
+
+if __name__ == '__main__':
+    main()
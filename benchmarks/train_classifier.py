@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Train and evaluate the learned emotion classifier on labeled frames.
+
+The frame directory holds one subdirectory per emotion, named after it:
+
+    frames/happy/*.jpg  frames/angry/*.jpg  frames/surprise/*.jpg ...
+
+Every frame is run through the detector once (static image mode). The
+facial features of its largest face are labeled with the directory's
+emotion; frames without a face are skipped. A stratified part of the
+frames is held out. The model is trained on the rest (unless --evaluate
+loads an existing one) and compared on the held-out frames with the rule
+classifier:
+
+- accuracy, plus recall and precision per emotion and a confusion matrix
+- inference time per face (score + classify) for batches of 1 and
+  --batch-faces faces; the command fails if the learned model exceeds
+  --budget-us per face
+
+Usage:
+    python benchmarks/train_classifier.py --frames frames/ --model emotion_model.npz [--hidden 16]
+    python benchmarks/train_classifier.py --frames frames/ --evaluate emotion_model.npz
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy as np
+
+from common import IMAGE_EXTENSIONS, summarize, time_calls, load_image, print_table
+from detection_config import DetectionConfig
+from detection_result import EMOTIONS, FEATURE_NAMES
+from emotion_detector import EmotionDetector
+from learned_classifier import LearnedClassifier
+from rule_classifier import RuleClassifier
+
+
+def labeled_frames(directory):
+    """Return [(path, emotion)] for the images in the emotion subdirectories of directory."""
+    frames = []
+    for emotion in sorted(os.listdir(directory)):
+        folder = os.path.join(directory, emotion)
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                frames.append((os.path.join(folder, name), emotion))
+    if not frames:
+        raise SystemExit(f"No labeled images found in {directory} (expected one subdirectory per emotion)")
+    return frames
+
+
+def emotion_order(names):
+    """Sort emotion names: the default emotions in EMOTIONS order, then the others alphabetically."""
+    names = set(names)
+    return [e for e in EMOTIONS if e in names] + sorted(names - set(EMOTIONS))
+
+
+def extract_dataset(frames, detector):
+    """Return (features, emotion names, skipped count) for the largest face of every frame."""
+    features, labels, skipped = [], [], 0
+    for path, emotion in frames:
+        frame = load_image(path)
+        _, _, faces = detector.detect_emotion(frame)
+        if not faces:
+            skipped += 1
+            continue
+        boxes = faces.bboxes
+        largest = int(np.argmax((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])))
+        features.append(detector.extract_features_batch(faces.points[largest:largest + 1], frame.shape)[0])
+        labels.append(emotion)
+    return np.array(features).reshape(-1, len(FEATURE_NAMES)), labels, skipped
+
+
+def split(labels, test_share, seed):
+    """Stratified train / test index split."""
+    rng = np.random.default_rng(seed)
+    train, test = [], []
+    for emotion in sorted(set(labels)):
+        indices = np.flatnonzero(np.array(labels) == emotion)
+        rng.shuffle(indices)
+        held_out = int(round(len(indices) * test_share)) if len(indices) > 1 else 0
+        test.extend(indices[:held_out].tolist())
+        train.extend(indices[held_out:].tolist())
+    return np.array(sorted(train), dtype=np.intp), np.array(sorted(test), dtype=np.intp)
+
+
+def evaluate(classifier, features, labels):
+    """Accuracy and per-emotion recall / precision / confusion counts of classifier's predictions."""
+    predicted, _ = classifier.classify(classifier.score(features))
+    names = emotion_order(set(labels) | {p for p in predicted if p})
+    rows = []
+    for emotion in names:
+        truth = [p for p, l in zip(predicted, labels) if l == emotion]
+        claimed = [l for p, l in zip(predicted, labels) if p == emotion]
+        row = {'emotion': emotion, 'frames': len(truth),
+               'recall': round(truth.count(emotion) / len(truth), 3) if truth else '-',
+               'precision': round(claimed.count(emotion) / len(claimed), 3) if claimed else '-'}
+        row.update({f'-> {other}': truth.count(other) for other in names})
+        row['-> none'] = truth.count(None)
+        rows.append(row)
+    correct = sum(p == l for p, l in zip(predicted, labels))
+    return (correct / len(labels) if labels else 0.0), rows
+
+
+def time_per_face(classifier, features, faces):
+    """Mean and p95 microseconds per face to score and classify a batch of `faces` faces."""
+    batch = np.resize(features, (faces, features.shape[1])) if len(features) else np.zeros((faces, features.shape[1]))
+    stats = summarize(time_calls(lambda: classifier.classify(classifier.score(batch)), 2000, warmup=50))
+    return round(stats['mean_ms'] * 1000 / faces, 2), round(stats['p95_ms'] * 1000 / faces, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', required=True, help='Directory with one subdirectory of images per emotion')
+    parser.add_argument('--model', help='Write the trained model to this .npz file')
+    parser.add_argument('--evaluate', metavar='MODEL', help='Evaluate this model instead of training one')
+    parser.add_argument('--emotion-rules', help='Rule file for the rule classifier baseline (default: built-in rules)')
+    parser.add_argument('--hidden', type=int, default=16, help='Hidden units; 0 trains softmax regression')
+    parser.add_argument('--epochs', type=int, default=2000)
+    parser.add_argument('--learning-rate', type=float, default=0.05)
+    parser.add_argument('--l2', type=float, default=1e-3, help='Weight decay')
+    parser.add_argument('--min-confidence', type=float, default=0.4, help='Lowest probability reported as an emotion')
+    parser.add_argument('--test-split', type=float, default=0.25, help='Share of each emotion held out for evaluation')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--batch-faces', type=int, default=5, help='Faces per batch for the multi-face timing')
+    parser.add_argument('--budget-us', type=float, default=50.0, help='Maximum inference time per face, in microseconds')
+    parser.add_argument('--detection-tier', default='standard', help='Detection preset')
+    parser.add_argument('--json', help='Write the results to this file')
+    args = parser.parse_args()
+
+    detector = EmotionDetector(use_camera=False, config=DetectionConfig.preset(args.detection_tier, static_image_mode=True))
+    if not detector.face_mesh:
+        raise SystemExit("MediaPipe is not available")
+    frames = labeled_frames(args.frames)
+    features, labels, skipped = extract_dataset(frames, detector)
+    detector.cleanup()
+    print(f"{len(frames)} frames, {len(labels)} with a face ({skipped} skipped)")
+    if not labels:
+        raise SystemExit("No faces found in the labeled frames")
+
+    rules = RuleClassifier.load(args.emotion_rules) if args.emotion_rules else RuleClassifier()
+    if args.evaluate:
+        model = LearnedClassifier.load(args.evaluate)
+        train, test = np.array([], dtype=np.intp), np.arange(len(labels))
+    else:
+        train, test = split(labels, args.test_split, args.seed)
+        if not len(test):
+            raise SystemExit("Not enough frames to hold any out for evaluation")
+        emotions = emotion_order(labels)
+        model = LearnedClassifier.train(
+            features[train], [emotions.index(labels[i]) for i in train], emotions, hidden=args.hidden,
+            epochs=args.epochs, learning_rate=args.learning_rate, l2=args.l2,
+            min_confidence=args.min_confidence, seed=args.seed
+        )
+    unknown = set(labels) - set(model.emotions)
+    if unknown:
+        print(f"Warning: the model does not know {sorted(unknown)}; those frames count as errors")
+
+    test_labels = [labels[i] for i in test]
+    results = {'frames': len(frames), 'faces': len(labels), 'train': len(train), 'test': len(test), 'rows': []}
+    for name, classifier in (('rules', rules), ('learned', model)):
+        accuracy, rows = evaluate(classifier, features[test], test_labels)
+        one = time_per_face(classifier, features, 1)
+        many = time_per_face(classifier, features, args.batch_faces)
+        results['rows'].append({
+            'classifier': name, 'accuracy': round(accuracy, 3),
+            'us_per_face_1': one[0], 'p95_us_1': one[1],
+            f'us_per_face_{args.batch_faces}': many[0], f'p95_us_{args.batch_faces}': many[1],
+        })
+        print(f"\n{name} ({classifier!r}) on {len(test)} held-out faces:")
+        print_table(rows, list(rows[0]))
+        results[name] = rows
+
+    print()
+    print_table(results['rows'], list(results['rows'][0]))
+    slowest = max(results['rows'][1]['us_per_face_1'], results['rows'][1][f'us_per_face_{args.batch_faces}'])
+    within_budget = slowest <= args.budget_us
+    print(f"\nLearned model: {slowest} us per face, budget {args.budget_us} us: {'OK' if within_budget else 'EXCEEDED'}")
+
+    if args.model and not args.evaluate:
+        model.save(args.model)
+        print(f"Model written to {args.model}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+    return 0 if within_budget else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
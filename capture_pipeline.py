@@ -0,0 +1,196 @@
+"""
+Threaded capture / inference pipeline for the desktop game.
+
+The serial game loop reads a frame, runs emotion detection and renders, so the
+display can never refresh faster than inference. The pipeline splits this into
+three stages:
+
+- a capture thread that keeps only the most recent camera frame,
+- an inference worker that analyzes the newest frame and publishes the result,
+- the render loop (the caller), which draws the latest frame at display rate
+  together with the latest available result.
+
+Each stage records its latency in a LatencyCounter.
+"""
+
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class LatencyCounter:
+    """Thread-safe latency statistics over the most recent samples."""
+
+    def __init__(self, window=300):
+        """Initialize the counter.
+
+        Args:
+            window: Number of recent samples kept for percentiles.
+        """
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        """Add one sample (in seconds)."""
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self):
+        """Return count, overall mean and recent p50/p95/max in milliseconds."""
+        with self._lock:
+            samples = np.array(self._samples)
+            count, total = self.count, self.total
+        if not count:
+            return {'count': 0, 'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0}
+        p50, p95 = np.percentile(samples, [50, 95]) * 1000
+        return {
+            'count': count,
+            'mean_ms': round(total / count * 1000, 2),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'max_ms': round(float(samples.max()) * 1000, 2),
+        }
+
+
+class DetectionResult:
+    """Emotion detection output for one captured frame."""
+
+    __slots__ = ('emotion', 'confidence', 'faces', 'frame_id', 'captured_at', 'completed_at')
+
+    def __init__(self, emotion, confidence, faces, frame_id, captured_at, completed_at):
+        self.emotion = emotion
+        self.confidence = confidence
+        self.faces = faces
+        self.frame_id = frame_id
+        self.captured_at = captured_at
+        self.completed_at = completed_at
+
+
+class CapturePipeline:
+    """Runs camera capture and emotion detection on background threads."""
+
+    def __init__(self, cap, detector, mirror=True):
+        """Initialize the pipeline.
+
+        Args:
+            cap: An opened cv2.VideoCapture.
+            detector: EmotionDetector used by the inference worker.
+            mirror: Flip frames horizontally (mirror effect) as they are captured.
+        """
+        self.cap = cap
+        self.detector = detector
+        self.mirror = mirror
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self._frame_id = 0
+        self._captured_at = 0.0
+        self._result = None
+        self._running = False
+        self._threads = []
+        self.error = None
+
+        self.counters = {
+            'capture': LatencyCounter(),     # cap.read() + mirror
+            'inference': LatencyCounter(),   # detect_emotion on one frame
+            'result_age': LatencyCounter(),  # frame captured -> result published
+            'render': LatencyCounter(),      # drawing + display, recorded by the render loop
+        }
+        self.frames_skipped = 0
+
+    def start(self):
+        """Start the capture and inference threads."""
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name='capture', daemon=True),
+            threading.Thread(target=self._inference_loop, name='inference', daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop both threads and wait for them to finish."""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    @property
+    def running(self):
+        return self._running
+
+    def _capture_loop(self):
+        """Keep replacing the latest frame with a fresh one from the camera."""
+        while self._running:
+            started = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                self.error = "Could not read from webcam"
+                break
+            if self.mirror:
+                frame = cv2.flip(frame, 1)
+            captured_at = time.perf_counter()
+            self.counters['capture'].record(captured_at - started)
+
+            with self._condition:
+                self._frame = frame
+                self._frame_id += 1
+                self._captured_at = captured_at
+                self._condition.notify_all()
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+    def _inference_loop(self):
+        """Analyze the newest frame whenever the previous analysis is done."""
+        last_id = 0
+        while True:
+            with self._condition:
+                while self._running and self._frame_id == last_id:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                frame, frame_id, captured_at = self._frame, self._frame_id, self._captured_at
+
+            # Frames captured while the previous one was being analyzed are never seen
+            self.frames_skipped += frame_id - last_id - 1
+            last_id = frame_id
+
+            started = time.perf_counter()
+            emotion, confidence, faces = self.detector.detect_emotion(frame)
+            completed_at = time.perf_counter()
+            self.counters['inference'].record(completed_at - started)
+            self.counters['result_age'].record(completed_at - captured_at)
+
+            result = DetectionResult(emotion, confidence, faces, frame_id, captured_at, completed_at)
+            with self._condition:
+                self._result = result
+
+    def latest_frame(self):
+        """Return (frame, frame_id) for the newest captured frame, or (None, 0) before the first one.
+
+        The frame is shared with the inference worker; copy it before drawing on it.
+        """
+        with self._condition:
+            return self._frame, self._frame_id
+
+    def latest_result(self):
+        """Return the most recent DetectionResult, or None before the first one."""
+        with self._condition:
+            return self._result
+
+    def stats(self):
+        """Return per-stage latency snapshots and the number of frames inference skipped."""
+        stats = {name: counter.snapshot() for name, counter in self.counters.items()}
+        stats['frames_skipped'] = self.frames_skipped
+        return stats
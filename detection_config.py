@@ -0,0 +1,77 @@
+"""
+Detection tier configuration for EmotionDetector.
+
+Two tiers locate faces before the landmark mesh runs:
+
+- 'mesh': MediaPipe FaceMesh on the full frame. FaceMesh finds faces with its
+  own detector and then tracks them from the previous frame's landmarks, but
+  it keeps re-running detection every frame while it tracks fewer than
+  max_num_faces faces. With max_num_faces=1 and one player this is the
+  cheapest path.
+- 'roi': a separate face detector runs every `detect_interval` frames (and
+  whenever a face is lost). In between, each face's region of interest comes
+  from its previous landmarks, and a single-face mesh runs on the cropped
+  region only. This suits rooms where the number of faces varies.
+
+Iris refinement (refine_landmarks) is only enabled when asked for or when a
+feature needs the iris landmarks. static_image_mode turns tracking off, for
+detectors whose consecutive frames come from different streams (batching).
+
+Presets are selected per deployment with MOODBLASTER_DETECTION_TIER (web) or
+--detection-tier (desktop).
+"""
+
+DETECTION_TIERS = {
+    # Full-frame mesh for up to five faces (the default)
+    'standard': {'tier': 'mesh', 'max_num_faces': 5},
+    # Single player in front of the camera: detect once, then track
+    'kiosk': {'tier': 'mesh', 'max_num_faces': 1},
+    # Several people at varying distance: periodic full-range detection + per-face crops
+    'room': {'tier': 'roi', 'max_num_faces': 5, 'detector_model': 1, 'detect_interval': 10},
+    # Previous behaviour: full-frame mesh with iris refinement
+    'legacy': {'tier': 'mesh', 'max_num_faces': 5, 'refine_landmarks': True},
+}
+
+
+class DetectionConfig:
+    """Settings controlling how EmotionDetector finds faces and landmarks."""
+
+    def __init__(self, tier='mesh', max_num_faces=5, refine_landmarks=False, detector_model=0,
+                 detect_interval=10, roi_margin=0.25, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, static_image_mode=False):
+        """Initialize the configuration.
+
+        Args:
+            tier: 'mesh' (full-frame FaceMesh) or 'roi' (face detector + per-face crops).
+            max_num_faces: Maximum number of faces analyzed per frame.
+            refine_landmarks: Run the iris refinement model even if no feature needs it.
+            detector_model: ROI tier face detector, 0 = short range (within ~2 m),
+                1 = full range.
+            detect_interval: ROI tier frames between face detector runs.
+            roi_margin: ROI tier padding around a face, as a fraction of its size.
+            min_detection_confidence: Minimum face detection score.
+            min_tracking_confidence: Minimum landmark tracking score.
+            static_image_mode: Treat every frame as unrelated to the previous one.
+        """
+        if tier not in ('mesh', 'roi'):
+            raise ValueError(f"Unknown detection tier '{tier}', expected 'mesh' or 'roi'")
+        self.tier = tier
+        self.max_num_faces = max_num_faces
+        self.refine_landmarks = refine_landmarks
+        self.detector_model = detector_model
+        self.detect_interval = max(1, detect_interval)
+        self.roi_margin = roi_margin
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self.static_image_mode = static_image_mode
+
+    @classmethod
+    def preset(cls, name, **overrides):
+        """Return the configuration for a named preset in DETECTION_TIERS.
+
+        Raises:
+            ValueError: If the preset does not exist.
+        """
+        if name not in DETECTION_TIERS:
+            raise ValueError(f"Unknown detection tier '{name}', expected one of {sorted(DETECTION_TIERS)}")
+        return cls(**dict(DETECTION_TIERS[name], **overrides))
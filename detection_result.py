@@ -0,0 +1,216 @@
+"""
+Compact detection results.
+
+The faces found in one frame are stored column-wise in a FrameResult: one
+contiguous (F, N, 3) float32 array of normalized landmarks, (F, 4) boxes,
+(F, K, 2) key points and (F, E) emotion scores, plus the emotion and
+confidence of each face and the emotion names of the score columns.
+Iterating a FrameResult yields FaceResult views that index into those
+arrays, so a multi-face frame costs a handful of arrays instead of one
+dict and several array views per face, and results pickle (process
+backend) as a few flat buffers.
+
+The scores normalized per face (`probabilities`) and the lead of an
+emotion over the others (`margin`) let callers decide on a single frame
+instead of waiting for the confidence to cross a threshold.
+
+Serializers read the arrays directly: `landmark_buffer()` exposes the
+landmarks as a memoryview without copying, and `xy_lists()` converts all
+faces' x, y coordinates to lists in one call.
+"""
+
+import numpy as np
+
+from landmark_codec import face_bboxes
+
+# Emotions scored by the default classifier, in score column order; on equal
+# scores the first one wins
+EMOTIONS = ('happy', 'angry', 'neutral')
+
+# Facial features EmotionDetector measures per face, in feature column order
+FEATURE_NAMES = ('mouth_curvature', 'mouth_width', 'mouth_height', 'eyebrow_distance', 'eye_ratio', 'mouth_openness')
+
+# Key points reported with every face, in KEYPOINT_NAMES order (the mesh has
+# no eye centers, so the outer eye corners stand in for them)
+KEYPOINT_NAMES = ('right_eye', 'left_eye', 'nose_tip', 'mouth_right', 'mouth_left', 'chin')
+KEYPOINT_LANDMARKS = np.array([33, 263, 1, 61, 291, 152])
+
+# Confidence above which a detected emotion counts as shown
+MATCH_CONFIDENCE = 0.6
+
+# Lead in probability over every other emotion with which a detected emotion
+# counts as shown, even below MATCH_CONFIDENCE
+MATCH_MARGIN = 0.5
+
+# Probabilities are normalized, so an emotion that is the only one scored
+# leads by 1.0 however weak it is; a margin match also needs this confidence
+MATCH_MARGIN_MIN_CONFIDENCE = 0.5
+
+
+def is_clear_match(confidence, margin):
+    """Whether a detection is clear enough to count as the player showing the emotion.
+
+    Either its confidence is above MATCH_CONFIDENCE, or it leads the other
+    emotions by MATCH_MARGIN and its confidence reaches MATCH_MARGIN_MIN_CONFIDENCE.
+    """
+    confidence = confidence or 0.0
+    if confidence > MATCH_CONFIDENCE:
+        return True
+    return (margin or 0.0) >= MATCH_MARGIN and confidence >= MATCH_MARGIN_MIN_CONFIDENCE
+
+
+def score_probabilities(scores):
+    """Normalize (F, E) emotion scores so each face's scores sum to 1 (all zero if it has none)."""
+    scores = np.asarray(scores, dtype=np.float32)
+    totals = scores.sum(axis=1, keepdims=True)
+    return np.divide(scores, totals, out=np.zeros_like(scores), where=totals > 0)
+
+
+def probability_margins(probabilities, emotion_indices):
+    """Per face, how far the probability of emotion_indices[i] leads the best other emotion.
+
+    Negative when another emotion is more likely.
+    """
+    faces = np.arange(len(probabilities))
+    chosen = probabilities[faces, emotion_indices]
+    others = probabilities.copy()
+    others[faces, emotion_indices] = -np.inf
+    return chosen - others.max(axis=1)
+
+
+class FaceResult:
+    """One face of a FrameResult; its arrays are views into the frame's arrays."""
+
+    __slots__ = ('frame', 'index')
+
+    def __init__(self, frame, index):
+        self.frame = frame
+        self.index = index
+
+    @property
+    def points(self):
+        """(N, 3) normalized landmarks."""
+        return self.frame.points[self.index]
+
+    @property
+    def bbox(self):
+        """Normalized [x_min, y_min, x_max, y_max]."""
+        return self.frame.bboxes[self.index]
+
+    @property
+    def keypoints(self):
+        """(K, 2) normalized x, y of KEYPOINT_LANDMARKS."""
+        return self.frame.keypoints[self.index]
+
+    @property
+    def scores(self):
+        """Emotion scores in the frame's labels order."""
+        return self.frame.scores[self.index]
+
+    @property
+    def probabilities(self):
+        """Emotion probabilities in the frame's labels order (see FrameResult.probabilities)."""
+        return self.frame.probabilities[self.index]
+
+    def margin(self, emotion=None):
+        """Probability lead of `emotion` (default: the face's emotion) over the best other emotion."""
+        return self.frame.margin(self.index, emotion)
+
+    @property
+    def emotion(self):
+        return self.frame.emotions[self.index]
+
+    @property
+    def confidence(self):
+        return self.frame.confidences[self.index]
+
+    def __repr__(self):
+        return f"FaceResult(emotion={self.emotion!r}, confidence={self.confidence:.2f}, bbox={self.bbox.tolist()})"
+
+
+class FrameResult:
+    """All faces detected in one frame, stored as contiguous arrays."""
+
+    __slots__ = ('points', 'bboxes', 'keypoints', 'scores', 'emotions', 'confidences', 'labels')
+
+    def __init__(self, points, scores, emotions, confidences, labels=EMOTIONS):
+        """Build a result from per-face landmarks and classifications.
+
+        Args:
+            points: (F, N, 3) normalized landmarks.
+            scores: (F, len(labels)) emotion scores.
+            emotions: Detected emotion (or None) per face.
+            confidences: Confidence per face.
+            labels: Emotion of each score column (the classifier's emotions).
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float32)
+        self.bboxes = face_bboxes(self.points)
+        if len(self.points):
+            self.keypoints = np.ascontiguousarray(self.points[:, KEYPOINT_LANDMARKS, :2])
+        else:
+            self.keypoints = np.zeros((0, len(KEYPOINT_LANDMARKS), 2), dtype=np.float32)
+        self.labels = tuple(labels)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(len(self.points), len(self.labels))
+        self.emotions = tuple(emotions)
+        self.confidences = tuple(confidences)
+
+    @classmethod
+    def empty(cls, labels=EMOTIONS):
+        """A result without faces."""
+        return cls(np.zeros((0, 0, 3), dtype=np.float32), np.zeros((0, len(labels))), (), (), labels)
+
+    def __len__(self):
+        return len(self.emotions)
+
+    def __iter__(self):
+        for index in range(len(self.emotions)):
+            yield FaceResult(self, index)
+
+    def __getitem__(self, index):
+        if not -len(self.emotions) <= index < len(self.emotions):
+            raise IndexError("face index out of range")
+        return FaceResult(self, index % len(self.emotions))
+
+    def __repr__(self):
+        return f"FrameResult(faces={len(self)}, emotions={self.emotions})"
+
+    @property
+    def probabilities(self):
+        """(F, len(labels)) scores normalized to sum to 1 per face."""
+        return score_probabilities(self.scores)
+
+    @property
+    def primary(self):
+        """Index of the most confident face (the one the frame's emotion comes from), or None."""
+        if not self.emotions:
+            return None
+        return int(np.argmax(self.confidences))
+
+    def margin(self, index, emotion=None):
+        """Probability lead of `emotion` (default: the face's emotion) over the best other emotion.
+
+        0.0 when there is no such emotion.
+        """
+        emotion = emotion or self.emotions[index]
+        if emotion not in self.labels:
+            return 0.0
+        probabilities = score_probabilities(self.scores[index:index + 1])
+        return float(probability_margins(probabilities, [self.labels.index(emotion)])[0])
+
+    @property
+    def num_landmarks(self):
+        """Landmarks per face (0 without faces)."""
+        return self.points.shape[1]
+
+    @property
+    def nbytes(self):
+        """Memory held by the result's arrays."""
+        return self.points.nbytes + self.bboxes.nbytes + self.keypoints.nbytes + self.scores.nbytes
+
+    def landmark_buffer(self):
+        """Zero-copy view of the (F, N, 3) float32 landmarks for binary serialization."""
+        return memoryview(self.points)
+
+    def xy_lists(self):
+        """Per face, a list of [x, y] landmark pairs, converted in one call."""
+        return self.points[:, :, :2].tolist()
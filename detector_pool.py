@@ -0,0 +1,177 @@
+"""
+Bounded pool of EmotionDetector instances for the web server.
+
+Each MediaPipe FaceMesh graph keeps tracking state and must only be used by
+one thread at a time, so concurrent requests check a detector out of the
+pool instead of sharing a single instance. Detectors remember the session
+they last served and are preferentially handed back to that session so
+tracking stays continuous for a player.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from emotion_detector import EmotionDetector
+
+
+# _last_session value of a detector that has not served any frame yet
+_UNUSED = object()
+
+
+class PoolExhausted(RuntimeError):
+    """Raised when no detector becomes available (queue full or timeout)."""
+
+
+class DetectorPool:
+    """Thread-safe bounded pool of emotion detectors with queueing and backpressure."""
+
+    def __init__(self, size=None, max_waiting=None, acquire_timeout=2.0, factory=None):
+        """Initialize the pool.
+
+        Args:
+            size: Maximum number of detector instances (defaults to the CPU count).
+            max_waiting: Maximum number of requests queued for a detector before
+                new requests are rejected immediately (defaults to 2 * size).
+            acquire_timeout: Seconds a queued request waits before giving up.
+            factory: Callable creating a detector (defaults to a camera-less EmotionDetector).
+        """
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.max_waiting = self.size * 2 if max_waiting is None else max_waiting
+        self.acquire_timeout = acquire_timeout
+        self.factory = factory or (lambda: EmotionDetector(use_camera=False))
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._created = 0
+        self._waiting = 0
+        self._in_use = 0
+        self._last_session = {}  # id(detector) -> session key it last served
+
+        # Counters for monitoring
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def waiting(self):
+        """Number of requests currently queued for a detector."""
+        return self._waiting
+
+    @property
+    def in_use(self):
+        """Number of detectors currently checked out."""
+        return self._in_use
+
+    def prewarm(self, count=1):
+        """Create up to `count` detectors ahead of the first request.
+
+        Returns the first idle detector so callers can inspect its capabilities.
+        """
+        with self._cond:
+            missing = min(count, self.size) - self._created
+            self._created += max(0, missing)
+        for _ in range(max(0, missing)):
+            detector = self.factory()
+            with self._cond:
+                self._idle.append(detector)
+                self._cond.notify()
+        with self._cond:
+            return self._idle[0] if self._idle else None
+
+    def _take_idle(self, session_key):
+        """Pop an idle detector, preferring the one that last served this session."""
+        if session_key is not None:
+            for detector in self._idle:
+                if self._last_session.get(id(detector)) == session_key:
+                    self._idle.remove(detector)
+                    return detector
+        return self._idle.popleft() if self._idle else None
+
+    def acquire(self, session_key=None, timeout=None):
+        """Check out a detector, waiting up to `timeout` seconds.
+
+        Raises:
+            PoolExhausted: If the wait queue is full or the timeout expires.
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        create = False
+
+        with self._cond:
+            if not self._idle and self._created >= self.size and self._waiting >= self.max_waiting:
+                self.rejected += 1
+                raise PoolExhausted("Detector queue is full")
+
+            self._waiting += 1
+            try:
+                while True:
+                    detector = self._take_idle(session_key)
+                    if detector is not None:
+                        break
+                    if self._created < self.size:
+                        # Reserve a slot and build the detector outside the lock
+                        self._created += 1
+                        create = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        raise PoolExhausted("Timed out waiting for a detector")
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+        if create:
+            try:
+                detector = self.factory()
+            except Exception:
+                with self._cond:
+                    self._created -= 1
+                    self._in_use -= 1
+                    self._cond.notify()
+                raise
+
+        # A detector that last tracked another stream starts fresh for this one;
+        # frames without a session key always count as another stream
+        previous = self._last_session.get(id(detector), _UNUSED)
+        if previous is not _UNUSED and (session_key is None or previous != session_key):
+            detector.reset_tracking()
+        self._last_session[id(detector)] = session_key
+        return detector
+
+    def release(self, detector):
+        """Return a detector to the pool."""
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(detector)
+            self._cond.notify()
+
+    @contextmanager
+    def detector(self, session_key=None, timeout=None):
+        """Context manager checking a detector out for the duration of a block."""
+        detector = self.acquire(session_key, timeout)
+        try:
+            yield detector
+        finally:
+            self.release(detector)
+
+    def stats(self):
+        """Return a snapshot of pool occupancy and backpressure counters."""
+        with self._cond:
+            return {
+                'size': self.size,
+                'created': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+            }
+
+    def close(self):
+        """Release all idle detectors."""
+        with self._cond:
+            while self._idle:
+                self._idle.popleft().cleanup()
@@ -6,12 +6,265 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import math
+from detection_config import DetectionConfig
+from detection_result import FEATURE_NAMES, FrameResult, score_probabilities
+from rule_classifier import RuleClassifier
+from metrics import metrics
+
+# Landmarks used by the geometric features, gathered with a single fancy index:
+# mouth corners (61, 291), lip centers (13, 14), the six eye-aspect-ratio
+# points of each eye, then eyebrows and upper eyelids (only their y is used)
+FEATURE_LANDMARKS = np.array([
+    61, 291, 13, 14,
+    33, 160, 158, 133, 153, 144,
+    362, 385, 387, 263, 373, 380,
+    70, 63, 105, 66, 107,
+    296, 334, 293, 300, 276,
+    33, 7, 163, 144, 145, 153,
+    362, 382, 381, 380, 374, 373
+])
+PIXEL_POINTS = slice(0, 16)
+BROW_EYE_POINTS = slice(16, 38)
+# Group starts of left brow, right brow, left upper eyelid, right upper eyelid in BROW_EYE_POINTS
+BROW_EYE_GROUPS = np.array([0, 5, 10, 16])
+BROW_EYE_SIZES = np.array([5.0, 5.0, 6.0, 6.0])
+
+# Point pairs (within PIXEL_POINTS) whose distances are needed: mouth width,
+# mouth height, then per eye the two vertical openings and the horizontal width
+DISTANCE_PAIRS = np.array([
+    (0, 1), (2, 3),
+    (5, 9), (11, 15),
+    (6, 8), (12, 14),
+    (4, 7), (10, 13)
+])
+
+# Channel orders detect_emotion accepts; MediaPipe wants RGB
+COLOR_ORDERS = ('bgr', 'rgb')
+
+
+def check_color_order(color):
+    """Raise ValueError for a channel order not in COLOR_ORDERS."""
+    if color not in COLOR_ORDERS:
+        raise ValueError(f"Unknown color order '{color}', expected one of {COLOR_ORDERS}")
+
+# FaceMesh only produces landmarks 468+ (irises) with refine_landmarks=True
+REFINED_LANDMARK_START = 468
+FEATURES_NEED_REFINEMENT = bool(FEATURE_LANDMARKS.max() >= REFINED_LANDMARK_START)
+
+# Plain Python copies for single_face_features
+_DISTANCE_PAIRS = [tuple(pair) for pair in DISTANCE_PAIRS.tolist()]
+_BROW_EYE_BOUNDS = list(zip(BROW_EYE_GROUPS.tolist(), (BROW_EYE_GROUPS + BROW_EYE_SIZES.astype(int)).tolist()))
+
+# Byte layout of a serialized NormalizedLandmarkList whose landmarks carry x, y
+# and z only: per landmark a 2-byte message header plus three tagged floats
+_LANDMARK_RECORD_SIZE = 17
+# (byte within a record, expected value): message tag and length, then the x, y, z field tags
+_LANDMARK_TAGS = ((0, 0x0A), (1, 0x0F), (2, 0x0D), (7, 0x15), (12, 0x1D))
+# Set once a landmark list did not have that layout (warned about once)
+_landmark_layout_changed = False
+
+def single_face_features(xy, h, w):
+    """Feature vector of one face from its FEATURE_LANDMARKS x, y pairs (see extract_features_batch).
+
+    The same arithmetic as the vectorized version, on Python floats.
+    """
+    pixels = [(math.trunc(x * w), math.trunc(y * h)) for x, y in xy[PIXEL_POINTS]]
+    distances = [math.hypot(pixels[a][0] - pixels[b][0], pixels[a][1] - pixels[b][1]) for a, b in _DISTANCE_PAIRS]
+    mouth_width, mouth_height = distances[0], distances[1]
+
+    curve = (pixels[2][1] + pixels[3][1] - pixels[0][1] - pixels[1][1]) / 2
+    curvature = curve / mouth_width if mouth_width > 0 else 0.0
+
+    ys = [y for _, y in xy[BROW_EYE_POINTS]]
+    group_y = [sum(ys[start:end]) / (end - start) * h for start, end in _BROW_EYE_BOUNDS]
+    eyebrow_distance = ((group_y[2] - group_y[0]) + (group_y[3] - group_y[1])) / 2
+
+    ears = [(distances[2 + i] + distances[4 + i]) / (2.0 * distances[6 + i]) if distances[6 + i] > 0 else 0.0
+            for i in (0, 1)]
+    openness = mouth_height / mouth_width if mouth_width > 0 else 0.0
+    return curvature, mouth_width, mouth_height, eyebrow_distance, (ears[0] + ears[1]) / 2, openness
+
+def landmarks_to_array(landmarks):
+    """Convert MediaPipe landmarks to an (N, 3) float32 array of normalized x, y, z.
+
+    Accepts a NormalizedLandmarkList (fast path: the serialized protobuf is
+    read directly with NumPy) or any sequence of objects with x, y, z.
+    Every record's field tags are checked before the bytes are read, so a
+    list with another layout falls back to walking the objects; a warning
+    is printed the first time that is not explained by an omitted 0.0.
+    """
+    global _landmark_layout_changed
+    if hasattr(landmarks, 'landmark') and hasattr(landmarks, 'SerializeToString'):
+        count = len(landmarks.landmark)
+        data = landmarks.SerializeToString()
+        if len(data) == count * _LANDMARK_RECORD_SIZE:
+            # Byte slices compare faster than a NumPy view for a single face
+            if all(data[offset::_LANDMARK_RECORD_SIZE] == bytes((tag,)) * count for offset, tag in _LANDMARK_TAGS):
+                # x, y and z sit 5 bytes apart starting at byte 3 of each record
+                return np.ndarray((count, 3), dtype='<f4', buffer=data, offset=3,
+                                  strides=(_LANDMARK_RECORD_SIZE, 5)).astype(np.float32)
+            unexpected = True
+        else:
+            # Proto3 omits fields that are exactly 0.0, which only makes the list shorter
+            unexpected = len(data) > count * _LANDMARK_RECORD_SIZE
+        if unexpected and not _landmark_layout_changed:
+            _landmark_layout_changed = True
+            print("Warning: MediaPipe landmarks have an unexpected wire layout; using the slower conversion")
+    if hasattr(landmarks, 'landmark'):
+        # Fields were omitted (e.g. an exact 0.0) or extra fields present - walk the objects
+        landmarks = landmarks.landmark
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks], dtype=np.float32).reshape(-1, 3)
+
+
+class RoiFaceMesh:
+    """Face detector + per-face FaceMesh on cropped regions (the 'roi' detection tier).
+
+    The face detector runs every `detect_interval` frames or when a face is
+    lost; in between, each face's crop is derived from its previous
+    landmarks. Every face slot has its own single-face FaceMesh so its
+    tracking state follows one person.
+    """
+
+    def __init__(self, config, refine_landmarks):
+        """Initialize the detector; meshes are created as faces appear."""
+        self.config = config
+        self.refine_landmarks = refine_landmarks
+        self.face_detection = mp.solutions.face_detection.FaceDetection(
+            model_selection=config.detector_model,
+            min_detection_confidence=config.min_detection_confidence
+        )
+        self.meshes = []
+        self.rois = []
+        self.frames_since_detection = 0
+        self.detections = 0
+
+    def _mesh(self, slot):
+        while len(self.meshes) <= slot:
+            self.meshes.append(mp.solutions.face_mesh.FaceMesh(
+                static_image_mode=self.config.static_image_mode,
+                max_num_faces=1,
+                refine_landmarks=self.refine_landmarks,
+                min_detection_confidence=self.config.min_detection_confidence,
+                min_tracking_confidence=self.config.min_tracking_confidence
+            ))
+        return self.meshes[slot]
+
+    def _roi(self, x_min, y_min, x_max, y_max, width, height):
+        """Square pixel region around a normalized box, padded by roi_margin and clipped to the frame."""
+        cx, cy = (x_min + x_max) / 2 * width, (y_min + y_max) / 2 * height
+        half = max((x_max - x_min) * width, (y_max - y_min) * height) * (0.5 + self.config.roi_margin)
+        x0, y0 = max(0, int(cx - half)), max(0, int(cy - half))
+        x1, y1 = min(width, int(cx + half)), min(height, int(cy + half))
+        return (x0, y0, x1, y1) if x1 - x0 >= 16 and y1 - y0 >= 16 else None
+
+    def _detect_rois(self, rgb_frame):
+        """Run the face detector and return ROIs of the most confident faces."""
+        self.detections += 1
+        height, width = rgb_frame.shape[:2]
+        results = self.face_detection.process(rgb_frame)
+        detections = sorted(results.detections or [], key=lambda d: d.score[0], reverse=True)
+        rois = []
+        for detection in detections[:self.config.max_num_faces]:
+            box = detection.location_data.relative_bounding_box
+            roi = self._roi(box.xmin, box.ymin, box.xmin + box.width, box.ymin + box.height, width, height)
+            if roi:
+                rois.append(roi)
+        return rois
+
+    def _assign_slots(self, rois):
+        """Order new ROIs so each keeps the mesh slot of the tracked face it overlaps most.
+
+        Slots that get a different face have their tracking state reset.
+        """
+        def overlap(a, b):
+            w = min(a[2], b[2]) - max(a[0], b[0])
+            h = min(a[3], b[3]) - max(a[1], b[1])
+            return w * h if w > 0 and h > 0 else 0
+
+        slots = [None] * max(len(self.rois), len(rois))
+        unmatched = []
+        for roi in rois:
+            scores = [overlap(roi, old) if old and slots[i] is None else 0 for i, old in enumerate(self.rois)]
+            best = int(np.argmax(scores)) if scores and max(scores) > 0 else None
+            if best is None:
+                unmatched.append(roi)
+            else:
+                slots[best] = roi
+        for roi in unmatched:
+            free = slots.index(None)
+            slots[free] = roi
+            if free < len(self.meshes):
+                self.meshes[free].reset()
+        return slots
+
+    def process(self, rgb_frame):
+        """Return (F, N, 3) normalized landmarks for the faces in an RGB frame."""
+        height, width = rgb_frame.shape[:2]
+        # Without tracking (static_image_mode) every frame gets its own detection
+        if self.config.static_image_mode or not self.rois or \
+                self.frames_since_detection >= self.config.detect_interval:
+            self.rois = self._assign_slots(self._detect_rois(rgb_frame))
+            self.frames_since_detection = 0
+        self.frames_since_detection += 1
+
+        faces = []
+        next_rois = []
+        for slot, roi in enumerate(self.rois):
+            if roi is None:
+                next_rois.append(None)
+                continue
+            x0, y0, x1, y1 = roi
+            results = self._mesh(slot).process(np.ascontiguousarray(rgb_frame[y0:y1, x0:x1]))
+            if not results.multi_face_landmarks:
+                # Lost this face - look for faces again on the next frame
+                next_rois.append(None)
+                self.frames_since_detection = self.config.detect_interval
+                continue
+            # Crop-relative coordinates back to the full frame (z scales with width)
+            points = landmarks_to_array(results.multi_face_landmarks[0])
+            points *= ((x1 - x0) / width, (y1 - y0) / height, (x1 - x0) / width)
+            points[:, 0] += x0 / width
+            points[:, 1] += y0 / height
+            faces.append(points)
+            next_rois.append(self._roi(*points[:, :2].min(axis=0), *points[:, :2].max(axis=0), width, height))
+
+        self.rois = next_rois if any(next_rois) else []
+        if not faces:
+            return np.zeros((0, 0, 3), dtype=np.float32)
+        return np.stack(faces)
+
+    def reset(self):
+        """Forget tracked faces."""
+        self.rois = []
+        for mesh in self.meshes:
+            mesh.reset()
+
+    def close(self):
+        self.face_detection.close()
+        for mesh in self.meshes:
+            mesh.close()
+
 
 class EmotionDetector:
     """Detects facial emotions using MediaPipe face landmarks."""
     
-    def __init__(self):
-        """Initialize the emotion detector."""
+    def __init__(self, use_camera=True, max_num_faces=5, config=None, classifier=None):
+        """Initialize the emotion detector.
+
+        Args:
+            use_camera: Open the default webcam (the web server passes False).
+            max_num_faces: Maximum number of faces tracked per frame (used when
+                no config is given).
+            config: DetectionConfig selecting the detection tier.
+            classifier: Emotion classifier scoring the facial features, a
+                RuleClassifier or LearnedClassifier (default: RuleClassifier
+                with the built-in rules).
+        """
+        self.config = config or DetectionConfig(max_num_faces=max_num_faces)
+        self.classifier = classifier or RuleClassifier()
+        # Iris refinement is only worth its cost if a feature reads iris landmarks
+        refine_landmarks = self.config.refine_landmarks or FEATURES_NEED_REFINEMENT
+        
         # Initialize MediaPipe solutions with proper error handling
         try:
             self.mp_face_mesh = mp.solutions.face_mesh
@@ -26,12 +279,16 @@ class EmotionDetector:
         # Initialize face mesh with error handling
         if self.mp_face_mesh:
             try:
-                self.face_mesh = self.mp_face_mesh.FaceMesh(
-                    max_num_faces=5,
-                    refine_landmarks=True,
-                    min_detection_confidence=0.5,
-                    min_tracking_confidence=0.5
-                )
+                if self.config.tier == 'roi':
+                    self.face_mesh = RoiFaceMesh(self.config, refine_landmarks)
+                else:
+                    self.face_mesh = self.mp_face_mesh.FaceMesh(
+                        static_image_mode=self.config.static_image_mode,
+                        max_num_faces=self.config.max_num_faces,
+                        refine_landmarks=refine_landmarks,
+                        min_detection_confidence=self.config.min_detection_confidence,
+                        min_tracking_confidence=self.config.min_tracking_confidence
+                    )
             except Exception as e:
                 print(f"Warning: Face mesh initialization failed: {e}")
                 self.face_mesh = None
@@ -40,13 +297,14 @@ class EmotionDetector:
         
         # Initialize webcam with fallback for environments without camera
         self.cap = None
-        try:
-            self.cap = cv2.VideoCapture(0)
-            if self.cap.isOpened():
-                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        except Exception:
-            pass
+        if use_camera:
+            try:
+                self.cap = cv2.VideoCapture(0)
+                if self.cap.isOpened():
+                    self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                    self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+            except Exception:
+                pass
         
         # Key facial landmark indices for emotion detection
         self.MOUTH_LANDMARKS = [61, 84, 17, 314, 405, 320, 308, 324, 318]
@@ -55,204 +313,289 @@ class EmotionDetector:
         self.LEFT_EYE = [33, 7, 163, 144, 145, 153, 154, 155, 133, 173, 157, 158, 159, 160, 161, 246]
         self.RIGHT_EYE = [362, 382, 381, 380, 374, 373, 390, 249, 263, 466, 388, 387, 386, 385, 384, 398]
         
+        # Reused for every frame that has to be converted (or packed) before MediaPipe sees it
+        self._rgb_buffer = None
+        
     def calculate_distance(self, point1, point2):
         """Calculate Euclidean distance between two points."""
         return math.sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
     
-    def calculate_mouth_curvature(self, landmarks, image_shape):
-        """Calculate mouth curvature to detect smiles."""
-        h, w = image_shape[:2]
+    def as_points(self, landmarks):
+        """Return landmarks as an (N, 3) array, converting MediaPipe landmark sequences."""
+        if isinstance(landmarks, np.ndarray):
+            return landmarks
+        return landmarks_to_array(landmarks)
+    
+    def extract_features_batch(self, points, image_shape):
+        """Compute facial features for every face in one vectorized pass.
+        
+        Args:
+            points: (F, N, 3) array of normalized landmarks.
+            image_shape: Shape of the frame the landmarks were detected in, or
+                an (F, 2) array of per-face (height, width) when the faces come
+                from frames of different sizes.
         
-        # Get mouth corner and center points
-        left_corner = landmarks[61]  # Left mouth corner
-        right_corner = landmarks[291]  # Right mouth corner
-        top_lip = landmarks[13]  # Top lip center
-        bottom_lip = landmarks[14]  # Bottom lip center
+        Returns:
+            (F, 6) float64 array with columns mouth_curvature, mouth_width,
+            mouth_height, eyebrow_distance, eye_ratio and mouth_openness (see
+            FEATURE_NAMES).
+        """
+        points = np.asarray(points)
+        sizes = np.asarray(image_shape)
+        if len(points) == 1:
+            # A single face is cheaper in plain Python than through ~25 small NumPy calls
+            h, w = (sizes[0] if sizes.ndim == 2 else sizes[:2]).tolist()
+            return np.array([single_face_features(points[0, FEATURE_LANDMARKS, :2].tolist(), h, w)])
+        if sizes.ndim == 2:
+            h = sizes[:, :1].astype(np.float64)
+            scale = sizes[:, np.newaxis, ::-1].astype(np.float64)
+        else:
+            h, w = image_shape[:2]
+            scale = (w, h)
+        selected = points[:, FEATURE_LANDMARKS, :2].astype(np.float64)
+        features = np.zeros((len(selected), len(FEATURE_NAMES)))
         
-        # Convert normalized coordinates to pixel coordinates
-        left_corner = (int(left_corner.x * w), int(left_corner.y * h))
-        right_corner = (int(right_corner.x * w), int(right_corner.y * h))
-        top_lip = (int(top_lip.x * w), int(top_lip.y * h))
-        bottom_lip = (int(bottom_lip.x * w), int(bottom_lip.y * h))
+        # Mouth and eye points in whole pixels (matching the original int() truncation)
+        pixels = np.trunc(selected[:, PIXEL_POINTS] * scale)
+        deltas = pixels[:, DISTANCE_PAIRS[:, 0]] - pixels[:, DISTANCE_PAIRS[:, 1]]
+        distances = np.sqrt(np.einsum('fpk,fpk->fp', deltas, deltas))
+        mouth_width = distances[:, 0]
         
-        # Calculate mouth width and height
-        mouth_width = self.calculate_distance(left_corner, right_corner)
-        mouth_height = self.calculate_distance(top_lip, bottom_lip)
+        # Mouth curvature: lip center y minus corner y (positive = upward curve = smile)
+        curve = (pixels[:, 2, 1] + pixels[:, 3, 1] - pixels[:, 0, 1] - pixels[:, 1, 1]) / 2
+        np.divide(curve, mouth_width, out=features[:, 0], where=mouth_width > 0)
+        features[:, 1:3] = distances[:, 0:2]
         
-        # Calculate curvature (smile detection)
-        mouth_center_y = (top_lip[1] + bottom_lip[1]) / 2
-        corner_avg_y = (left_corner[1] + right_corner[1]) / 2
+        # Eyebrow-eye distance (negative = eyebrows closer to eyes)
+        group_y = np.add.reduceat(selected[:, BROW_EYE_POINTS, 1], BROW_EYE_GROUPS, axis=1) / BROW_EYE_SIZES * h
+        features[:, 3] = ((group_y[:, 2] - group_y[:, 0]) + (group_y[:, 3] - group_y[:, 1])) / 2
         
-        # Positive curvature indicates upward curve (smile)
-        curvature = (mouth_center_y - corner_avg_y) / mouth_width if mouth_width > 0 else 0
+        # Eye aspect ratio: two vertical openings over twice the horizontal width, averaged over both eyes
+        horizontal = distances[:, 6:8]
+        ear = np.zeros_like(horizontal)
+        np.divide(distances[:, 2:4] + distances[:, 4:6], 2.0 * horizontal, out=ear, where=horizontal > 0)
+        features[:, 4] = ear.mean(axis=1)
         
+        # Mouth openness: height over width, independent of the face's size in the frame
+        np.divide(distances[:, 1], mouth_width, out=features[:, 5], where=mouth_width > 0)
+        
+        return features
+    
+    def extract_features(self, landmarks, image_shape):
+        """Compute the facial feature vector for a single face (see extract_features_batch)."""
+        return self.extract_features_batch(self.as_points(landmarks)[np.newaxis], image_shape)[0]
+    
+    def calculate_mouth_curvature(self, landmarks, image_shape):
+        """Calculate mouth curvature to detect smiles."""
+        curvature, mouth_width, mouth_height = self.extract_features(landmarks, image_shape)[:3]
         return curvature, mouth_width, mouth_height
     
     def calculate_eyebrow_position(self, landmarks, image_shape):
         """Calculate eyebrow position to detect anger/surprise."""
-        h, w = image_shape[:2]
-        
-        # Get eyebrow and eye landmarks
-        left_eyebrow_points = [landmarks[i] for i in self.LEFT_EYEBROW]
-        right_eyebrow_points = [landmarks[i] for i in self.RIGHT_EYEBROW]
-        left_eye_points = [landmarks[i] for i in self.LEFT_EYE[:6]]  # Upper eyelid
-        right_eye_points = [landmarks[i] for i in self.RIGHT_EYE[:6]]  # Upper eyelid
-        
-        # Calculate average eyebrow and eye positions
-        left_eyebrow_y = np.mean([p.y for p in left_eyebrow_points]) * h
-        right_eyebrow_y = np.mean([p.y for p in right_eyebrow_points]) * h
-        left_eye_y = np.mean([p.y for p in left_eye_points]) * h
-        right_eye_y = np.mean([p.y for p in right_eye_points]) * h
-        
-        # Calculate eyebrow-eye distance (negative = eyebrows closer to eyes)
-        left_distance = left_eye_y - left_eyebrow_y
-        right_distance = right_eye_y - right_eyebrow_y
-        avg_distance = (left_distance + right_distance) / 2
-        
-        return avg_distance
+        return self.extract_features(landmarks, image_shape)[3]
     
     def calculate_eye_aspect_ratio(self, landmarks, image_shape):
         """Calculate eye aspect ratio for blink/expression detection."""
-        h, w = image_shape[:2]
-        
-        # Left eye landmarks
-        left_eye = [landmarks[i] for i in [33, 160, 158, 133, 153, 144]]
-        # Right eye landmarks  
-        right_eye = [landmarks[i] for i in [362, 385, 387, 263, 373, 380]]
-        
-        def eye_aspect_ratio(eye_landmarks):
-            # Convert to pixel coordinates
-            eye_points = [(int(p.x * w), int(p.y * h)) for p in eye_landmarks]
-            
-            # Calculate vertical distances
-            vertical_1 = self.calculate_distance(eye_points[1], eye_points[5])
-            vertical_2 = self.calculate_distance(eye_points[2], eye_points[4])
-            
-            # Calculate horizontal distance
-            horizontal = self.calculate_distance(eye_points[0], eye_points[3])
-            
-            # Calculate aspect ratio
-            ear = (vertical_1 + vertical_2) / (2.0 * horizontal) if horizontal > 0 else 0
-            return ear
-        
-        left_ear = eye_aspect_ratio(left_eye)
-        right_ear = eye_aspect_ratio(right_eye)
-        
-        return (left_ear + right_ear) / 2
+        return self.extract_features(landmarks, image_shape)[4]
     
-    def classify_emotion(self, landmarks, image_shape):
-        """Classify emotion based on facial landmarks."""
-        if not landmarks:
-            return None, 0.0
+    def score_features_batch(self, features):
+        """Score every emotion for every face in one vectorized pass.
         
-        # Calculate facial features
-        mouth_curvature, mouth_width, mouth_height = self.calculate_mouth_curvature(landmarks, image_shape)
-        eyebrow_distance = self.calculate_eyebrow_position(landmarks, image_shape)
-        eye_ratio = self.calculate_eye_aspect_ratio(landmarks, image_shape)
+        Args:
+            features: (F, len(FEATURE_NAMES)) array from extract_features_batch.
         
-        # Emotion classification logic
-        emotion_scores = {
-            'happy': 0.0,
-            'angry': 0.0,
-            'neutral': 0.0
-        }
-        
-        # Happy emotion indicators
-        if mouth_curvature > 0.02:  # Upward mouth curve
-            emotion_scores['happy'] += 0.6
-        if mouth_curvature > 0.04:  # Strong smile
-            emotion_scores['happy'] += 0.3
-        if eyebrow_distance > 25:  # Relaxed eyebrows
-            emotion_scores['happy'] += 0.1
-        
-        # Angry emotion indicators
-        if mouth_curvature < -0.015:  # Downward mouth curve
-            emotion_scores['angry'] += 0.4
-        if eyebrow_distance < 15:  # Lowered/furrowed eyebrows
-            emotion_scores['angry'] += 0.5
-        if eye_ratio < 0.2:  # Squinted eyes
-            emotion_scores['angry'] += 0.1
+        Returns:
+            (F, len(self.classifier.emotions)) float64 array of emotion
+            scores, columns in the classifier's emotion order.
+        """
+        return self.classifier.score(features)
+    
+    def score_features(self, features):
+        """Score each emotion (in the classifier's order) from a feature vector produced by extract_features."""
+        return self.score_features_batch(features)[0]
+    
+    def classify_scores_batch(self, scores):
+        """Return ([emotion or None], [confidence]) for (F, E) emotion scores from score_features_batch."""
+        return self.classifier.classify(scores)
+    
+    def classify_scores(self, scores):
+        """Return (emotion, confidence) for the emotion scores of one face."""
+        emotions, confidences = self.classify_scores_batch(np.reshape(scores, (1, -1)))
+        return emotions[0], confidences[0]
+    
+    def classify_features(self, features):
+        """Classify emotion from a feature vector produced by extract_features."""
+        return self.classify_scores(self.score_features(features))
+    
+    def classify_emotion(self, landmarks, image_shape, with_scores=False):
+        """Classify emotion based on facial landmarks (MediaPipe landmarks or an (N, 3) array).
         
-        # Neutral emotion (baseline)
-        if abs(mouth_curvature) < 0.02:  # Straight mouth
-            emotion_scores['neutral'] += 0.4
-        if 15 <= eyebrow_distance <= 25:  # Normal eyebrow position
-            emotion_scores['neutral'] += 0.3
-        if 0.2 <= eye_ratio <= 0.35:  # Normal eye opening
-            emotion_scores['neutral'] += 0.3
+        Returns (emotion, confidence), or with with_scores=True
+        (emotion, confidence, probabilities) where probabilities maps every
+        emotion to its share of the face's scores.
+        """
+        if landmarks is None or len(landmarks) == 0:
+            return (None, 0.0, dict.fromkeys(self.classifier.emotions, 0.0)) if with_scores else (None, 0.0)
+        scores = self.score_features(self.extract_features(landmarks, image_shape))
+        emotion, confidence = self.classify_scores(scores)
+        if with_scores:
+            probabilities = score_probabilities(scores[None])[0]
+            return emotion, confidence, dict(zip(self.classifier.emotions, probabilities.tolist()))
+        return emotion, confidence
+    
+    def locate_faces(self, rgb_frame):
+        """Return (F, N, 3) normalized landmarks for the faces in an RGB frame."""
+        if isinstance(self.face_mesh, RoiFaceMesh):
+            return self.face_mesh.process(rgb_frame)
+        results = self.face_mesh.process(rgb_frame)
+        if not results or not results.multi_face_landmarks:
+            return np.zeros((0, 0, 3), dtype=np.float32)
+        return np.stack([landmarks_to_array(face) for face in results.multi_face_landmarks])
+    
+    def rgb_frame(self, frame, color='bgr'):
+        """Return `frame` as a C-contiguous RGB array for MediaPipe.
         
-        # Find dominant emotion
-        if emotion_scores:
-            detected_emotion = max(emotion_scores.keys(), key=lambda x: emotion_scores[x])
-            confidence = emotion_scores[detected_emotion]
+        Contiguous RGB frames are used as they are. BGR frames, and views
+        such as a mirrored frame[:, ::-1], are converted into a buffer this
+        detector reuses, so the result is only valid until the next call.
+        """
+        check_color_order(color)
+        if color == 'rgb' and frame.flags.c_contiguous:
+            return frame
+        if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+            self._rgb_buffer = np.empty(frame.shape, dtype=np.uint8)
+        if color == 'rgb':
+            np.copyto(self._rgb_buffer, frame)
         else:
-            return None, 0.0
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=self._rgb_buffer)
+        return self._rgb_buffer
+    
+    def detect_emotion(self, frame, color='bgr', source_shape=None):
+        """Detect emotion from a video frame, supporting multiple faces.
         
-        # Apply minimum confidence threshold
-        if confidence < 0.3:
-            return None, 0.0
+        Args:
+            frame: uint8 image, in BGR (OpenCV capture) or RGB channel order.
+            color: Channel order of `frame`, 'bgr' or 'rgb'. RGB frames skip
+                the color conversion.
+            source_shape: (height, width) of the frame as captured, when
+                `frame` is a downscaled copy. Pixel-based features are
+                measured at this size, so results do not depend on the
+                resolution the detector ran at.
         
-        return detected_emotion, min(confidence, 1.0)
-    
-    def detect_emotion(self, frame):
-        """Detect emotion from a video frame, supporting multiple faces."""
+        Returns:
+            (best_emotion, best_confidence, faces) where faces is a
+            FrameResult: the landmarks, boxes, key points, emotion scores,
+            emotions and confidences of every face (see detection_result).
+        """
+        check_color_order(color)
         if not self.face_mesh or frame is None:
-            return None, 0.0, []
+            return None, 0.0, FrameResult.empty(self.classifier.emotions)
             
         try:
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = self.face_mesh.process(rgb_frame)
+            with metrics.stage('color_convert'):
+                rgb_frame = self.rgb_frame(frame, color)
+            with metrics.stage('face_mesh'):
+                points = self.locate_faces(rgb_frame)
             
-            if results and results.multi_face_landmarks:
-                all_faces = []
-                best_emotion = None
-                best_confidence = 0.0
-                
-                # Process all detected faces
-                for face_landmarks in results.multi_face_landmarks:
-                    emotion, confidence = self.classify_emotion(face_landmarks.landmark, frame.shape)
-                    
-                    # Store face data
-                    face_data = {
-                        'landmarks': face_landmarks.landmark,
-                        'emotion': emotion,
-                        'confidence': confidence
-                    }
-                    all_faces.append(face_data)
-                    
-                    # Track the most confident emotion
-                    if confidence > best_confidence:
-                        best_emotion = emotion
-                        best_confidence = confidence
-                
-                # Return best emotion and all face landmarks
-                all_landmarks = [face['landmarks'] for face in all_faces]
-                return best_emotion, best_confidence, all_faces
-
+            if len(points):
+                # Compute the features of all faces in one pass
+                with metrics.stage('features'):
+                    features = self.extract_features_batch(points, source_shape or frame.shape)
+                with metrics.stage('classify'):
+                    return self.classify_faces(points, features)
                 
         except Exception as e:
             print(f"Warning: Emotion detection failed: {e}")
         
-        return None, 0.0, []
-
-
-# def draw_face_boxes(self, frame, all_landmarks):
-#     """Draw bounding boxes around detected faces."""
-#     h, w = frame.shape[:2]
+        return None, 0.0, FrameResult.empty(self.classifier.emotions)
+    
+    def classify_faces(self, points, features):
+        """Classify every face and return (best_emotion, best_confidence, FrameResult)."""
+        # Score and classify all detected faces in one pass
+        scores = self.score_features_batch(features)
+        emotions, confidences = self.classify_scores_batch(scores)
+        return self.frame_result(points, scores, emotions, confidences)
     
-#     for face_landmarks in all_landmarks:
-#         xs = [int(lm.x * w) for lm in face_landmarks]
-#         ys = [int(lm.y * h) for lm in face_landmarks]
+    def frame_result(self, points, scores, emotions, confidences):
+        """Return (best_emotion, best_confidence, FrameResult) for one frame's classified faces."""
+        best_emotion = None
+        best_confidence = 0.0
         
-#         if xs and ys:
-#             x_min, x_max = min(xs), max(xs)
-#             y_min, y_max = min(ys), max(ys)
-            
-#             cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), (0, 255, 0), 2)
-#             cv2.putText(frame, "FACE DETECTED", (x_min, y_min - 10),
-#                         cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        # Track the most confident emotion
+        for emotion, confidence in zip(emotions, confidences):
+            if confidence > best_confidence:
+                best_emotion = emotion
+                best_confidence = confidence
+        
+        # Return best emotion and all faces; the result computes every face's geometry at once
+        return best_emotion, best_confidence, FrameResult(points, scores, emotions, confidences, self.classifier.emotions)
+    
+    def detect_emotion_batch(self, frames, color='bgr', source_shapes=None):
+        """Detect emotions in several frames (e.g. from different players).
+        
+        MediaPipe still runs once per frame, but the faces of all frames are
+        converted, measured and classified together in one vectorized pass.
+        All frames share one channel order, `color` ('bgr' or 'rgb');
+        `source_shapes` optionally gives each frame's captured (height, width)
+        (see detect_emotion).
+        
+        Returns:
+            One (best_emotion, best_confidence, faces) tuple per frame, as
+            detect_emotion returns.
+        """
+        check_color_order(color)
+        empty = (None, 0.0, FrameResult.empty(self.classifier.emotions))
+        if not self.face_mesh:
+            return [empty] * len(frames)
+        
+        located = []
+        for frame in frames:
+            points = None
+            if frame is not None:
+                try:
+                    with metrics.stage('color_convert'):
+                        rgb_frame = self.rgb_frame(frame, color)
+                    with metrics.stage('face_mesh'):
+                        points = self.locate_faces(rgb_frame)
+                except Exception as e:
+                    print(f"Warning: Emotion detection failed: {e}")
+            located.append(points if points is not None and len(points) else None)
+        
+        found = [(i, points) for i, points in enumerate(located) if points is not None]
+        if not found:
+            return [empty] * len(frames)
+        
+        points = np.concatenate([points for _, points in found])
+        shapes = [(source_shapes[i] if source_shapes and source_shapes[i] else frames[i].shape)[:2] for i, _ in found]
+        sizes = np.concatenate([np.tile(shape, (len(p), 1)) for shape, (_, p) in zip(shapes, found)])
+        with metrics.stage('features'):
+            features = self.extract_features_batch(points, sizes)
+        
+        results = [empty] * len(frames)
+        start = 0
+        with metrics.stage('classify'):
+            # Every face of every frame in one scoring / classification call, then split per frame
+            scores = self.score_features_batch(features)
+            emotions, confidences = self.classify_scores_batch(scores)
+            for i, frame_points in found:
+                end = start + len(frame_points)
+                results[i] = self.frame_result(
+                    points[start:end], scores[start:end], emotions[start:end], confidences[start:end]
+                )
+                start = end
+        return results
+
+    def reset_tracking(self):
+        """Drop face tracking state so the next frame is treated as a new stream."""
+        if self.face_mesh and hasattr(self.face_mesh, 'reset'):
+            try:
+                self.face_mesh.reset()
+            except Exception as e:
+                print(f"Warning: Face mesh reset failed: {e}")
 
     def cleanup(self):
         """Clean up resources."""
         if self.cap and hasattr(self.cap, 'release'):
             self.cap.release()
+        if self.face_mesh and hasattr(self.face_mesh, 'close'):
+            self.face_mesh.close()
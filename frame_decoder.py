@@ -0,0 +1,152 @@
+"""
+Frame decoding helpers for the web API.
+
+Supports the binary upload path (raw JPEG/WebP request bodies or multipart
+form uploads) as well as the legacy base64 data URL sent inside JSON.
+
+Frames can be decoded straight to RGB (color='rgb'), the channel order
+MediaPipe needs, so the web path never converts a frame to BGR and back.
+With a ResolutionPolicy, large frames are scaled down while they are decoded.
+"""
+
+import cv2
+import numpy as np
+import base64
+import threading
+from io import BytesIO
+from PIL import Image
+from metrics import metrics
+
+# Content types accepted as a raw encoded image body
+BINARY_IMAGE_TYPES = ('image/jpeg', 'image/webp', 'image/png', 'application/octet-stream')
+
+# Refuse uploads larger than this (a 1080p JPEG is usually well under 1 MB)
+MAX_FRAME_BYTES = 8 * 1024 * 1024
+
+
+class FrameTooLarge(ValueError):
+    """Raised when an uploaded frame exceeds MAX_FRAME_BYTES."""
+
+
+class FrameDecoder:
+    """Decodes uploaded frames with cv2.imdecode using per-thread reusable buffers."""
+
+    def __init__(self, max_frame_bytes=MAX_FRAME_BYTES, policy=None):
+        """Initialize the decoder.
+
+        Args:
+            max_frame_bytes: Largest accepted upload.
+            policy: Optional ResolutionPolicy capping the decoded frame size.
+        """
+        self.max_frame_bytes = max_frame_bytes
+        self.policy = policy
+        self._local = threading.local()
+
+    def _buffer(self, size, keep=0):
+        """Return this thread's upload buffer, grown to at least `size` bytes.
+
+        When the buffer has to grow, the first `keep` bytes are carried over.
+        """
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None or len(buffer) < size:
+            # Grow in 64 KB steps so small size changes do not reallocate
+            grown = bytearray((size + 0xFFFF) & ~0xFFFF)
+            if buffer is not None and keep:
+                grown[:keep] = buffer[:keep]
+            buffer = grown
+            self._local.buffer = buffer
+        return buffer
+
+    def read_stream(self, stream, content_length=None):
+        """Read an upload stream into the reusable buffer and return a memoryview of it."""
+        if content_length is not None and content_length > self.max_frame_bytes:
+            raise FrameTooLarge(f"Frame of {content_length} bytes exceeds limit")
+
+        size = content_length if content_length else 256 * 1024
+        buffer = self._buffer(size)
+        view = memoryview(buffer)
+        total = 0
+
+        while True:
+            if total == len(buffer):
+                if content_length or total >= self.max_frame_bytes:
+                    break
+                # Unknown length (e.g. chunked upload) - grow and keep reading
+                buffer = self._buffer(min(total * 2, self.max_frame_bytes), keep=total)
+                view = memoryview(buffer)
+            read = stream.readinto(view[total:])
+            if not read:
+                break
+            total += read
+
+        if content_length is None and total >= self.max_frame_bytes and stream.read(1):
+            raise FrameTooLarge("Frame exceeds upload limit")
+
+        return view[:total]
+
+    def decode_frame(self, data, color='bgr'):
+        """Decode encoded image bytes (bytes, bytearray or memoryview) to a 'bgr' or 'rgb' frame.
+
+        Returns:
+            (frame, source_shape) where source_shape is the (height, width) of
+            the encoded image, which differs from frame.shape when the
+            resolution policy scaled the frame down. (None, None) if the data
+            is not a readable image.
+        """
+        if not data:
+            return None, None
+        flags = cv2.IMREAD_COLOR_RGB if color == 'rgb' else cv2.IMREAD_COLOR
+        reduction, size = 1, None
+        if self.policy is not None:
+            flags, reduction, size = self.policy.decode_flags(data, flags)
+
+        with metrics.stage('decode_image'):
+            frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+            if frame is None:
+                # Formats OpenCV cannot read go through PIL, which decodes to RGB
+                frame = _decode_with_pil(data, color)
+                reduction = 1
+            if frame is None:
+                return None, None
+            source_shape = frame.shape[:2]
+            if reduction > 1:
+                width, height = size
+                # EXIF orientation may have rotated the decoded frame
+                source_shape = (height, width) if (frame.shape[0] > frame.shape[1]) == (height > width) else (width, height)
+            if self.policy is not None:
+                frame = self.policy.fit(frame)
+        return frame, source_shape
+
+    def decode(self, data, color='bgr'):
+        """Decode encoded image bytes to a 'bgr' or 'rgb' frame (None if unreadable)."""
+        return self.decode_frame(data, color)[0]
+
+    def decode_stream(self, stream, content_length=None, color='bgr'):
+        """Read and decode an encoded image from a stream."""
+        return self.decode(self.read_stream(stream, content_length), color)
+
+
+def _decode_with_pil(data, color):
+    try:
+        image = np.asarray(Image.open(BytesIO(data)).convert('RGB'))
+    except Exception:
+        return None
+    if color == 'rgb':
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+
+def data_url_bytes(image_data):
+    """Return the encoded image bytes of a base64 image (optionally a data URL)."""
+    # Remove data URL prefix
+    if ',' in image_data:
+        image_data = image_data.split(',')[1]
+
+    # Decode base64 image
+    with metrics.stage('decode_base64'):
+        return base64.b64decode(image_data)
+
+
+def decode_data_url(image_data, color='bgr'):
+    """Decode a base64 image (optionally a data URL) sent by legacy clients, returning a 'bgr' or 'rgb' frame."""
+    return FrameDecoder().decode(data_url_bytes(image_data), color)
@@ -0,0 +1,102 @@
+"""
+Frame pacing for the desktop game loop.
+
+The scheduler sleeps until the next frame is due instead of spinning, so the
+render loop only uses the CPU it needs and leaves the rest for emotion
+detection. It measures the achieved frame time, jitter and the share of each
+frame spent doing work.
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+
+PACING_MODES = ('sleep', 'deadline')
+
+
+class FrameScheduler:
+    """Sleep-based frame limiter with optional fixed-deadline (vsync-like) scheduling."""
+
+    def __init__(self, fps=30, mode='sleep', spin=0.0, window=300):
+        """Initialize the scheduler.
+
+        Args:
+            fps: Target frames per second.
+            mode: 'sleep' starts each frame at least 1/fps after the previous
+                one; a late frame shifts the schedule. 'deadline' keeps frames
+                on a fixed grid of 1/fps slots, like vsync; a frame that
+                overruns its slot skips to the next one (counted as missed)
+                instead of shifting every later frame.
+            spin: Seconds before a deadline at which to stop sleeping and
+                spin instead, trading a little CPU for lower jitter (0 = never spin).
+            window: Number of recent frames kept for statistics.
+        """
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode '{mode}', expected one of {PACING_MODES}")
+        self.interval = 1.0 / fps
+        self.mode = mode
+        self.spin = spin
+
+        self._next = None
+        self._frame_start = None
+        self._frame_times = deque(maxlen=window)
+        self._work_times = deque(maxlen=window)
+        self.frames = 0
+        self.missed = 0
+
+    def wait(self):
+        """Block until the next frame is due.
+
+        Call once at the top of every loop iteration; the time since the
+        previous call is recorded as that frame's work time.
+        """
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._work_times.append(now - self._frame_start)
+
+        if self._next is None:
+            self._next = now
+        elif now > self._next:
+            if self.mode == 'deadline':
+                # Stay on the grid: like a missed vsync, wait for the next free slot
+                behind = int((now - self._next) / self.interval) + 1
+                self.missed += behind
+                self._next += behind * self.interval
+            else:
+                self._next = now
+
+        delay = self._next - now - self.spin
+        if delay > 0:
+            time.sleep(delay)
+        while time.perf_counter() < self._next:
+            pass
+
+        start = time.perf_counter()
+        if self._frame_start is not None:
+            self._frame_times.append(start - self._frame_start)
+        self._frame_start = start
+        self._next += self.interval
+        self.frames += 1
+
+    def stats(self):
+        """Return measured frame time, jitter and load over recent frames (times in ms)."""
+        frame_times = np.array(self._frame_times)
+        if not len(frame_times):
+            return {'frames': self.frames, 'target_ms': round(self.interval * 1000, 2),
+                    'mean_ms': 0.0, 'jitter_ms': 0.0, 'p95_ms': 0.0, 'fps': 0.0,
+                    'busy': 0.0, 'missed': self.missed}
+        mean = frame_times.mean()
+        work = np.array(self._work_times)
+        return {
+            'frames': self.frames,
+            'target_ms': round(self.interval * 1000, 2),
+            'mean_ms': round(mean * 1000, 2),
+            # Standard deviation of the frame time
+            'jitter_ms': round(frame_times.std() * 1000, 3),
+            'p95_ms': round(float(np.percentile(frame_times, 95)) * 1000, 2),
+            'fps': round(1.0 / mean, 1) if mean > 0 else 0.0,
+            # Fraction of each frame spent working rather than waiting
+            'busy': round(float(work.sum() / frame_times.sum()), 3) if len(work) else 0.0,
+            'missed': self.missed,
+        }
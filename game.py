@@ -8,7 +8,13 @@ import random
 import math
 import numpy as np
 from emotion_detector import EmotionDetector
+from detection_config import DetectionConfig
+from detection_result import is_clear_match
+from rule_classifier import RuleClassifier
+from learned_classifier import LearnedClassifier
 from ui_renderer import UIRenderer
+from capture_pipeline import CapturePipeline
+from frame_scheduler import FrameScheduler
 
 class GameState:
     """Enumeration of game states."""
@@ -19,9 +25,27 @@ class GameState:
 class MoodBlasterGame:
     """Main game class for Mood Blaster facial expression game."""
     
-    def __init__(self):
-        """Initialize the game."""
-        self.emotion_detector = EmotionDetector()
+    def __init__(self, pipelined=False, frame_pacing='sleep', detection_tier='standard', emotion_rules=None,
+                 emotion_model=None):
+        """Initialize the game.
+
+        Args:
+            pipelined: Capture and analyze frames on background threads so
+                rendering is not limited by inference speed.
+            frame_pacing: FrameScheduler mode, 'sleep' or 'deadline'.
+            detection_tier: Detection preset name (see detection_config.DETECTION_TIERS).
+            emotion_rules: JSON rule file for the emotion classifier (see
+                rule_classifier); None uses the built-in rules.
+            emotion_model: Trained model file (see learned_classifier), used
+                instead of the rules.
+        """
+        classifier = None
+        if emotion_model:
+            classifier = LearnedClassifier.load(emotion_model)
+        elif emotion_rules:
+            classifier = RuleClassifier.load(emotion_rules)
+        self.emotion_detector = EmotionDetector(config=DetectionConfig.preset(detection_tier), classifier=classifier)
+        self.pipelined = pipelined
         self.ui_renderer = UIRenderer()
         self.state = GameState.MENU
         
@@ -38,8 +62,8 @@ class MoodBlasterGame:
         self.prompt_duration = 3.0  # Start with 3 seconds
         self.min_prompt_duration = 1.0  # Minimum time for higher levels
         
-        # Emotions list
-        self.emotions = ['happy', 'neutral', 'angry']
+        # Emotions list (every emotion the classifier can report)
+        self.emotions = list(self.emotion_detector.classifier.emotions)
         self.emotion_sequence = []
         self.sequence_index = 0
         
@@ -49,8 +73,8 @@ class MoodBlasterGame:
         self.max_streak = 0
         
         # Game timing
-        self.last_frame_time = time.time()
         self.fps = 30
+        self.frame_pacing = frame_pacing
         
     def generate_new_prompt(self):
         """Generate a new emotion prompt for the player."""
@@ -77,9 +101,14 @@ class MoodBlasterGame:
         level_modifier = max(0.1, 1.0 - (self.level - 1) * 0.15)
         self.prompt_duration = max(self.min_prompt_duration, 3.0 * level_modifier)
     
-    def check_emotion_match(self, detected_emotion, confidence):
-        """Check if the detected emotion matches the target."""
-        if detected_emotion == self.current_target_emotion and confidence > 0.6:
+    def check_emotion_match(self, detected_emotion, confidence, margin=0.0):
+        """Check if the detected emotion matches the target.
+        
+        It matches when it is a clear match: a confidence above 0.6, or a
+        clear lead over every other emotion with a confidence of at least 0.5
+        (see detection_result.is_clear_match).
+        """
+        if detected_emotion == self.current_target_emotion and is_clear_match(confidence, margin):
             # Calculate reaction time
             reaction_time = time.time() - self.prompt_start_time
             
@@ -144,6 +173,10 @@ class MoodBlasterGame:
                 self.demo_emotion = 'angry'
             elif key == ord('n'):
                 self.demo_emotion = 'neutral'
+            elif key == ord('s') and 'surprise' in self.emotions:
+                self.demo_emotion = 'surprise'
+            elif key == ord('d') and 'sad' in self.emotions:
+                self.demo_emotion = 'sad'
         return True
     
     def create_demo_frame(self):
@@ -167,19 +200,58 @@ class MoodBlasterGame:
             return self.demo_emotion, 0.9, None  # High confidence for demo
         return None, 0.0, None
     
+    def apply_detections(self, all_faces):
+        """Check detected faces against the current prompt."""
+        if self.state == GameState.PLAYING and self.current_target_emotion and all_faces:
+            for face in all_faces:
+                if face.emotion and self.check_emotion_match(face.emotion, face.confidence, face.margin()):
+                    self.generate_new_prompt()
+                    break  # Only reward one face per round
+    
+    def render(self, frame, detected_emotion, confidence, all_faces, current_time):
+        """Draw the screen for the current game state."""
+        if self.state == GameState.MENU:
+            frame = self.ui_renderer.render_menu(frame)
+        elif self.state == GameState.PLAYING:
+            time_left = max(0, self.prompt_duration - (current_time - self.prompt_start_time))
+            frame = self.ui_renderer.render_game(
+                frame, 
+                self.current_target_emotion,
+                detected_emotion,
+                confidence,
+                self.score,
+                self.level,
+                self.lives,
+                time_left,
+                all_faces,
+                self.accuracy_streak
+            )
+        elif self.state == GameState.GAME_OVER:
+            avg_reaction_time = sum(self.reaction_times) / len(self.reaction_times) if self.reaction_times else 0
+            frame = self.ui_renderer.render_game_over(
+                frame,
+                self.score,
+                self.level,
+                len(self.reaction_times),
+                avg_reaction_time,
+                self.max_streak
+            )
+        return frame
+    
     def run(self):
         """Main game loop."""
+        if self.pipelined and not self.demo_mode:
+            self.run_pipelined()
+            return
+        
         clock = 0
+        scheduler = FrameScheduler(self.fps, self.frame_pacing)
+        raw_frame = mirrored_frame = None
         
         while True:
+            # Sleep until the next frame is due (caps the frame rate)
+            scheduler.wait()
             current_time = time.time()
-            dt = current_time - self.last_frame_time
-            
-            # Cap frame rate
-            if dt < 1.0 / self.fps:
-                continue
-            
-            self.last_frame_time = current_time
             clock += 1
             
             # Get frame (webcam or demo)
@@ -189,12 +261,13 @@ class MoodBlasterGame:
                 detected_emotion, confidence, all_faces = self.handle_demo_input()
             else:
                 if self.emotion_detector.cap and self.emotion_detector.cap.isOpened():
-                    ret, frame = self.emotion_detector.cap.read()
+                    # Capture into the same buffers every frame instead of allocating new ones
+                    ret, raw_frame = self.emotion_detector.cap.read(raw_frame)
                     if not ret:
                         print("Error: Could not read from webcam")
                         break
                     # Flip frame horizontally for mirror effect
-                    frame = cv2.flip(frame, 1)
+                    frame = mirrored_frame = cv2.flip(raw_frame, 1, dst=mirrored_frame)
                     # Detect emotion
                     detected_emotion, confidence, all_faces = self.emotion_detector.detect_emotion(frame)
                 else:
@@ -205,40 +278,10 @@ class MoodBlasterGame:
             self.update_game()
             
             # Check for emotion match during gameplay
-            if self.state == GameState.PLAYING and self.current_target_emotion and all_faces:
-                for face in all_faces:
-                    if face['emotion'] and self.check_emotion_match(face['emotion'], face['confidence']):
-                        self.generate_new_prompt()
-                        break  # Only reward one face per round
-
+            self.apply_detections(all_faces)
             
             # Render UI
-            if self.state == GameState.MENU:
-                frame = self.ui_renderer.render_menu(frame)
-            elif self.state == GameState.PLAYING:
-                time_left = max(0, self.prompt_duration - (current_time - self.prompt_start_time))
-                frame = self.ui_renderer.render_game(
-                    frame, 
-                    self.current_target_emotion,
-                    detected_emotion,
-                    confidence,
-                    self.score,
-                    self.level,
-                    self.lives,
-                    time_left,
-                    all_faces,
-                    self.accuracy_streak
-                )
-            elif self.state == GameState.GAME_OVER:
-                avg_reaction_time = sum(self.reaction_times) / len(self.reaction_times) if self.reaction_times else 0
-                frame = self.ui_renderer.render_game_over(
-                    frame,
-                    self.score,
-                    self.level,
-                    len(self.reaction_times),
-                    avg_reaction_time,
-                    self.max_streak
-                )
+            frame = self.render(frame, detected_emotion, confidence, all_faces, current_time)
             
             # Show frame
             cv2.imshow('Mood Blaster', frame)
@@ -249,4 +292,76 @@ class MoodBlasterGame:
                 break
         
         # Cleanup
+        self.print_frame_stats(scheduler.stats())
         self.emotion_detector.cleanup()
+    
+    def run_pipelined(self):
+        """Game loop with capture and inference on background threads.
+        
+        The loop renders the newest camera frame at display rate using the
+        latest finished detection, which may lag the frame by an inference.
+        """
+        if not (self.emotion_detector.cap and self.emotion_detector.cap.isOpened()):
+            print("Error: No webcam available")
+            return
+        
+        pipeline = CapturePipeline(self.emotion_detector.cap, self.emotion_detector)
+        pipeline.start()
+        scheduler = FrameScheduler(self.fps, self.frame_pacing)
+        render_counter = pipeline.counters['render']
+        last_result_id = 0
+        detected_emotion, confidence, all_faces = None, 0.0, []
+        
+        try:
+            while pipeline.running:
+                scheduler.wait()
+                current_time = time.time()
+                
+                frame, frame_id = pipeline.latest_frame()
+                if frame is None:
+                    if cv2.waitKey(1) & 0xFF == 27:
+                        break
+                    continue
+                
+                started = time.perf_counter()
+                self.update_game()
+                
+                # Score each detection once, when it is first published
+                result = pipeline.latest_result()
+                if result is not None and result.frame_id != last_result_id:
+                    last_result_id = result.frame_id
+                    detected_emotion, confidence, all_faces = result.emotion, result.confidence, result.faces
+                    self.apply_detections(all_faces)
+                
+                # The inference worker may still be reading this frame, so draw on a copy
+                frame = self.render(frame.copy(), detected_emotion, confidence, all_faces, current_time)
+                cv2.imshow('Mood Blaster', frame)
+                key = cv2.waitKey(1) & 0xFF
+                render_counter.record(time.perf_counter() - started)
+                
+                if not self.handle_input(key):
+                    break
+        finally:
+            pipeline.stop()
+            if pipeline.error:
+                print(f"Error: {pipeline.error}")
+            self.print_pipeline_stats(pipeline.stats())
+            self.print_frame_stats(scheduler.stats())
+            self.emotion_detector.cleanup()
+    
+    @staticmethod
+    def print_pipeline_stats(stats):
+        """Print per-stage latency counters collected by the pipeline."""
+        print("Pipeline stage latency (ms):")
+        for stage in ('capture', 'inference', 'result_age', 'render'):
+            counter = stats[stage]
+            print(f"  {stage:<11} n={counter['count']:<6} mean={counter['mean_ms']:<7} "
+                  f"p50={counter['p50_ms']:<7} p95={counter['p95_ms']:<7} max={counter['max_ms']}")
+        print(f"  frames not analyzed: {stats['frames_skipped']}")
+    
+    @staticmethod
+    def print_frame_stats(stats):
+        """Print the frame pacing measured by the FrameScheduler."""
+        print(f"Frame time: mean={stats['mean_ms']}ms (target {stats['target_ms']}ms, {stats['fps']} fps), "
+              f"jitter={stats['jitter_ms']}ms, p95={stats['p95_ms']}ms, "
+              f"busy={stats['busy'] * 100:.0f}%, missed deadlines={stats['missed']}")
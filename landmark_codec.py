@@ -0,0 +1,93 @@
+"""
+Compact encodings of face landmarks for API responses.
+
+The browser only needs a bounding box per face to draw its overlay, so the
+compact response format sends server-computed boxes and, on request, a
+packed float16 array of selected landmarks instead of one JSON object per
+landmark.
+"""
+
+import base64
+import numpy as np
+
+
+def face_bboxes(points):
+    """Compute normalized [x_min, y_min, x_max, y_max] boxes.
+
+    Args:
+        points: Array of shape (F, N, 2+) or a list of (N, 2+) arrays.
+
+    Returns:
+        (F, 4) float32 array.
+    """
+    if isinstance(points, (list, tuple)):
+        if not points:
+            return np.zeros((0, 4), dtype=np.float32)
+        points = np.stack(points)
+    if len(points) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+    xy = points[..., :2]
+    return np.concatenate([xy.min(axis=1), xy.max(axis=1)], axis=1)
+
+
+def parse_landmark_indices(value, num_landmarks):
+    """Parse a comma separated landmark index list (e.g. "61,291,13,14").
+
+    `num_landmarks` is the number of landmarks per face; None (a frame
+    without faces) only rejects negative indices.
+
+    Raises:
+        ValueError: If an index is not an integer or is out of range.
+    """
+    if not value:
+        return None
+    indices = np.array([int(v) for v in value.split(',') if v.strip()], dtype=np.intp)
+    if indices.size and indices.min() < 0:
+        raise ValueError("Landmark indices must not be negative")
+    if indices.size and num_landmarks is not None and indices.max() >= num_landmarks:
+        raise ValueError(f"Landmark indices must be in [0, {num_landmarks})")
+    return indices
+
+
+def pack_landmarks(points, indices):
+    """Pack the x, y coordinates of selected landmarks as base64 float16.
+
+    Args:
+        points: (F, N, 2+) landmark array.
+        indices: Landmark indices to include.
+
+    Returns:
+        JSON-ready dict describing the packed (F, K, 2) little-endian array.
+    """
+    subset = np.ascontiguousarray(points[:, indices, :2], dtype='<f2')
+    return {
+        'indices': indices.tolist(),
+        'dtype': 'float16',
+        'shape': list(subset.shape),
+        'data': base64.b64encode(subset.data).decode('ascii'),
+    }
+
+
+def compact_faces(points, emotions, confidences, landmark_indices=None, bboxes=None):
+    """Build the compact per-face response payload.
+
+    Args:
+        points: (F, N, 2+) landmark array.
+        emotions: Detected emotion for each face.
+        confidences: Confidence for each face.
+        landmark_indices: Optional landmark indices to pack for the client.
+        bboxes: (F, 4) boxes already computed by the detector; computed from
+            `points` when omitted.
+    """
+    if bboxes is None:
+        bboxes = face_bboxes(points)
+    bboxes = np.round(np.asarray(bboxes, dtype=np.float64), 4).tolist()
+    payload = {
+        'faces': [
+            {'bbox': bbox, 'emotion': emotion, 'confidence': confidence}
+            for bbox, emotion, confidence in zip(bboxes, emotions, confidences)
+        ]
+    }
+    if landmark_indices is not None and len(points):
+        payload['landmarks'] = pack_landmarks(points, landmark_indices)
+    return payload
@@ -0,0 +1,185 @@
+"""
+Learned emotion classifier on facial features.
+
+A small NumPy network maps the standardized facial features (see
+detection_result.FEATURE_NAMES) to emotion probabilities: softmax
+(multinomial logistic) regression, or with `hidden` units one ReLU layer
+before it. Models are trained offline from labeled frames
+(benchmarks/train_classifier.py) and stored as .npz files holding the
+weights, the feature standardization and the emotion names.
+
+At load time the standardization is folded into the first layer's
+weights, so scoring a batch of faces is two or three matrix products and
+a softmax, whatever the number of faces. LearnedClassifier has the same
+interface as rule_classifier.RuleClassifier (emotions, score, classify)
+and can be passed to EmotionDetector in its place; its scores are the
+probabilities themselves.
+"""
+
+import numpy as np
+
+from detection_result import FEATURE_NAMES
+from rule_classifier import classify_top_scores
+
+# Lowest probability with which a face gets an emotion
+DEFAULT_MIN_CONFIDENCE = 0.4
+
+
+def softmax(logits):
+    """Row-wise softmax of (F, E) logits, in place."""
+    logits -= logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+
+class LearnedClassifier:
+    """Softmax regression or one-hidden-layer MLP over standardized facial features."""
+
+    def __init__(self, emotions, weights, biases, mean, scale, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        """Wrap trained parameters.
+
+        Args:
+            emotions: Emotion of each output column.
+            weights: Per layer (inputs, outputs) weight matrices, one or two
+                layers; hidden layers use ReLU.
+            biases: Per layer bias vectors.
+            mean: Feature means subtracted before the first layer.
+            scale: Feature standard deviations the features are divided by.
+            min_confidence: Lowest top probability with which a face gets an emotion.
+
+        Raises:
+            ValueError: If the layer shapes do not fit the features and emotions.
+        """
+        self.emotions = tuple(emotions)
+        self.min_confidence = float(min_confidence)
+        self.weights = [np.asarray(w, dtype=np.float64) for w in weights]
+        self.biases = [np.asarray(b, dtype=np.float64) for b in biases]
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+
+        if not 1 <= len(self.weights) <= 2 or len(self.weights) != len(self.biases):
+            raise ValueError("Expected one or two layers with one bias vector each")
+        if self.weights[0].shape[0] != len(FEATURE_NAMES) or self.mean.shape != (len(FEATURE_NAMES),):
+            raise ValueError(f"The first layer must take the {len(FEATURE_NAMES)} features {FEATURE_NAMES}")
+        if self.weights[-1].shape[1] != len(self.emotions):
+            raise ValueError("The last layer must have one output per emotion")
+
+        # (x - mean) / scale @ W + b == x @ (W / scale) + (b - (mean / scale) @ W)
+        first = self.weights[0] / self.scale[:, np.newaxis]
+        self._layers = [(first, self.biases[0] - self.mean @ first)] + list(zip(self.weights[1:], self.biases[1:]))
+
+    @property
+    def hidden(self):
+        """Hidden units (0 for softmax regression)."""
+        return self.weights[0].shape[1] if len(self.weights) == 2 else 0
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with save()."""
+        with np.load(path, allow_pickle=False) as data:
+            layers = int(data['layers'])
+            feature_names = tuple(data['feature_names'].tolist())
+            if feature_names != FEATURE_NAMES:
+                raise ValueError(f"{path} was trained on features {feature_names}, expected {FEATURE_NAMES}")
+            return cls(
+                emotions=data['emotions'].tolist(),
+                weights=[data[f'w{i}'] for i in range(layers)],
+                biases=[data[f'b{i}'] for i in range(layers)],
+                mean=data['mean'],
+                scale=data['scale'],
+                min_confidence=float(data['min_confidence'])
+            )
+
+    def save(self, path):
+        """Write the model to an .npz file."""
+        arrays = {f'w{i}': w for i, w in enumerate(self.weights)}
+        arrays.update({f'b{i}': b for i, b in enumerate(self.biases)})
+        np.savez(
+            path, layers=len(self.weights), emotions=np.array(self.emotions), feature_names=np.array(FEATURE_NAMES),
+            mean=self.mean, scale=self.scale, min_confidence=self.min_confidence, **arrays
+        )
+
+    def __repr__(self):
+        return f"LearnedClassifier(hidden={self.hidden}, emotions={self.emotions})"
+
+    def score(self, features):
+        """Return (F, len(emotions)) emotion probabilities for (F, len(FEATURE_NAMES)) features."""
+        x = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))
+        (w, b), *rest = self._layers
+        x = x @ w + b
+        for w, b in rest:
+            np.maximum(x, 0.0, out=x)
+            x = x @ w + b
+        return softmax(x)
+
+    def classify(self, scores):
+        """Return ([emotion or None], [confidence]) for (F, len(emotions)) probabilities."""
+        return classify_top_scores(scores, self.emotions, self.min_confidence)
+
+    @classmethod
+    def train(cls, features, labels, emotions, hidden=0, epochs=2000, learning_rate=0.05, l2=1e-3,
+              min_confidence=DEFAULT_MIN_CONFIDENCE, seed=0):
+        """Fit a model to labeled features with full-batch Adam on the cross-entropy loss.
+
+        Args:
+            features: (F, len(FEATURE_NAMES)) training features.
+            labels: Index into `emotions` of every face's label.
+            emotions: Emotion names, one output each.
+            hidden: Hidden ReLU units; 0 trains softmax regression.
+            epochs: Gradient steps over the whole training set.
+            learning_rate: Adam step size.
+            l2: Weight decay on the weight matrices.
+            min_confidence: Stored with the model (see __init__).
+            seed: Seed of the weight initialization.
+
+        Classes are weighted by their inverse frequency, so a rare emotion
+        is not ignored in favor of a common one.
+        """
+        x = np.asarray(features, dtype=np.float64)
+        labels = np.asarray(labels)
+        mean = x.mean(axis=0)
+        scale = x.std(axis=0)
+        scale[scale < 1e-9] = 1.0
+        x = (x - mean) / scale
+
+        targets = np.zeros((len(x), len(emotions)))
+        targets[np.arange(len(x)), labels] = 1.0
+        counts = np.maximum(targets.sum(axis=0), 1.0)
+        sample_weights = (len(x) / (len(emotions) * counts))[labels][:, np.newaxis] / len(x)
+
+        rng = np.random.default_rng(seed)
+        sizes = [x.shape[1]] + ([hidden] if hidden else []) + [len(emotions)]
+        params = []
+        for fan_in, fan_out in zip(sizes[:-1], sizes[1:]):
+            params.append(rng.normal(0.0, np.sqrt(2.0 / fan_in), (fan_in, fan_out)))
+            params.append(np.zeros(fan_out))
+        moments = [np.zeros_like(p) for p in params]
+        velocities = [np.zeros_like(p) for p in params]
+        beta1, beta2, eps = 0.9, 0.999, 1e-8
+
+        for step in range(1, epochs + 1):
+            # Forward pass, keeping the activations of every layer
+            activations = [x]
+            for i in range(0, len(params), 2):
+                out = activations[-1] @ params[i] + params[i + 1]
+                if i + 2 < len(params):
+                    out = np.maximum(out, 0.0)
+                activations.append(out)
+            probabilities = softmax(activations[-1].copy())
+
+            # Backward pass
+            delta = (probabilities - targets) * sample_weights
+            grads = [None] * len(params)
+            for i in range(len(params) - 2, -1, -2):
+                grads[i] = activations[i // 2].T @ delta + l2 * params[i]
+                grads[i + 1] = delta.sum(axis=0)
+                if i:
+                    delta = (delta @ params[i].T) * (activations[i // 2] > 0)
+
+            for p, g, m, v in zip(params, grads, moments, velocities):
+                m += (1 - beta1) * (g - m)
+                v += (1 - beta2) * (g * g - v)
+                p -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+
+        return cls(emotions, params[0::2], params[1::2], mean, scale, min_confidence)
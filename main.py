@@ -4,15 +4,36 @@ Mood Blaster - Webcam Facial Expression Game
 Main entry point for the game application.
 """
 
+import argparse
 import cv2
 import sys
 from game import MoodBlasterGame
+from frame_scheduler import PACING_MODES
+from detection_config import DETECTION_TIERS
 
 def main():
     """Main entry point for the Mood Blaster game."""
+    parser = argparse.ArgumentParser(description="Mood Blaster - webcam facial expression game")
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Capture and analyze frames on background threads so rendering '
+                             'runs at display rate instead of inference rate')
+    parser.add_argument('--frame-pacing', choices=PACING_MODES, default='sleep',
+                        help="'sleep' waits at least one frame interval between frames; "
+                             "'deadline' keeps frames on a fixed vsync-like schedule")
+    parser.add_argument('--detection-tier', choices=sorted(DETECTION_TIERS), default='standard',
+                        help="Face detection preset: 'kiosk' for a single player, "
+                             "'room' for several faces at varying distance")
+    parser.add_argument('--emotion-rules', metavar='FILE',
+                        help='JSON emotion rule file, e.g. emotion_rules.json to add surprise and sad')
+    parser.add_argument('--emotion-model', metavar='FILE',
+                        help='Trained emotion model (.npz from benchmarks/train_classifier.py) used instead of the rules')
+    args = parser.parse_args()
+    
     try:
         # Initialize the game
-        game = MoodBlasterGame()
+        game = MoodBlasterGame(pipelined=args.pipelined, frame_pacing=args.frame_pacing,
+                               detection_tier=args.detection_tier, emotion_rules=args.emotion_rules,
+                               emotion_model=args.emotion_model)
         
         # Check if webcam is available
         if not game.emotion_detector.cap or not game.emotion_detector.cap.isOpened():
@@ -21,6 +42,10 @@ def main():
             print("- Press 'h' for happy emotion")
             print("- Press 'a' for angry emotion") 
             print("- Press 'n' for neutral emotion")
+            if 'surprise' in game.emotions:
+                print("- Press 's' for surprise emotion")
+            if 'sad' in game.emotions:
+                print("- Press 'd' for sad emotion")
             print("- SPACE: Start game / Restart")
             print("- ESC: Quit game")
             game.demo_mode = True
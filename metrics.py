@@ -0,0 +1,174 @@
+"""
+Low-overhead stage timing for frame analysis.
+
+Code wraps each stage of a frame's analysis (decoding, color conversion,
+FaceMesh, feature extraction, classification, response building) in
+`with metrics.stage('name'):`. Every measurement goes into a fixed-bucket
+histogram per stage, exported in the Prometheus text format by
+/metrics. While a request is being handled (begin_request/end_request),
+the stages timed on that thread are also collected for the request's
+Server-Timing header.
+
+Timing a stage costs two perf_counter calls and one locked bucket
+increment. Stages that run somewhere else (process backend workers, or
+another request's thread when frames are batched) are counted in the
+histograms, but not in the Server-Timing header of the request that waited
+for them.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Histogram bucket upper bounds in seconds (0.1 ms .. 2.5 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    """Thread-safe cumulative histogram of durations in seconds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self):
+        """Return (cumulative bucket counts, sum, count)."""
+        with self._lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        cumulative = []
+        running = 0
+        for value in counts:
+            running += value
+            cumulative.append(running)
+        return cumulative, total, count
+
+
+class RequestTimings:
+    """Stage durations of one request, in the order they finished."""
+
+    __slots__ = ('entries', 'started')
+
+    def __init__(self):
+        self.entries = []
+        self.started = time.perf_counter()
+
+    def add(self, name, seconds):
+        self.entries.append((name, seconds))
+
+    def header(self, total=True):
+        """Format the timings as a Server-Timing header value (milliseconds)."""
+        totals = {}
+        for name, seconds in self.entries:
+            totals[name] = totals.get(name, 0.0) + seconds
+        parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in totals.items()]
+        if total:
+            parts.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ', '.join(parts)
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class StageMetrics:
+    """Per-stage duration histograms plus per-request timing collection."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._requests = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _histogram(self, table, name):
+        histogram = table.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = table.setdefault(name, Histogram(self.buckets))
+        return histogram
+
+    def stage(self, name):
+        """Context manager timing one stage."""
+        return _StageTimer(self, name)
+
+    def record(self, name, seconds):
+        """Record a stage duration measured by the caller."""
+        self._histogram(self._stages, name).observe(seconds)
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings.add(name, seconds)
+
+    def begin_request(self):
+        """Start collecting stage timings for the request handled by this thread."""
+        timings = self._local.timings = RequestTimings()
+        return timings
+
+    def end_request(self, endpoint=None):
+        """Stop collecting and return this thread's RequestTimings (None if none were started).
+
+        With an endpoint name the request's total duration is recorded in the
+        request histogram.
+        """
+        timings = getattr(self._local, 'timings', None)
+        self._local.timings = None
+        if timings is not None and endpoint:
+            self._histogram(self._requests, endpoint).observe(time.perf_counter() - timings.started)
+        return timings
+
+    def stats(self):
+        """Return per-stage count and mean duration (ms)."""
+        result = {}
+        for name, histogram in sorted(self._stages.items()):
+            _, total, count = histogram.snapshot()
+            result[name] = {'count': count, 'mean_ms': round(total / count * 1000, 3) if count else 0.0}
+        return result
+
+    def render_prometheus(self, prefix='moodblaster', gauges=None):
+        """Render the histograms (and optional {name: value} gauges) in the Prometheus text format."""
+        lines = []
+        for metric, label, table, description in (
+            ('stage_seconds', 'stage', self._stages, 'Time spent in each frame analysis stage'),
+            ('request_seconds', 'endpoint', self._requests, 'Request handling time per endpoint'),
+        ):
+            name = f"{prefix}_{metric}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, histogram in sorted(table.items()):
+                cumulative, total, count = histogram.snapshot()
+                for bound, value in zip(self.buckets, cumulative):
+                    lines.append(f'{name}_bucket{{{label}="{key}",le="{bound}"}} {value}')
+                lines.append(f'{name}_bucket{{{label}="{key}",le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'{name}_sum{{{label}="{key}"}} {total:.6f}')
+                lines.append(f'{name}_count{{{label}="{key}"}} {count}')
+        for gauge, (value, description) in (gauges or {}).items():
+            name = f"{prefix}_{gauge}"
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+# Shared by the detector, the frame decoder and the web app
+metrics = StageMetrics()
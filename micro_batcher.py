@@ -0,0 +1,141 @@
+"""
+Micro-batching of frames from different players.
+
+Request threads hand their frame to MicroBatcher.submit. The first thread to
+arrive becomes the batch leader: it waits up to max_wait for more frames (or
+until max_batch_size are queued), takes one detector from the pool, runs
+EmotionDetector.detect_emotion_batch on the whole batch and hands every
+waiting thread its own result. Frames that arrive while a batch runs form
+the next batch, led by the oldest of them, which keeps collecting frames
+while it waits for a free detector.
+"""
+
+import threading
+import time
+
+
+class _PendingFrame:
+    __slots__ = ('frame', 'source_shape', 'result', 'error', 'leader', 'finished', 'wake')
+
+    def __init__(self, frame, source_shape):
+        self.frame = frame
+        self.source_shape = source_shape
+        self.result = None
+        self.error = None
+        self.leader = False
+        self.finished = False
+        self.wake = threading.Event()
+
+
+class MicroBatcher:
+    """Collects frames submitted by concurrent requests and analyzes them in batches."""
+
+    def __init__(self, pool, max_batch_size=8, max_wait=0.008, color='bgr'):
+        """Initialize the batcher.
+
+        Args:
+            pool: DetectorPool supplying detectors. Batches mix streams, so its
+                detectors should not track faces between frames
+                (DetectionConfig.static_image_mode).
+            max_batch_size: Most frames analyzed in one batch.
+            max_wait: Seconds the leader waits for a batch to fill up.
+            color: Channel order of the submitted frames ('bgr' or 'rgb').
+        """
+        self.pool = pool
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.color = color
+        self._queue = []
+        self._collecting = False
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.frames = 0
+
+    def submit(self, frame, source_shape=None):
+        """Analyze a frame as part of the next batch and return its (emotion, confidence, faces).
+
+        `source_shape` is the frame's captured (height, width) if it was
+        downscaled (see EmotionDetector.detect_emotion).
+
+        Raises:
+            PoolExhausted: If no detector became available for the batch.
+        """
+        item = _PendingFrame(frame, source_shape)
+        with self._cond:
+            self._queue.append(item)
+            if not self._collecting:
+                self._collecting = True
+                item.leader = True
+            elif len(self._queue) >= self.max_batch_size:
+                self._cond.notify_all()
+
+        while not item.finished:
+            if item.leader:
+                item.leader = False
+                self._run_batch()
+            else:
+                item.wake.wait()
+                item.wake.clear()
+
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _run_batch(self):
+        """Collect a batch (leader only), analyze it and wake every frame's thread."""
+        deadline = time.monotonic() + self.max_wait
+        # Frames keep queueing while the leader waits for a free detector
+        detector, error = None, None
+        try:
+            detector = self.pool.acquire()
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            while detector is not None and len(self._queue) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._queue[:self.max_batch_size]
+            del self._queue[:self.max_batch_size]
+            # Frames left over lead the next batch while this one runs
+            successor = self._queue[0] if self._queue else None
+            if successor is not None:
+                successor.leader = True
+            else:
+                self._collecting = False
+            self.batches += 1
+            self.frames += len(batch)
+        if successor is not None:
+            successor.wake.set()
+
+        try:
+            if error is not None:
+                raise error
+            results = detector.detect_emotion_batch(
+                [item.frame for item in batch], self.color, [item.source_shape for item in batch]
+            )
+            for item, result in zip(batch, results):
+                item.result = result
+        except Exception as e:
+            for item in batch:
+                item.error = e
+        finally:
+            if detector is not None:
+                self.pool.release(detector)
+            for item in batch:
+                item.finished = True
+                item.wake.set()
+
+    def stats(self):
+        """Return batch counters."""
+        with self._cond:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': round(self.max_wait * 1000, 2),
+                'batches': self.batches,
+                'frames': self.frames,
+                'mean_batch_size': round(self.frames / self.batches, 2) if self.batches else 0.0,
+                'queued': len(self._queue),
+            }
@@ -0,0 +1,164 @@
+"""
+Server-advertised pacing for client frame capture.
+
+Every analyze_frame response tells the client how busy the server is (frames
+in progress, recent processing latency) and how often it should send the next
+frame, at what JPEG quality and (max_frame_side) at most at what size.
+Clients keep at most one frame in flight and follow that advice, so a
+loaded server slows capture down instead of receiving a backlog of stale
+frames.
+
+Frames may carry a per-stream sequence number. When a newer frame from the
+same stream has arrived, older ones still waiting for a detector are dropped
+instead of analyzed.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class PacingController:
+    """Tracks server load and per-stream frame sequence numbers, and turns them into pacing advice."""
+
+    def __init__(self, capacity=1, min_interval_ms=200, max_interval_ms=2000,
+                 max_quality=0.8, min_quality=0.5, smoothing=0.2,
+                 stream_window=5.0, max_streams=1000, max_frame_side=None):
+        """Initialize the controller.
+
+        Args:
+            capacity: Frames the server analyzes in parallel (detector pool size).
+            min_interval_ms: Fastest capture interval ever advised.
+            max_interval_ms: Slowest capture interval ever advised.
+            max_quality: JPEG quality advised while frames are not queueing.
+            min_quality: JPEG quality advised under heavy queueing.
+            smoothing: Weight of the newest sample in the latency moving average.
+            stream_window: Seconds after its last frame that a stream still counts as active.
+            max_streams: Sequence numbers remembered (least recently used streams are forgotten).
+            max_frame_side: Longest frame side the server analyzes; advised so
+                clients capture no larger than that (None = no limit).
+        """
+        self.capacity = max(1, capacity)
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+        self.smoothing = smoothing
+        self.stream_window = stream_window
+        self.max_streams = max_streams
+        self.max_frame_side = max_frame_side
+
+        self._lock = threading.Lock()
+        self._inflight = 0
+        self._latency = None
+        # stream key -> [latest sequence number, last frame time]
+        self._streams = OrderedDict()
+        self.superseded = 0
+        self.stale = 0
+
+    @contextmanager
+    def track(self, stream, seq=None):
+        """Count a frame as in progress for the duration of the block.
+
+        Yields False instead of True when the frame is already older than the
+        newest frame seen from the same stream. Frames already passed to
+        register() are tracked without their seq.
+        """
+        fresh = self.register(stream, seq)
+        with self._lock:
+            self._inflight += 1
+        try:
+            yield fresh
+        finally:
+            with self._lock:
+                self._inflight -= 1
+
+    def register(self, stream, seq=None):
+        """Record a frame arriving for `stream`; return False if a newer one was already seen.
+
+        Frames without a stream (None) are never sequenced or counted as a stream.
+        """
+        if stream is None:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            entry = self._streams.get(stream)
+            if entry is None:
+                entry = self._streams[stream] = [None, now]
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(stream)
+            entry[1] = now
+            if seq is None:
+                return True
+            if entry[0] is not None and seq <= entry[0]:
+                self.stale += 1
+                return False
+            entry[0] = seq
+            return True
+
+    def is_superseded(self, stream, seq):
+        """Return True if a newer frame than `seq` has arrived for `stream` (and count the drop)."""
+        if seq is None:
+            return False
+        with self._lock:
+            entry = self._streams.get(stream)
+            if entry is None or entry[0] is None or entry[0] <= seq:
+                return False
+            self.superseded += 1
+            return True
+
+    def record_latency(self, seconds):
+        """Fold one frame's processing time into the latency moving average."""
+        with self._lock:
+            if self._latency is None:
+                self._latency = seconds
+            else:
+                self._latency += self.smoothing * (seconds - self._latency)
+
+    def active_streams(self, now=None):
+        """Count streams that sent a frame within the last stream_window seconds."""
+        cutoff = (now or time.monotonic()) - self.stream_window
+        with self._lock:
+            return sum(1 for _, last_frame in self._streams.values() if last_frame >= cutoff)
+
+    def advice(self):
+        """Return the pacing fields added to every analyze_frame response."""
+        streams = max(1, self.active_streams())
+        with self._lock:
+            inflight = self._inflight
+            latency_ms = (self._latency or 0.0) * 1000
+
+        # Share the detectors evenly: with S streams on C detectors each stream
+        # may send one frame every latency * S / C.
+        interval = latency_ms * streams / self.capacity
+        # Frames waiting for a detector mean the estimate is running behind
+        waiting = max(0, inflight - self.capacity)
+        interval *= 1 + waiting / self.capacity
+        interval = min(self.max_interval_ms, max(self.min_interval_ms, interval))
+
+        # Smaller uploads decode faster, so trade quality for latency as frames queue
+        load = min(1.0, waiting / self.capacity)
+        quality = self.max_quality - (self.max_quality - self.min_quality) * load
+
+        advice = {
+            'queue_depth': inflight,
+            'latency_ms': round(latency_ms, 1),
+            'interval_ms': int(interval),
+            'jpeg_quality': round(quality, 2),
+        }
+        if self.max_frame_side:
+            advice['max_frame_side'] = self.max_frame_side
+        return advice
+
+    def stats(self):
+        """Return pacing counters for monitoring."""
+        stats = self.advice()
+        stats.update({
+            'active_streams': self.active_streams(),
+            'superseded': self.superseded,
+            'stale': self.stale,
+        })
+        return stats
@@ -0,0 +1,283 @@
+"""
+Multiprocess inference backend for the web server.
+
+ProcessDetector stands in for an EmotionDetector but runs the real detector
+(its own FaceMesh graph) in a worker process, so feature extraction,
+classification and the Python glue around MediaPipe are not serialized by
+the web server's GIL. DetectorPool hands these proxies out exactly like
+in-process detectors, so one worker process serves one request at a time.
+
+Frames do not travel through the pipe. Each worker has a FrameRing, a shared
+memory buffer of fixed-size frame slots. The parent copies decoded frames
+into the ring, and the worker reads them in place. Only slot numbers, shapes
+and the (small) results are pickled.
+
+A worker that crashes, or does not answer within the request timeout, is
+replaced by a fresh process. The request it was handling fails with
+WorkerCrashed. Errors raised by the detector itself are sent back and
+re-raised in the parent; the worker keeps running.
+"""
+
+import multiprocessing
+import pickle
+import threading
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Largest frame carried through shared memory (bigger frames are pickled)
+DEFAULT_SLOT_BYTES = 1920 * 1080 * 3
+DEFAULT_SLOTS = 2
+DEFAULT_REQUEST_TIMEOUT = 10.0
+DEFAULT_START_TIMEOUT = 60.0
+WORKER_PROCESS_NAME = 'emotion-worker'
+
+
+class WorkerCrashed(RuntimeError):
+    """Raised when the worker process died or hung while handling a request."""
+
+
+def in_worker_process():
+    """Return True inside a worker process, including while it re-imports the main module.
+
+    Spawned workers import the parent's main module (as __mp_main__); module
+    level code must not start workers of its own when this returns True.
+    """
+    return multiprocessing.current_process().name == WORKER_PROCESS_NAME
+
+
+class FrameRing:
+    """Ring of fixed-size uint8 frame slots in a shared memory block."""
+
+    def __init__(self, slots=DEFAULT_SLOTS, slot_bytes=DEFAULT_SLOT_BYTES, name=None):
+        """Create a ring (name=None) or attach to an existing one by name."""
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self._next = 0
+
+    def fits(self, frame):
+        return frame.dtype == np.uint8 and frame.nbytes <= self.slot_bytes
+
+    def write(self, frame):
+        """Copy a frame into the next slot and return its (slot, shape) descriptor."""
+        slot = self._next
+        self._next = (self._next + 1) % self.slots
+        self.view(slot, frame.shape)[...] = frame
+        return slot, frame.shape
+
+    def view(self, slot, shape):
+        """Return an ndarray over a slot (no copy)."""
+        return np.ndarray(shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _picklable_error(error):
+    """Return `error`, or a RuntimeError describing it if it cannot be sent through the pipe."""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _worker_main(conn, ring_name, slots, slot_bytes, tier, overrides, classifier):
+    """Worker process: own an EmotionDetector and serve requests from the pipe."""
+    # Imported here so the parent never builds a MediaPipe graph of its own
+    from emotion_detector import EmotionDetector
+    from detection_config import DetectionConfig
+
+    # Spawned workers share the parent's resource tracker, which forgets the
+    # block when the parent unlinks it
+    ring = FrameRing(slots, slot_bytes, name=ring_name)
+
+    detector = EmotionDetector(use_camera=False, config=DetectionConfig.preset(tier, **overrides), classifier=classifier)
+    conn.send(('ready', bool(detector.face_mesh)))
+
+    try:
+        while True:
+            try:
+                kind, payload = conn.recv()
+            except EOFError:
+                break
+            if kind == 'stop':
+                break
+            # A request that fails (e.g. a bad color order) is answered with
+            # its error; only a dead or hung worker gets replaced
+            try:
+                if kind == 'detect':
+                    items, color, source_shapes = payload
+                    frames = [ring.view(*item) if isinstance(item, tuple) else item for item in items]
+                    if len(frames) == 1:
+                        results = [detector.detect_emotion(frames[0], color, source_shapes[0])]
+                    else:
+                        results = detector.detect_emotion_batch(frames, color, source_shapes)
+                elif kind == 'reset':
+                    detector.reset_tracking()
+                    results = None
+                else:
+                    raise ValueError(f"Unknown request {kind!r}")
+            except Exception as e:
+                conn.send(('error', _picklable_error(e)))
+            else:
+                conn.send(('ok', results))
+    finally:
+        detector.cleanup()
+        ring.close()
+
+
+class ProcessDetector:
+    """EmotionDetector proxy whose detector lives in a worker process.
+
+    Like an in-process detector it must be used by one thread at a time
+    (DetectorPool guarantees this).
+    """
+
+    def __init__(self, tier='standard', overrides=None, classifier=None, slots=DEFAULT_SLOTS,
+                 slot_bytes=DEFAULT_SLOT_BYTES, request_timeout=DEFAULT_REQUEST_TIMEOUT,
+                 start_timeout=DEFAULT_START_TIMEOUT):
+        """Start the worker process.
+
+        Args:
+            tier: Detection preset name (see detection_config.DETECTION_TIERS).
+            overrides: DetectionConfig fields overriding the preset.
+            classifier: Emotion classifier for the worker's detector (pickled
+                to the worker; default: the built-in rules).
+            slots: Frames the shared memory ring holds (the largest batch sent at once).
+            slot_bytes: Size of one slot; larger frames are pickled instead.
+            request_timeout: Seconds to wait for a result before the worker is
+                considered hung and replaced.
+            start_timeout: Seconds to wait for a new worker to load MediaPipe.
+        """
+        self.tier = tier
+        self.overrides = overrides or {}
+        self.classifier = classifier
+        self.request_timeout = request_timeout
+        self.start_timeout = start_timeout
+        self.ring = FrameRing(slots, slot_bytes)
+        self.restarts = 0
+        self.pickled_frames = 0
+        self.process = None
+        self.conn = None
+        # Worker processes are spawned: forking a server that runs MediaPipe and thread pools is unsafe
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.Lock()
+        try:
+            self.face_mesh = self._start()
+        except Exception:
+            self.ring.close()
+            raise
+
+    def _start(self):
+        """Launch a worker process and wait until its detector is ready.
+
+        Returns whether MediaPipe is available in the worker.
+        """
+        parent_conn, child_conn = self._context.Pipe()
+        self.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.ring.name, self.ring.slots, self.ring.slot_bytes, self.tier, self.overrides,
+                  self.classifier),
+            name=WORKER_PROCESS_NAME,
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        if not self.conn.poll(self.start_timeout):
+            self._stop_process()
+            raise WorkerCrashed("Worker process did not start")
+        try:
+            kind, available = self.conn.recv()
+        except EOFError:
+            self._stop_process()
+            raise WorkerCrashed("Worker process exited during startup")
+        return available
+
+    def _stop_process(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        if self.process is not None:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(timeout=5)
+            self.process = None
+
+    def _restart(self):
+        print(f"Warning: Restarting crashed emotion worker (pid {self.process.pid if self.process else '?'})")
+        self._stop_process()
+        self.restarts += 1
+        self.face_mesh = self._start()
+
+    def _call(self, kind, payload=None):
+        """Send one request and wait for its reply, replacing the worker if it fails.
+
+        Errors raised while the worker handled the request are re-raised here.
+        """
+        with self._lock:
+            try:
+                self.conn.send((kind, payload))
+                if not self.conn.poll(self.request_timeout):
+                    raise TimeoutError
+                status, result = self.conn.recv()
+            except (EOFError, OSError, TimeoutError) as e:
+                self._restart()
+                raise WorkerCrashed(f"Emotion worker failed ({type(e).__name__})") from e
+        if status == 'error':
+            raise result
+        return result
+
+    def _frame_payload(self, frames):
+        payload = []
+        for frame in frames:
+            if frame is not None and self.ring.fits(frame):
+                payload.append(self.ring.write(frame))
+            else:
+                if frame is not None:
+                    self.pickled_frames += 1
+                payload.append(frame)
+        return payload
+
+    def detect_emotion(self, frame, color='bgr', source_shape=None):
+        """Detect emotion in a frame (see EmotionDetector.detect_emotion)."""
+        return self._call('detect', (self._frame_payload([frame]), color, [source_shape]))[0]
+
+    def detect_emotion_batch(self, frames, color='bgr', source_shapes=None):
+        """Detect emotions in several frames (see EmotionDetector.detect_emotion_batch)."""
+        results = []
+        # Never send more frames at once than the ring has slots
+        source_shapes = source_shapes or [None] * len(frames)
+        for start in range(0, len(frames), self.ring.slots):
+            end = start + self.ring.slots
+            results.extend(self._call('detect', (self._frame_payload(frames[start:end]), color, source_shapes[start:end])))
+        return results
+
+    def reset_tracking(self):
+        """Drop the worker detector's tracking state."""
+        try:
+            self._call('reset')
+        except WorkerCrashed as e:
+            print(f"Warning: {e}")
+
+    def cleanup(self):
+        """Stop the worker process and free the shared memory."""
+        with self._lock:
+            if self.conn is not None:
+                try:
+                    self.conn.send(('stop', None))
+                except OSError:
+                    pass
+            if self.process is not None:
+                self.process.join(timeout=5)
+            self._stop_process()
+            self.ring.close()
@@ -0,0 +1,119 @@
+"""
+Inference resolution policy for uploaded frames.
+
+FaceMesh runs its face detector on a 128x128 copy of the frame and its
+landmark model on a 192x192 crop per face, so frames much larger than a
+few hundred pixels cost decode and resize time without helping accuracy.
+ResolutionPolicy caps the long side of the frames the detector sees.
+
+JPEG frames are shrunk while they are decoded: OpenCV's IMREAD_REDUCED_*
+modes decode at 1/2, 1/4 or 1/8 scale and skip most of the IDCT work.
+Only a frame that is still well above the target afterwards is resized.
+The image size is read from the file header (image_size) to pick the
+reduction before decoding.
+
+Landmarks are normalized, so downscaling does not move them. The
+classifier's pixel-based features are measured at the frame's size as
+captured (see EmotionDetector.detect_emotion's source_shape), so results do
+not depend on the inference resolution.
+"""
+
+import struct
+
+import cv2
+
+# IMREAD_REDUCED_COLOR_* variants per reduction factor
+REDUCED_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...) carry the image size
+_JPEG_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+
+
+def image_size(data):
+    """Return (width, height) of an encoded JPEG or PNG image from its header, or None.
+
+    Only the header is read; the image is not decoded.
+    """
+    data = memoryview(data)
+    if len(data) >= 24 and data[:8] == b'\x89PNG\r\n\x1a\n':
+        width, height = struct.unpack('>II', data[16:24])
+        return width, height
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte
+            offset += 1
+            continue
+        if marker == 0xD8 or 0xD0 <= marker <= 0xD7:
+            # Markers without a length field
+            offset += 2
+            continue
+        length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        if marker == 0xDA:
+            # Start of scan without a frame header
+            return None
+        offset += 2 + length
+    return None
+
+
+class ResolutionPolicy:
+    """Caps the resolution of the frames handed to the detector."""
+
+    def __init__(self, max_side=640, tolerance=1.25):
+        """Initialize the policy.
+
+        Args:
+            max_side: Longest side, in pixels, of a frame given to the detector.
+            tolerance: A frame may exceed max_side by this factor before it is
+                resized; a reduced JPEG decode that lands in that range is
+                used as it is instead of being resized a second time.
+        """
+        self.max_side = max_side
+        self.tolerance = tolerance
+
+    def target_size(self, width, height):
+        """Return the (width, height) a width x height frame is scaled to (never upscaled)."""
+        scale = min(1.0, self.max_side / max(width, height, 1))
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    def reduction(self, width, height):
+        """Return the largest decode reduction (1, 2, 4 or 8) that keeps the long side >= max_side."""
+        factor = 1
+        for candidate in (2, 4, 8):
+            if max(width, height) / candidate >= self.max_side:
+                factor = candidate
+        return factor
+
+    def decode_flags(self, data, flags):
+        """Return (imdecode flags, reduction, (width, height) or None) for an encoded image.
+
+        `flags` are the full-size flags (IMREAD_COLOR, optionally | IMREAD_COLOR_RGB).
+        """
+        size = image_size(data)
+        if size is None:
+            return flags, 1, None
+        factor = self.reduction(*size)
+        if factor == 1:
+            return flags, 1, size
+        return (flags & ~cv2.IMREAD_COLOR) | REDUCED_FLAGS[factor], factor, size
+
+    def fit(self, frame):
+        """Resize a decoded frame that is still too large; smaller frames are returned unchanged."""
+        height, width = frame.shape[:2]
+        if max(width, height) <= self.max_side * self.tolerance:
+            return frame
+        # Area averaging only pays off when shrinking by 2x or more; it is much slower for small ratios
+        ratio = max(width, height) / self.max_side
+        interpolation = cv2.INTER_AREA if ratio >= 2 else cv2.INTER_LINEAR
+        return cv2.resize(frame, self.target_size(width, height), interpolation=interpolation)
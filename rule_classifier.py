@@ -0,0 +1,169 @@
+"""
+Table-driven emotion classification.
+
+Each rule adds a weight to one emotion's score when a facial feature (see
+detection_result.FEATURE_NAMES) lies in a range:
+
+    {"emotion": "happy", "feature": "mouth_curvature", "above": 0.02, "weight": 0.6}
+
+Bounds are `above` (>), `below` (<), `min` (>=) and `max` (<=), in any
+combination; `"abs": true` compares the feature's absolute value. A rule
+set is loaded from a JSON file:
+
+    {"emotions": ["happy", "angry", "neutral", "surprise"],
+     "min_confidence": 0.3,
+     "rules": [...]}
+
+The emotion list gives the score column order (and wins ties, first one
+first); emotions named only by rules are appended to it.
+
+RuleClassifier compiles the rules into arrays: the feature each rule reads,
+its lower and upper bounds and an (R, E) weight matrix. Scoring a batch of
+faces evaluates every rule at once and multiplies the (F, R) matches with
+the weight matrix, so more rules or emotions add columns, not Python work
+per face. Without a rule file the built-in DEFAULT_RULES reproduce the
+original hand-written classifier.
+"""
+
+import json
+
+import numpy as np
+
+from detection_result import EMOTIONS, FEATURE_NAMES
+
+# Bound keys of a rule: (lower or upper bound, strict comparison)
+BOUNDS = {'above': ('lower', True), 'min': ('lower', False), 'below': ('upper', True), 'max': ('upper', False)}
+
+# Scores are sums of weights such as 0.6 + 0.3; rounding drops the float noise
+# so equal rule matches give equal scores whatever order they are summed in
+SCORE_DECIMALS = 9
+
+DEFAULT_MIN_CONFIDENCE = 0.3
+
+DEFAULT_RULES = (
+    # Happy emotion indicators
+    {'emotion': 'happy', 'feature': 'mouth_curvature', 'above': 0.02, 'weight': 0.6},  # Upward mouth curve
+    {'emotion': 'happy', 'feature': 'mouth_curvature', 'above': 0.04, 'weight': 0.3},  # Strong smile
+    {'emotion': 'happy', 'feature': 'eyebrow_distance', 'above': 25, 'weight': 0.1},  # Relaxed eyebrows
+
+    # Angry emotion indicators
+    {'emotion': 'angry', 'feature': 'mouth_curvature', 'below': -0.015, 'weight': 0.4},  # Downward mouth curve
+    {'emotion': 'angry', 'feature': 'eyebrow_distance', 'below': 15, 'weight': 0.5},  # Lowered/furrowed eyebrows
+    {'emotion': 'angry', 'feature': 'eye_ratio', 'below': 0.2, 'weight': 0.1},  # Squinted eyes
+
+    # Neutral emotion (baseline)
+    {'emotion': 'neutral', 'feature': 'mouth_curvature', 'abs': True, 'below': 0.02, 'weight': 0.4},  # Straight mouth
+    {'emotion': 'neutral', 'feature': 'eyebrow_distance', 'min': 15, 'max': 25, 'weight': 0.3},  # Normal eyebrow position
+    {'emotion': 'neutral', 'feature': 'eye_ratio', 'min': 0.2, 'max': 0.35, 'weight': 0.3},  # Normal eye opening
+)
+
+
+def classify_top_scores(scores, emotions, min_confidence):
+    """Return ([emotion or None], [confidence]) for (F, len(emotions)) scores.
+
+    Each face gets its highest scoring emotion (the first in `emotions` on
+    ties) if that score reaches min_confidence; confidences are capped at 1.
+    """
+    scores = np.asarray(scores)
+    best = np.argmax(scores, axis=1)
+    top = scores[np.arange(len(scores)), best]
+    labels = [emotions[index] if value >= min_confidence else None for index, value in zip(best.tolist(), top.tolist())]
+    confidences = [min(value, 1.0) if value >= min_confidence else 0.0 for value in top.tolist()]
+    return labels, confidences
+
+
+class RuleClassifier:
+    """Scores emotions from facial features with a compiled rule table."""
+
+    def __init__(self, rules=DEFAULT_RULES, emotions=EMOTIONS, min_confidence=DEFAULT_MIN_CONFIDENCE):
+        """Compile a rule table.
+
+        Args:
+            rules: Rule dicts (see the module docstring).
+            emotions: Score column order; emotions only named by rules follow.
+            min_confidence: Lowest top score with which a face gets an emotion.
+
+        Raises:
+            ValueError: If a rule names an unknown feature or bound, has no
+                bound or has a weight that is not positive.
+        """
+        rules = list(rules)
+        emotions = list(emotions)
+        for rule in rules:
+            if rule.get('emotion') and rule['emotion'] not in emotions:
+                emotions.append(rule['emotion'])
+        self.emotions = tuple(emotions)
+        self.min_confidence = float(min_confidence)
+        self.rules = tuple(dict(rule) for rule in rules)
+
+        count = len(rules)
+        self.features = np.zeros(count, dtype=np.intp)
+        self.absolute = np.zeros(count, dtype=bool)
+        self.lower = np.full(count, -np.inf)
+        self.upper = np.full(count, np.inf)
+        self.lower_strict = np.zeros(count, dtype=bool)
+        self.upper_strict = np.zeros(count, dtype=bool)
+        self.weights = np.zeros((count, len(self.emotions)))
+
+        for i, rule in enumerate(rules):
+            unknown = set(rule) - set(BOUNDS) - {'emotion', 'feature', 'abs', 'weight'}
+            if unknown:
+                raise ValueError(f"Rule {i}: unknown keys {sorted(unknown)}")
+            if rule.get('emotion') not in self.emotions:
+                raise ValueError(f"Rule {i}: no emotion given")
+            if rule.get('feature') not in FEATURE_NAMES:
+                raise ValueError(f"Rule {i}: unknown feature {rule.get('feature')!r}, expected one of {FEATURE_NAMES}")
+            if not set(rule) & set(BOUNDS):
+                raise ValueError(f"Rule {i}: needs at least one of {sorted(BOUNDS)}")
+            weight = float(rule.get('weight', 0))
+            if weight <= 0:
+                raise ValueError(f"Rule {i}: weight must be positive")
+
+            self.features[i] = FEATURE_NAMES.index(rule['feature'])
+            self.absolute[i] = bool(rule.get('abs', False))
+            for key, (side, strict) in BOUNDS.items():
+                if key in rule:
+                    getattr(self, side)[i] = float(rule[key])
+                    getattr(self, side + '_strict')[i] = strict
+            self.weights[i, self.emotions.index(rule['emotion'])] = weight
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a classifier from a parsed rule file."""
+        return cls(
+            rules=config.get('rules', ()),
+            emotions=config.get('emotions', ()),
+            min_confidence=config.get('min_confidence', DEFAULT_MIN_CONFIDENCE)
+        )
+
+    @classmethod
+    def load(cls, path):
+        """Load a JSON rule file (see the module docstring)."""
+        with open(path) as f:
+            return cls.from_config(json.load(f))
+
+    def __repr__(self):
+        return f"RuleClassifier(rules={len(self.rules)}, emotions={self.emotions})"
+
+    def matches(self, features):
+        """Return the (F, R) boolean matrix of which rules hold for which face."""
+        values = np.asarray(features, dtype=np.float64).reshape(-1, len(FEATURE_NAMES))[:, self.features]
+        values = np.where(self.absolute, np.abs(values), values)
+        above = np.where(self.lower_strict, values > self.lower, values >= self.lower)
+        below = np.where(self.upper_strict, values < self.upper, values <= self.upper)
+        return above & below
+
+    def score(self, features):
+        """Score every emotion for every face.
+
+        Args:
+            features: (F, len(FEATURE_NAMES)) feature array.
+
+        Returns:
+            (F, len(emotions)) float64 array of summed rule weights.
+        """
+        return np.round(self.matches(features) @ self.weights, SCORE_DECIMALS)
+
+    def classify(self, scores):
+        """Return ([emotion or None], [confidence]) for (F, len(emotions)) scores."""
+        return classify_top_scores(scores, self.emotions, self.min_confidence)
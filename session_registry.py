@@ -0,0 +1,106 @@
+"""
+Registry of per-player game sessions for the web server.
+
+Sessions are keyed by an opaque random token (sent as a cookie or header)
+and kept in least-recently-used order, so lookups are O(1) and idle
+sessions can be evicted from the cold end without scanning.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+
+class SessionLimitReached(RuntimeError):
+    """Raised when a new session is requested while the registry is full of active sessions."""
+
+
+class SessionRegistry:
+    """Thread-safe, bounded map of session tokens to session state objects."""
+
+    def __init__(self, factory, max_sessions=500, idle_timeout=900.0):
+        """Initialize the registry.
+
+        Args:
+            factory: Callable creating the state object for a new session. The
+                object must allow setting a `last_seen` attribute.
+            max_sessions: Maximum number of concurrent sessions.
+            idle_timeout: Seconds without requests after which a session is evicted.
+        """
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict_idle(self, now):
+        """Drop sessions idle for longer than idle_timeout (oldest first). Caller holds the lock."""
+        cutoff = now - self.idle_timeout
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if session.last_seen >= cutoff:
+                break
+            del self._sessions[token]
+            self.evicted += 1
+
+    def get(self, token):
+        """Return the session for a token (refreshing its idle timer), or None."""
+        if not token:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if session.last_seen < now - self.idle_timeout:
+                del self._sessions[token]
+                self.evicted += 1
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(token)
+            return session
+
+    def create(self):
+        """Create a new session and return (token, session).
+
+        Raises:
+            SessionLimitReached: If max_sessions active sessions already exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitReached("Too many active sessions")
+            token = secrets.token_urlsafe(16)
+            session = self.factory()
+            session.last_seen = now
+            self._sessions[token] = session
+            return token, session
+
+    def get_or_create(self, token):
+        """Return (token, session, created) for an existing or newly created session."""
+        session = self.get(token)
+        if session is not None:
+            return token, session, False
+        token, session = self.create()
+        return token, session, True
+
+    def remove(self, token):
+        """Forget a session."""
+        with self._lock:
+            self._sessions.pop(token, None)
+
+    def stats(self):
+        """Return session counts."""
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            return {
+                'active': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'evicted': self.evicted,
+            }
@@ -0,0 +1,179 @@
+"""
+Per-stream reuse of detection results for near-identical frames.
+
+Consecutive webcam frames usually differ by little more than sensor noise.
+TemporalCache keeps a tiny downsampled signature of each stream's last
+analyzed frame. When no pixel of a new frame's signature differs from the
+previous one by more than the threshold, the previous result is returned
+without running the detector. The largest difference is used rather than
+the mean: an expression change moves only the few signature pixels around
+the mouth and eyes, which barely shifts the mean over the whole frame.
+Reuse is bounded by age and by the number of consecutive hits, so a result
+is never older than max_age.
+
+Each stream's primary emotion is also smoothed (EMA plus hysteresis), so a
+single noisy frame does not make the detected emotion flicker.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class EmotionSmoother:
+    """Exponential moving average of emotion scores with hysteresis on the reported emotion."""
+
+    def __init__(self, smoothing=0.6, hysteresis=0.1, min_confidence=0.3):
+        """Initialize the smoother.
+
+        Args:
+            smoothing: Weight of the newest observation (1.0 = no smoothing).
+            hysteresis: Margin by which another emotion's score must exceed the
+                current one before the reported emotion switches.
+            min_confidence: Smoothed scores below this report no emotion.
+        """
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.min_confidence = min_confidence
+        self.scores = {}
+        self.current = None
+
+    def update(self, emotion, confidence):
+        """Fold in one observation and return the smoothed (emotion, confidence)."""
+        # The first observation seeds the average instead of being damped towards zero
+        weight = self.smoothing if self.scores else 1.0
+        if emotion and emotion not in self.scores:
+            self.scores[emotion] = 0.0
+        for name in self.scores:
+            observed = confidence if name == emotion else 0.0
+            self.scores[name] += weight * (observed - self.scores[name])
+
+        if self.scores:
+            best = max(self.scores, key=self.scores.get)
+            if self.current is None or self.scores[best] > self.scores[self.current] + self.hysteresis:
+                self.current = best
+
+        score = self.scores.get(self.current, 0.0)
+        if score < self.min_confidence:
+            return None, 0.0
+        return self.current, score
+
+
+class _StreamEntry:
+    __slots__ = ('signature', 'result', 'stored_at', 'reused', 'smoother')
+
+    def __init__(self, smoother):
+        self.signature = None
+        self.result = None
+        self.stored_at = 0.0
+        self.reused = 0
+        self.smoother = smoother
+
+
+class TemporalCache:
+    """Thread-safe per-stream cache of the last detection result, keyed by frame similarity."""
+
+    def __init__(self, threshold=5.0, max_age=0.5, max_reuse=5, signature_size=(64, 48),
+                 smoothing=0.6, hysteresis=0.1, min_confidence=0.3, max_streams=1000):
+        """Initialize the cache.
+
+        Args:
+            threshold: Largest absolute difference (0-255 gray levels) of any
+                signature pixel up to which a frame counts as unchanged (0
+                disables reuse). Sensor noise stays within about 5 at 64x48.
+            max_age: Seconds after which a result is never reused.
+            max_reuse: Consecutive frames that may reuse one result.
+            signature_size: (width, height) of the downsampled signature.
+            smoothing: EmotionSmoother weight of the newest observation.
+            hysteresis: EmotionSmoother switching margin.
+            min_confidence: Smoothed score below which no emotion is reported
+                (the classifier's own threshold).
+            max_streams: Streams remembered (least recently used are forgotten).
+        """
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_reuse = max_reuse
+        self.signature_size = signature_size
+        self.smoothing = smoothing
+        self.hysteresis = hysteresis
+        self.min_confidence = min_confidence
+        self.max_streams = max_streams
+
+        self._streams = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def signature(self, frame, color='bgr'):
+        """Downsample a 'bgr' or 'rgb' frame to a small grayscale int16 image."""
+        small = cv2.resize(frame, self.signature_size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY if color == 'rgb' else cv2.COLOR_BGR2GRAY)
+        return small.astype(np.int16)
+
+    def lookup(self, stream, signature):
+        """Return the cached result for `stream` if `signature` matches its last frame, else None."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._streams.get(stream)
+            if entry is None or entry.signature is None or self.threshold <= 0:
+                self.misses += 1
+                return None
+            self._streams.move_to_end(stream)
+
+            if entry.signature.shape != signature.shape or \
+                    np.abs(entry.signature - signature).max() > self.threshold:
+                self.misses += 1
+                return None
+            if now - entry.stored_at > self.max_age or entry.reused >= self.max_reuse:
+                # Unchanged, but too old to trust
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            entry.reused += 1
+            self.hits += 1
+            return entry.result
+
+    def store(self, stream, signature, emotion, confidence, faces):
+        """Record a fresh detection for `stream` and return the smoothed (emotion, confidence, faces)."""
+        with self._lock:
+            entry = self._streams.get(stream)
+            if entry is None:
+                entry = self._streams[stream] = _StreamEntry(
+                    EmotionSmoother(self.smoothing, self.hysteresis, self.min_confidence))
+                while len(self._streams) > self.max_streams:
+                    self._streams.popitem(last=False)
+            else:
+                self._streams.move_to_end(stream)
+
+            emotion, confidence = entry.smoother.update(emotion, confidence)
+            if not faces:
+                # Keep decaying the scores, but never report an emotion without a face
+                emotion, confidence = None, 0.0
+            entry.signature = signature
+            entry.result = (emotion, confidence, faces)
+            entry.stored_at = time.monotonic()
+            entry.reused = 0
+            return entry.result
+
+    def forget(self, stream):
+        """Drop everything cached for a stream."""
+        with self._lock:
+            self._streams.pop(stream, None)
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'streams': len(self._streams),
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
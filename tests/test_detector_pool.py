@@ -0,0 +1,122 @@
+import threading
+import time
+
+import pytest
+
+from detector_pool import DetectorPool, PoolExhausted
+
+
+class FakeDetector:
+    def __init__(self):
+        self.resets = 0
+        self.closed = False
+
+    def reset_tracking(self):
+        self.resets += 1
+
+    def cleanup(self):
+        self.closed = True
+
+
+def make_pool(size=1, **kwargs):
+    created = []
+
+    def factory():
+        created.append(FakeDetector())
+        return created[-1]
+
+    return DetectorPool(size=size, factory=factory, **kwargs), created
+
+
+def test_detectors_return_to_their_session():
+    pool, created = make_pool(size=2)
+    a = pool.acquire('a')
+    b = pool.acquire('b')
+    pool.release(a)
+    pool.release(b)
+
+    assert pool.acquire('b') is b
+    assert pool.acquire('a') is a
+    assert len(created) == 2
+    assert a.resets == b.resets == 0
+
+
+def test_detector_resets_when_it_moves_to_another_session():
+    pool, _ = make_pool()
+    with pool.detector('a') as detector:
+        assert detector.resets == 0
+    with pool.detector('b') as same:
+        assert same is detector
+        assert detector.resets == 1
+    with pool.detector('b'):
+        assert detector.resets == 1
+
+
+def test_frames_without_a_session_start_fresh():
+    pool, _ = make_pool()
+    with pool.detector(None) as detector:
+        assert detector.resets == 0
+    with pool.detector('a'):
+        assert detector.resets == 1
+    with pool.detector(None):
+        assert detector.resets == 2
+    with pool.detector(None):
+        assert detector.resets == 3
+
+
+def test_full_queue_rejects_immediately():
+    pool, _ = make_pool(max_waiting=0)
+    pool.acquire('a')
+    with pytest.raises(PoolExhausted):
+        pool.acquire('b')
+    assert pool.stats()['rejected'] == 1
+
+
+def test_waiting_times_out():
+    pool, _ = make_pool(max_waiting=1, acquire_timeout=0.05)
+    pool.acquire('a')
+    with pytest.raises(PoolExhausted):
+        pool.acquire('b')
+    stats = pool.stats()
+    assert stats['timeouts'] == 1
+    assert stats['waiting'] == 0
+    assert stats['in_use'] == 1
+
+
+def test_waiter_gets_released_detector():
+    pool, created = make_pool(acquire_timeout=5.0)
+    detector = pool.acquire('a')
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire('b')))
+    waiter.start()
+    while pool.waiting == 0:
+        time.sleep(0.001)
+    pool.release(detector)
+    waiter.join(timeout=5)
+
+    assert got == [detector]
+    assert len(created) == 1
+
+
+def test_factory_error_frees_the_slot():
+    calls = []
+
+    def factory():
+        calls.append(None)
+        if len(calls) == 1:
+            raise RuntimeError("no graph")
+        return FakeDetector()
+
+    pool = DetectorPool(size=1, factory=factory)
+    with pytest.raises(RuntimeError):
+        pool.acquire('a')
+    assert pool.stats()['created'] == 0
+    assert pool.stats()['in_use'] == 0
+    assert isinstance(pool.acquire('a'), FakeDetector)
+
+
+def test_close_cleans_up_idle_detectors():
+    pool, created = make_pool(size=2)
+    pool.prewarm(2)
+    pool.close()
+    assert [d.closed for d in created] == [True, True]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+landmark_pb2 = pytest.importorskip('mediapipe.framework.formats.landmark_pb2')
+
+import emotion_detector
+from emotion_detector import landmarks_to_array
+
+
+def landmark_list(points, **fields):
+    landmarks = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z in points:
+        landmarks.landmark.add(x=x, y=y, z=z, **fields)
+    return landmarks
+
+
+def walk(landmarks):
+    return np.array([(lm.x, lm.y, lm.z) for lm in landmarks.landmark], dtype=np.float32)
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    points = rng.random((468, 3))
+    points[:, 2] -= 0.5
+    return points
+
+
+@pytest.fixture(autouse=True)
+def layout_warning(monkeypatch):
+    monkeypatch.setattr(emotion_detector, '_landmark_layout_changed', False)
+
+
+def test_wire_layout_matches_mediapipe(points):
+    landmarks = landmark_list(points)
+    # The fast path only applies while MediaPipe keeps this encoding
+    assert len(landmarks.SerializeToString()) == len(points) * emotion_detector._LANDMARK_RECORD_SIZE
+    result = landmarks_to_array(landmarks)
+    assert result.dtype == np.float32
+    np.testing.assert_array_equal(result, walk(landmarks))
+    assert not emotion_detector._landmark_layout_changed
+
+
+def test_omitted_zero_falls_back(points):
+    points[10] = 0.0
+    landmarks = landmark_list(points)
+    np.testing.assert_array_equal(landmarks_to_array(landmarks), walk(landmarks))
+    assert not emotion_detector._landmark_layout_changed
+
+
+def test_extra_fields_fall_back_with_warning(points, capsys):
+    landmarks = landmark_list(points, visibility=0.9)
+    np.testing.assert_array_equal(landmarks_to_array(landmarks), walk(landmarks))
+    assert emotion_detector._landmark_layout_changed
+    assert 'unexpected wire layout' in capsys.readouterr().out
+
+
+def test_plain_sequence(points):
+    landmarks = landmark_list(points)
+    np.testing.assert_array_equal(landmarks_to_array(list(landmarks.landmark)), walk(landmarks))
+    assert landmarks_to_array([]).shape == (0, 3)
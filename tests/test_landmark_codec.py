@@ -0,0 +1,67 @@
+import base64
+
+import numpy as np
+import pytest
+
+from landmark_codec import compact_faces, face_bboxes, pack_landmarks, parse_landmark_indices
+
+
+def unpack(packed):
+    data = np.frombuffer(base64.b64decode(packed['data']), dtype='<f2')
+    return data.reshape(packed['shape'])
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(1)
+    return rng.random((2, 478, 3)).astype(np.float32)
+
+
+def test_pack_landmarks_round_trips(points):
+    indices = np.array([61, 291, 13, 14, 0, 477])
+    packed = pack_landmarks(points, indices)
+
+    assert packed['indices'] == indices.tolist()
+    assert packed['dtype'] == 'float16'
+    assert packed['shape'] == [2, len(indices), 2]
+    unpacked = unpack(packed)
+    np.testing.assert_array_equal(unpacked, points[:, indices, :2].astype(np.float16))
+    # float16 keeps about 3 decimal digits of normalized coordinates
+    np.testing.assert_allclose(unpacked, points[:, indices, :2], atol=5e-4)
+
+
+def test_pack_landmarks_from_non_contiguous_points(points):
+    indices = np.array([5, 1])
+    packed = pack_landmarks(points[::-1], indices)
+    np.testing.assert_array_equal(unpack(packed), points[::-1, indices, :2].astype(np.float16))
+
+
+def test_face_bboxes(points):
+    boxes = face_bboxes(points)
+    assert boxes.shape == (2, 4)
+    np.testing.assert_array_equal(boxes[0], [*points[0, :, :2].min(axis=0), *points[0, :, :2].max(axis=0)])
+    np.testing.assert_array_equal(face_bboxes(list(points)), boxes)
+    assert face_bboxes([]).shape == (0, 4)
+    assert face_bboxes(np.zeros((0, 478, 3))).shape == (0, 4)
+
+
+def test_parse_landmark_indices():
+    np.testing.assert_array_equal(parse_landmark_indices('61, 291,13,', 478), [61, 291, 13])
+    assert parse_landmark_indices('', 478) is None
+    assert parse_landmark_indices(None, 478) is None
+    # Frames without a face have no landmark count to check against
+    np.testing.assert_array_equal(parse_landmark_indices('500', None), [500])
+
+
+@pytest.mark.parametrize('value, num_landmarks', [('478', 478), ('-1', 478), ('-1', None), ('1,x', 478)])
+def test_parse_landmark_indices_rejects(value, num_landmarks):
+    with pytest.raises(ValueError):
+        parse_landmark_indices(value, num_landmarks)
+
+
+def test_compact_faces(points):
+    payload = compact_faces(points, ['happy', None], [0.9, 0.0], np.array([1, 2]))
+    assert [face['emotion'] for face in payload['faces']] == ['happy', None]
+    assert payload['faces'][0]['bbox'] == np.round(face_bboxes(points)[0].astype(np.float64), 4).tolist()
+    assert payload['landmarks']['shape'] == [2, 2, 2]
+    assert 'landmarks' not in compact_faces(points[:0], [], [], np.array([1, 2]))
@@ -0,0 +1,95 @@
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+from detection_result import FEATURE_NAMES
+from rule_classifier import RuleClassifier
+
+RULE_FILE = os.path.join(os.path.dirname(__file__), os.pardir, 'emotion_rules.json')
+
+
+def original_classify(mouth_curvature, eyebrow_distance, eye_ratio):
+    """The hand-written classifier DEFAULT_RULES replaced."""
+    emotion_scores = {'happy': 0.0, 'angry': 0.0, 'neutral': 0.0}
+    if mouth_curvature > 0.02:
+        emotion_scores['happy'] += 0.6
+    if mouth_curvature > 0.04:
+        emotion_scores['happy'] += 0.3
+    if eyebrow_distance > 25:
+        emotion_scores['happy'] += 0.1
+    if mouth_curvature < -0.015:
+        emotion_scores['angry'] += 0.4
+    if eyebrow_distance < 15:
+        emotion_scores['angry'] += 0.5
+    if eye_ratio < 0.2:
+        emotion_scores['angry'] += 0.1
+    if abs(mouth_curvature) < 0.02:
+        emotion_scores['neutral'] += 0.4
+    if 15 <= eyebrow_distance <= 25:
+        emotion_scores['neutral'] += 0.3
+    if 0.2 <= eye_ratio <= 0.35:
+        emotion_scores['neutral'] += 0.3
+    detected_emotion = max(emotion_scores.keys(), key=lambda x: emotion_scores[x])
+    confidence = emotion_scores[detected_emotion]
+    if confidence < 0.3:
+        return None, 0.0
+    return detected_emotion, min(confidence, 1.0)
+
+
+def features(mouth_curvature=0.0, eyebrow_distance=20.0, eye_ratio=0.3, mouth_openness=0.2):
+    values = dict(mouth_curvature=mouth_curvature, mouth_width=50.0, mouth_height=10.0,
+                  eyebrow_distance=eyebrow_distance, eye_ratio=eye_ratio, mouth_openness=mouth_openness)
+    return [values[name] for name in FEATURE_NAMES]
+
+
+def test_default_rules_match_the_original_classifier():
+    # Every bound, plus values on both sides of it
+    grid = list(itertools.product(
+        (-0.05, -0.02, -0.015, -0.01, 0.0, 0.01, 0.02, 0.03, 0.04, 0.05),
+        (10.0, 14.9, 15.0, 20.0, 25.0, 25.1, 30.0),
+        (0.1, 0.19, 0.2, 0.3, 0.35, 0.36),
+    ))
+    classifier = RuleClassifier()
+    labels, confidences = classifier.classify(classifier.score([features(*point) for point in grid]))
+
+    for point, label, confidence in zip(grid, labels, confidences):
+        expected, expected_confidence = original_classify(*point)
+        assert (label, confidence) == (expected, pytest.approx(expected_confidence)), point
+
+
+def test_batch_scores_equal_single_face_scores():
+    classifier = RuleClassifier()
+    batch = np.array([features(0.05, 30.0), features(-0.03, 10.0, 0.1), features()])
+    scores = classifier.score(batch)
+    for row, face in zip(scores, batch):
+        np.testing.assert_array_equal(row, classifier.score(face[np.newaxis])[0])
+
+
+def test_rule_file():
+    classifier = RuleClassifier.load(RULE_FILE)
+    assert classifier.emotions == ('happy', 'angry', 'neutral', 'surprise', 'sad')
+    labels, _ = classifier.classify(classifier.score([features(0.0, 35.0, 0.4, mouth_openness=0.5)]))
+    assert labels == ['surprise']
+
+
+def test_emotions_named_only_by_rules_are_appended():
+    classifier = RuleClassifier(
+        [{'emotion': 'sleepy', 'feature': 'eye_ratio', 'below': 0.1, 'weight': 1.0}], emotions=['happy'])
+    assert classifier.emotions == ('happy', 'sleepy')
+    labels, confidences = classifier.classify(classifier.score([features(eye_ratio=0.05), features()]))
+    assert labels == ['sleepy', None]
+    assert confidences == [1.0, 0.0]
+
+
+@pytest.mark.parametrize('rule, message', [
+    ({'emotion': 'happy', 'feature': 'nose_length', 'above': 1, 'weight': 1}, 'unknown feature'),
+    ({'emotion': 'happy', 'feature': 'eye_ratio', 'weight': 1}, 'needs at least one'),
+    ({'emotion': 'happy', 'feature': 'eye_ratio', 'above': 1, 'weight': 0}, 'weight must be positive'),
+    ({'emotion': 'happy', 'feature': 'eye_ratio', 'over': 1, 'weight': 1}, 'unknown keys'),
+    ({'feature': 'eye_ratio', 'above': 1, 'weight': 1}, 'no emotion'),
+])
+def test_invalid_rules(rule, message):
+    with pytest.raises(ValueError, match=message):
+        RuleClassifier([rule])
@@ -0,0 +1,85 @@
+import pytest
+
+import session_registry
+from session_registry import SessionLimitReached, SessionRegistry
+
+
+class Session:
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_registry.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_returns_created_session(clock):
+    registry = SessionRegistry(Session)
+    token, session = registry.create()
+    assert registry.get(token) is session
+    assert registry.get('unknown') is None
+    assert registry.get(None) is None
+
+
+def test_get_or_create_keeps_known_tokens(clock):
+    registry = SessionRegistry(Session)
+    token, session, created = registry.get_or_create(None)
+    assert created
+    assert registry.get_or_create(token) == (token, session, False)
+    other, _, created = registry.get_or_create('stale-token')
+    assert created and other != token
+
+
+def test_full_registry_refuses_new_sessions(clock):
+    registry = SessionRegistry(Session, max_sessions=2, idle_timeout=60)
+    registry.create()
+    registry.create()
+    with pytest.raises(SessionLimitReached):
+        registry.create()
+    assert len(registry) == 2
+
+
+def test_idle_sessions_make_room_oldest_first(clock):
+    registry = SessionRegistry(Session, max_sessions=2, idle_timeout=60)
+    first, _ = registry.create()
+    clock[0] += 30
+    second, _ = registry.create()
+    clock[0] += 40  # first idle for 70 s, second for 40 s
+
+    third, _ = registry.create()
+    assert registry.get(first) is None
+    assert registry.get(second) is not None
+    assert registry.get(third) is not None
+    assert registry.evicted == 1
+
+
+def test_get_refreshes_the_idle_timer(clock):
+    registry = SessionRegistry(Session, max_sessions=2, idle_timeout=60)
+    first, _ = registry.create()
+    second, _ = registry.create()
+    clock[0] += 50
+    registry.get(first)
+    clock[0] += 20  # second idle for 70 s, first for 20 s
+
+    registry.create()
+    assert registry.get(first) is not None
+    assert registry.get(second) is None
+
+
+def test_expired_session_is_dropped_on_get(clock):
+    registry = SessionRegistry(Session, idle_timeout=60)
+    token, _ = registry.create()
+    clock[0] += 61
+    assert registry.get(token) is None
+    assert len(registry) == 0
+    assert registry.stats() == {'active': 0, 'max_sessions': 500, 'evicted': 1}
+
+
+def test_remove(clock):
+    registry = SessionRegistry(Session)
+    token, _ = registry.create()
+    registry.remove(token)
+    registry.remove(token)
+    assert registry.get(token) is None
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+import temporal_cache
+from temporal_cache import EmotionSmoother, TemporalCache
+
+FACES = ['face']
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(temporal_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def frame(value=100):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def stored(cache, stream='s', value=100, emotion='happy', confidence=0.9):
+    signature = cache.signature(frame(value))
+    return signature, cache.store(stream, signature, emotion, confidence, FACES)
+
+
+def test_unchanged_frame_reuses_result(clock):
+    cache = TemporalCache(smoothing=1.0)
+    signature, result = stored(cache)
+    assert result == ('happy', 0.9, FACES)
+    assert cache.lookup('s', signature) == result
+    assert cache.lookup('other', signature) is None
+    assert cache.stats()['hits'] == 1
+
+
+def test_changed_pixel_is_a_miss(clock):
+    cache = TemporalCache(threshold=5.0)
+    signature, _ = stored(cache)
+    changed = signature.copy()
+    changed[20, 30] += 6
+    assert cache.lookup('s', changed) is None
+    changed[20, 30] -= 1
+    assert cache.lookup('s', changed) is not None
+
+
+def test_reuse_is_bounded_by_count(clock):
+    cache = TemporalCache(max_reuse=2, max_age=10)
+    signature, _ = stored(cache)
+    assert cache.lookup('s', signature) is not None
+    assert cache.lookup('s', signature) is not None
+    assert cache.lookup('s', signature) is None
+    assert cache.stats()['expired'] == 1
+
+    # A fresh detection starts counting again
+    cache.store('s', signature, 'happy', 0.9, FACES)
+    assert cache.lookup('s', signature) is not None
+
+
+def test_reuse_is_bounded_by_age(clock):
+    cache = TemporalCache(max_reuse=100, max_age=0.5)
+    signature, _ = stored(cache)
+    clock[0] += 0.4
+    assert cache.lookup('s', signature) is not None
+    clock[0] += 0.2
+    assert cache.lookup('s', signature) is None
+
+
+def test_zero_threshold_disables_reuse(clock):
+    cache = TemporalCache(threshold=0)
+    signature, _ = stored(cache)
+    assert cache.lookup('s', signature) is None
+
+
+def test_least_recently_used_streams_are_forgotten(clock):
+    cache = TemporalCache(max_streams=2)
+    signature, _ = stored(cache, 'a')
+    stored(cache, 'b')
+    cache.lookup('a', signature)
+    stored(cache, 'c')
+    assert cache.lookup('a', signature) is not None
+    assert cache.lookup('b', signature) is None
+    assert cache.stats()['streams'] == 2
+
+
+def test_no_emotion_without_a_face(clock):
+    cache = TemporalCache(smoothing=1.0)
+    stored(cache)
+    signature = cache.signature(frame(200))
+    assert cache.store('s', signature, 'happy', 0.9, None) == (None, 0.0, None)
+
+
+def test_smoother_hysteresis():
+    smoother = EmotionSmoother(smoothing=0.5, hysteresis=0.1, min_confidence=0.3)
+    assert smoother.update('happy', 0.8) == ('happy', 0.8)
+    # angry 0.4 vs happy 0.4: not ahead by the hysteresis margin yet
+    assert smoother.update('angry', 0.8) == ('happy', pytest.approx(0.4))
+    # angry 0.6 vs happy 0.2: switches
+    assert smoother.update('angry', 0.8) == ('angry', pytest.approx(0.6))
+
+
+def test_smoother_single_noisy_frame_does_not_flip():
+    smoother = EmotionSmoother(smoothing=0.4, hysteresis=0.1)
+    for _ in range(5):
+        smoother.update('happy', 0.9)
+    # sad 0.36 vs happy 0.54
+    assert smoother.update('sad', 0.9)[0] == 'happy'
+    assert smoother.update('happy', 0.9)[0] == 'happy'
+
+
+def test_smoother_reports_nothing_below_min_confidence():
+    smoother = EmotionSmoother(smoothing=0.5, min_confidence=0.3)
+    smoother.update('happy', 0.8)
+    smoother.update(None, 0.0)
+    assert smoother.update(None, 0.0) == (None, 0.0)
@@ -0,0 +1,124 @@
+"""
+Pre-rendered overlay layers for the desktop UI.
+
+Most of what UIRenderer draws changes a few times per game (score, level,
+lives, the target emotion) or never (menu and game over text), yet every
+element used to be redrawn with several cv2.putText / cv2.circle calls on
+every frame. A LayerCache renders such an element once into a BGRA sprite,
+keyed by the values it shows, and later frames only composite the sprite:
+
+- sprites are cropped to their visible pixels, so compositing only touches
+  a small region of the frame
+- opaque sprites (OpenCV's default LINE_8 drawing is not antialiased) are
+  copied through their alpha mask, which gives exactly the pixels drawing
+  directly on the frame would
+- translucent sprites are alpha blended in place
+
+Full-screen dimming (menu, game over) is done in place as well instead of
+blending the frame with a black copy of itself.
+"""
+
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class Sprite:
+    """A BGRA image cropped to its visible pixels, composited onto BGR frames in place."""
+
+    __slots__ = ('x', 'y', 'bgr', 'mask', 'alpha')
+
+    def __init__(self, bgra, origin=(0, 0)):
+        """Crop a rendered BGRA canvas.
+
+        Args:
+            bgra: (H, W, 4) uint8 canvas.
+            origin: Canvas point that lands on the position passed to draw().
+        """
+        visible = bgra[:, :, 3] > 0
+        rows = np.flatnonzero(visible.any(axis=1))
+        cols = np.flatnonzero(visible.any(axis=0))
+        self.mask = self.alpha = None
+        if rows.size == 0:
+            self.x = self.y = 0
+            self.bgr = None
+            return
+
+        y0, y1 = rows[0], rows[-1] + 1
+        x0, x1 = cols[0], cols[-1] + 1
+        crop = bgra[y0:y1, x0:x1]
+        self.x = int(x0) - origin[0]
+        self.y = int(y0) - origin[1]
+        self.bgr = np.ascontiguousarray(crop[:, :, :3])
+        alpha = crop[:, :, 3]
+        if np.all((alpha == 0) | (alpha == 255)):
+            self.mask = np.ascontiguousarray(alpha)
+        else:
+            self.alpha = alpha[:, :, None].astype(np.float32) / 255
+
+    def draw(self, frame, x=0, y=0):
+        """Composite the sprite with its origin at (x, y); parts outside the frame are clipped."""
+        if self.bgr is None:
+            return frame
+        height, width = frame.shape[:2]
+        left, top = x + self.x, y + self.y
+        x0, y0 = max(left, 0), max(top, 0)
+        x1 = min(left + self.bgr.shape[1], width)
+        y1 = min(top + self.bgr.shape[0], height)
+        if x0 >= x1 or y0 >= y1:
+            return frame
+
+        roi = frame[y0:y1, x0:x1]
+        src = (slice(y0 - top, y1 - top), slice(x0 - left, x1 - left))
+        if self.mask is not None:
+            cv2.copyTo(self.bgr[src], self.mask[src], roi)
+        else:
+            alpha = self.alpha[src]
+            roi[:] = roi * (1 - alpha) + self.bgr[src] * alpha
+        return frame
+
+
+class LayerCache:
+    """LRU cache of sprites keyed by the values they show."""
+
+    def __init__(self, max_sprites=128):
+        self.max_sprites = max_sprites
+        self.hits = 0
+        self.misses = 0
+        self._sprites = OrderedDict()
+
+    def sprite(self, key, render):
+        """Return the sprite for key, calling render() -> (bgra canvas, origin) on a miss."""
+        sprite = self._sprites.get(key)
+        if sprite is not None:
+            self._sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self._sprites[key] = Sprite(*render())
+        if len(self._sprites) > self.max_sprites:
+            self._sprites.popitem(last=False)
+        return sprite
+
+    def clear(self):
+        self._sprites.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'sprites': len(self._sprites),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def darken(frame, factor, rect=None):
+    """Scale the pixels of frame, or of its (x, y, width, height) rect, by factor in place."""
+    if rect is not None:
+        x, y, width, height = rect
+        frame = frame[y:y + height, x:x + width]
+    cv2.convertScaleAbs(frame, dst=frame, alpha=factor)
+    return frame
@@ -1,5 +1,9 @@
 """
 UI rendering for the Mood Blaster game using OpenCV.
+
+Elements that stay the same across frames (menu and game over text, HUD
+values, emotion icons) are drawn once into sprites by a LayerCache and
+composited from then on; see ui_layers.
 """
 
 import cv2
@@ -7,6 +11,16 @@ import numpy as np
 import math
 import time
 
+from ui_layers import LayerCache, darken
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+# Free space around an emotion icon's circle in its sprite (eyebrows, outline)
+ICON_MARGIN = 12
+
+# Brightness kept under the menu / game over overlay
+OVERLAY_DIM = 0.3
+
 class UIRenderer:
     """Handles all UI rendering for the game."""
     
@@ -28,39 +42,80 @@ class UIRenderer:
         self.emotion_colors = {
             'happy': self.GREEN,
             'angry': self.RED,
-            'neutral': self.BLUE
+            'neutral': self.BLUE,
+            'surprise': self.YELLOW,
+            'sad': self.PURPLE
         }
         
         # Animation variables
         self.pulse_time = 0
         
-    def draw_text(self, frame, text, position, font_scale=1.0, color=(255, 255, 255), thickness=2):
-        """Draw text on the frame with outline for better visibility."""
-        font = cv2.FONT_HERSHEY_SIMPLEX
+        # Pre-rendered static and rarely-changing elements
+        self.layers = LayerCache()
+        
+    @staticmethod
+    def paint(frame, color):
+        """Return color for drawing on frame; BGRA sprite canvases get an opaque alpha."""
+        if frame.shape[2] == 4 and len(color) == 3:
+            return (*color, 255)
+        return color
+    
+    def draw_text(self, frame, text, position, font_scale=1.0, color=(255, 255, 255), thickness=2, cached=False):
+        """Draw text on the frame with outline for better visibility.
+        
+        With cached=True the text is rendered once into a sprite keyed by its
+        content and style; use it for text that repeats across frames.
+        """
+        if cached:
+            key = ('text', text, font_scale, color, thickness)
+            sprite = self.layers.sprite(key, lambda: self._render_text(text, font_scale, color, thickness))
+            sprite.draw(frame, *position)
+            return frame
         
         # Draw outline
-        cv2.putText(frame, text, position, font, font_scale, self.BLACK, thickness + 2)
+        cv2.putText(frame, text, position, FONT, font_scale, self.paint(frame, self.BLACK), thickness + 2)
         # Draw main text
-        cv2.putText(frame, text, position, font, font_scale, color, thickness)
+        cv2.putText(frame, text, position, FONT, font_scale, self.paint(frame, color), thickness)
         
         return frame
     
-    def draw_face_box(self, frame, landmarks):
-        """Draw a bounding box around detected facial landmarks."""
-        if not landmarks:
+    def _render_text(self, text, font_scale, color, thickness):
+        """Render outlined text into a BGRA canvas; the origin is the text's baseline start."""
+        (width, height), baseline = cv2.getTextSize(text, FONT, font_scale, thickness + 2)
+        pad = thickness + 2
+        canvas = np.zeros((height + baseline + 2 * pad, width + 2 * pad, 4), np.uint8)
+        origin = (pad, pad + height)
+        self.draw_text(canvas, text, origin, font_scale, color, thickness)
+        return canvas, origin
+    
+    def _render_layer(self, frame, draw):
+        """Render draw(canvas) on a frame-sized BGRA canvas, in frame coordinates."""
+        canvas = np.zeros(frame.shape[:2] + (4,), np.uint8)
+        draw(canvas)
+        return canvas, (0, 0)
+    
+    def draw_face_boxes(self, frame, faces, keypoints=False):
+        """Draw a bounding box around every detected face, optionally with its key points.
+        
+        `faces` is the detector's FrameResult; the boxes (and key points) of
+        all faces are scaled to pixels in one NumPy operation.
+        """
+        if not faces:
             return frame
 
         h, w = frame.shape[:2]
-        xs = [int(lm.x * w) for lm in landmarks]
-        ys = [int(lm.y * h) for lm in landmarks]
-
-        x_min, x_max = min(xs), max(xs)
-        y_min, y_max = min(ys), max(ys)
+        boxes = (faces.bboxes * (w, h, w, h)).astype(int)
 
         # Draw rectangle with glow effect
         box_color = (0, 255, 0)
-        cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), box_color, 2)
-        self.draw_text(frame, "FACE DETECTED", (x_min, y_min - 10), 0.6, box_color, 2)
+        for x_min, y_min, x_max, y_max in boxes.tolist():
+            cv2.rectangle(frame, (x_min, y_min), (x_max, y_max), box_color, 2)
+            self.draw_text(frame, "FACE DETECTED", (x_min, y_min - 10), 0.6, box_color, 2, cached=True)
+
+        if keypoints:
+            points = (faces.keypoints.reshape(-1, 2) * (w, h)).astype(int)
+            for x, y in points.tolist():
+                cv2.circle(frame, (x, y), 3, self.YELLOW, -1)
 
         return frame
 
@@ -76,10 +131,27 @@ class UIRenderer:
             pulse_factor = 1.0 + 0.2 * math.sin(self.pulse_time * 6)
             radius = int(radius * pulse_factor)
         
+        # One sprite per emotion and radius; the pulse cycles through a few radii
+        sprite = self.layers.sprite(('icon', emotion, radius), lambda: self._render_icon(emotion, radius))
+        sprite.draw(frame, x, y)
+        return frame
+    
+    def _render_icon(self, emotion, radius):
+        """Render an emotion icon into a BGRA canvas; the origin is the icon's center."""
+        half = radius + ICON_MARGIN
+        canvas = np.zeros((2 * half + 1, 2 * half + 1, 4), np.uint8)
+        self.draw_icon_shape(canvas, emotion, (half, half), radius)
+        return canvas, (half, half)
+    
+    def draw_icon_shape(self, frame, emotion, center, radius):
+        """Draw an emotion face of the given radius centered on center."""
+        x, y = center
+        black = self.paint(frame, self.BLACK)
+        
         # Draw face circle
-        color = self.emotion_colors.get(emotion, self.WHITE)
+        color = self.paint(frame, self.emotion_colors.get(emotion, self.WHITE))
         cv2.circle(frame, (x, y), radius, color, -1)
-        cv2.circle(frame, (x, y), radius, self.BLACK, 3)
+        cv2.circle(frame, (x, y), radius, black, 3)
         
         # Draw eyes
         eye_offset = radius // 3
@@ -87,8 +159,8 @@ class UIRenderer:
         left_eye = (x - eye_offset, y - radius // 4)
         right_eye = (x + eye_offset, y - radius // 4)
         
-        cv2.circle(frame, left_eye, eye_radius, self.BLACK, -1)
-        cv2.circle(frame, right_eye, eye_radius, self.BLACK, -1)
+        cv2.circle(frame, left_eye, eye_radius, black, -1)
+        cv2.circle(frame, right_eye, eye_radius, black, -1)
         
         # Draw mouth based on emotion
         mouth_y = y + radius // 4
@@ -97,18 +169,31 @@ class UIRenderer:
         if emotion == 'happy':
             # Smiling mouth (arc)
             axes = (mouth_width, radius // 4)
-            cv2.ellipse(frame, (x, mouth_y), axes, 0, 0, 180, self.BLACK, 3)
+            cv2.ellipse(frame, (x, mouth_y), axes, 0, 0, 180, black, 3)
         elif emotion == 'angry':
             # Frowning mouth (inverted arc)
             axes = (mouth_width, radius // 4)
-            cv2.ellipse(frame, (x, mouth_y - radius // 6), axes, 0, 180, 360, self.BLACK, 3)
+            cv2.ellipse(frame, (x, mouth_y - radius // 6), axes, 0, 180, 360, black, 3)
             # Angry eyebrows
             brow_y = y - radius // 2
-            cv2.line(frame, (x - eye_offset - 10, brow_y), (x - eye_offset + 10, brow_y + 5), self.BLACK, 4)
-            cv2.line(frame, (x + eye_offset - 10, brow_y + 5), (x + eye_offset + 10, brow_y), self.BLACK, 4)
+            cv2.line(frame, (x - eye_offset - 10, brow_y), (x - eye_offset + 10, brow_y + 5), black, 4)
+            cv2.line(frame, (x + eye_offset - 10, brow_y + 5), (x + eye_offset + 10, brow_y), black, 4)
+        elif emotion == 'surprise':
+            # Open mouth and raised eyebrows
+            cv2.ellipse(frame, (x, mouth_y + radius // 12), (radius // 6, radius // 4), 0, 0, 360, black, 3)
+            brow_y = y - radius // 2 - 5
+            cv2.ellipse(frame, (x - eye_offset, brow_y), (10, 5), 0, 180, 360, black, 3)
+            cv2.ellipse(frame, (x + eye_offset, brow_y), (10, 5), 0, 180, 360, black, 3)
+        elif emotion == 'sad':
+            # Frowning mouth and eyebrows slanting down to the sides
+            axes = (mouth_width, radius // 5)
+            cv2.ellipse(frame, (x, mouth_y + radius // 8), axes, 0, 180, 360, black, 3)
+            brow_y = y - radius // 2
+            cv2.line(frame, (x - eye_offset - 10, brow_y + 5), (x - eye_offset + 10, brow_y), black, 3)
+            cv2.line(frame, (x + eye_offset - 10, brow_y), (x + eye_offset + 10, brow_y + 5), black, 3)
         else:  # neutral
             # Straight mouth
-            cv2.line(frame, (x - mouth_width//2, mouth_y), (x + mouth_width//2, mouth_y), self.BLACK, 3)
+            cv2.line(frame, (x - mouth_width//2, mouth_y), (x + mouth_width//2, mouth_y), black, 3)
         
         return frame
     
@@ -138,8 +223,7 @@ class UIRenderer:
     
     def draw_heart(self, frame, position, size=20, color=None):
         """Draw a heart shape for lives."""
-        if color is None:
-            color = self.RED
+        color = self.paint(frame, self.RED if color is None else color)
         
         x, y = position
         # Simple heart approximation using circles and triangle
@@ -152,45 +236,75 @@ class UIRenderer:
         
         return frame
     
+    def draw_hearts(self, frame, lives, position, spacing=30, size=15):
+        """Draw one heart per life in a row starting at position."""
+        x, y = position
+        sprite = self.layers.sprite(
+            ('hearts', lives, spacing, size),
+            lambda: self._render_hearts(lives, spacing, size))
+        sprite.draw(frame, x, y)
+        return frame
+    
+    def _render_hearts(self, lives, spacing, size):
+        """Render a row of hearts into a BGRA canvas; the origin is the first heart's center."""
+        canvas = np.zeros((2 * size, max(lives, 1) * spacing + size, 4), np.uint8)
+        origin = (size, size)
+        for i in range(lives):
+            self.draw_heart(canvas, (origin[0] + i * spacing, origin[1]), size)
+        return canvas, origin
+    
     def render_menu(self, frame):
         """Render the main menu screen."""
         height, width = frame.shape[:2]
         
-        # Create a semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (width, height), self.BLACK, -1)
-        frame = cv2.addWeighted(frame, 0.3, overlay, 0.7, 0)
+        # Dim the camera image under the menu
+        darken(frame, OVERLAY_DIM)
+        
+        # Emotion icons demo
+        center_y = height // 2
+        emotions = ['happy', 'neutral', 'angry']
+        for i, emotion in enumerate(emotions):
+            x = width // 4 + i * (width // 4)
+            self.draw_emotion_icon(frame, emotion, (x, center_y), 60, True)
+        
+        # Title, subtitle, labels and instructions never change
+        sprite = self.layers.sprite(('menu', width, height),
+                                    lambda: self._render_layer(frame, self._draw_menu_text))
+        sprite.draw(frame)
+        
+        return frame
+    
+    def _draw_menu_text(self, frame):
+        """Draw the static text of the main menu."""
+        height, width = frame.shape[:2]
         
         # Title
         title_text = "MOOD BLASTER"
         title_size = 2.5
-        text_size = cv2.getTextSize(title_text, cv2.FONT_HERSHEY_SIMPLEX, title_size, 3)[0]
+        text_size = cv2.getTextSize(title_text, FONT, title_size, 3)[0]
         title_x = (width - text_size[0]) // 2
         title_y = height // 4
         
-        # Animated title with rainbow effect
+        # Rainbow title
         colors = [self.RED, self.ORANGE, self.YELLOW, self.GREEN, self.CYAN, self.BLUE, self.PURPLE]
         for i, char in enumerate(title_text):
             char_color = colors[i % len(colors)]
-            char_width = cv2.getTextSize(char, cv2.FONT_HERSHEY_SIMPLEX, title_size, 3)[0][0]
+            char_width = cv2.getTextSize(char, FONT, title_size, 3)[0][0]
             self.draw_text(frame, char, (title_x, title_y), title_size, char_color, 3)
             title_x += char_width
         
         # Subtitle
         subtitle = "Facial Expression Challenge Game"
-        subtitle_size = cv2.getTextSize(subtitle, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
+        subtitle_size = cv2.getTextSize(subtitle, FONT, 1.0, 2)[0]
         subtitle_x = (width - subtitle_size[0]) // 2
         self.draw_text(frame, subtitle, (subtitle_x, title_y + 80), 1.0, self.WHITE, 2)
         
-        # Emotion icons demo
+        # Emotion labels under the icons
         center_y = height // 2
         emotions = ['happy', 'neutral', 'angry']
         for i, emotion in enumerate(emotions):
             x = width // 4 + i * (width // 4)
-            self.draw_emotion_icon(frame, emotion, (x, center_y), 60, True)
-            
-            # Emotion labels
-            label_size = cv2.getTextSize(emotion.upper(), cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+            label_size = cv2.getTextSize(emotion.upper(), FONT, 0.8, 2)[0]
             label_x = x - label_size[0] // 2
             self.draw_text(frame, emotion.upper(), (label_x, center_y + 80), 0.8, self.emotion_colors[emotion], 2)
         
@@ -206,45 +320,37 @@ class UIRenderer:
         start_y = height - 200
         for i, instruction in enumerate(instructions):
             if instruction:
-                text_size = cv2.getTextSize(instruction, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
+                text_size = cv2.getTextSize(instruction, FONT, 0.7, 2)[0]
                 text_x = (width - text_size[0]) // 2
                 self.draw_text(frame, instruction, (text_x, start_y + i * 30), 0.7, self.WHITE, 2)
-        
-        return frame
     
     def render_game(self, frame, target_emotion, detected_emotion, confidence, score, level, lives, time_left, landmarks, streak):
         """Render the main game interface."""
         height, width = frame.shape[:2]
         
-        # Draw face landmarks if available
-        if landmarks:
-            for face in landmarks:
-                self.draw_face_box(frame, face['landmarks'])
-
-
+        # Draw face boxes if available
+        self.draw_face_boxes(frame, landmarks)
         
         # Top UI bar
         ui_height = 100
         cv2.rectangle(frame, (0, 0), (width, ui_height), (0, 0, 0, 180))
         
-        # Score
-        self.draw_text(frame, f"Score: {score}", (20, 30), 0.8, self.WHITE, 2)
-        
-        # Level
-        self.draw_text(frame, f"Level: {level}", (20, 60), 0.8, self.WHITE, 2)
+        # Score and level
+        self.draw_text(frame, f"Score: {score}", (20, 30), 0.8, self.WHITE, 2, cached=True)
+        self.draw_text(frame, f"Level: {level}", (20, 60), 0.8, self.WHITE, 2, cached=True)
         
         # Lives (hearts)
         lives_start_x = width - 150
-        self.draw_text(frame, "Lives:", (lives_start_x - 60, 40), 0.6, self.WHITE, 2)
-        for i in range(lives):
-            self.draw_heart(frame, (lives_start_x + i * 30, 35), 15)
+        self.draw_text(frame, "Lives:", (lives_start_x - 60, 40), 0.6, self.WHITE, 2, cached=True)
+        if lives > 0:
+            self.draw_hearts(frame, lives, (lives_start_x, 35))
         
         # Streak indicator
         if streak > 0:
             streak_text = f"Streak: {streak}"
-            streak_size = cv2.getTextSize(streak_text, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 2)[0]
+            streak_size = cv2.getTextSize(streak_text, FONT, 0.6, 2)[0]
             streak_x = width - streak_size[0] - 20
-            self.draw_text(frame, streak_text, (streak_x, 70), 0.6, self.YELLOW, 2)
+            self.draw_text(frame, streak_text, (streak_x, 70), 0.6, self.YELLOW, 2, cached=True)
         
         # Target emotion display
         if target_emotion:
@@ -255,7 +361,7 @@ class UIRenderer:
             
             # Target label
             target_text = f"Show: {target_emotion.upper()}"
-            self.draw_text(frame, target_text, (icon_x - 60, icon_y + 60), 0.8, self.emotion_colors[target_emotion], 2)
+            self.draw_text(frame, target_text, (icon_x - 60, icon_y + 60), 0.8, self.emotion_colors.get(target_emotion, self.WHITE), 2, cached=True)
             
             # Time remaining
             progress = time_left / 3.0  # Assuming max 3 seconds
@@ -266,31 +372,31 @@ class UIRenderer:
         # Detected emotion display
         if landmarks:
             for i, face in enumerate(landmarks):
-                emotion = face['emotion']
-                confidence = face['confidence']
+                face_emotion = face.emotion
+                face_confidence = face.confidence
                 x_offset = 80 + i * 120  # To avoid overlapping icons
                 
-                if emotion and confidence > 0.3:
-                    self.draw_emotion_icon(frame, emotion, (x_offset, height - 120), int(60 + 40 * confidence))
-                    self.draw_text(frame, f"{emotion.upper()} ({confidence:.2f})", (x_offset - 30, height - 60), 0.7, self.emotion_colors.get(emotion, self.WHITE), 2)
-        
-            
-            # Detection info
-            detect_text = f"Detected: {detected_emotion.upper()}"
-            confidence_text = f"Confidence: {confidence:.1f}"
-            
-            self.draw_text(frame, detect_text, (detect_x - 50, detect_y + 50), 0.7, self.emotion_colors[detected_emotion], 2)
-            self.draw_text(frame, confidence_text, (detect_x - 50, detect_y + 75), 0.6, self.WHITE, 2)
+                if face_emotion and face_confidence > 0.3:
+                    self.draw_emotion_icon(frame, face_emotion, (x_offset, height - 120), int(60 + 40 * face_confidence))
+                    self.draw_text(frame, f"{face_emotion.upper()} ({face_confidence:.2f})", (x_offset - 30, height - 60), 0.7, self.emotion_colors.get(face_emotion, self.WHITE), 2)
             
-            # Match indicator
-            if target_emotion and detected_emotion == target_emotion and confidence > 0.6:
-                match_text = "MATCH!"
-                self.draw_text(frame, match_text, (detect_x - 30, detect_y + 100), 1.0, self.GREEN, 3)
+            # Detection info, in the left column under the top bar
+            if detected_emotion:
+                info_x, info_y = 20, ui_height + 30
+                detect_text = f"Detected: {detected_emotion.upper()}"
+                confidence_text = f"Confidence: {confidence:.1f}"
+                
+                self.draw_text(frame, detect_text, (info_x, info_y), 0.7, self.emotion_colors.get(detected_emotion, self.WHITE), 2, cached=True)
+                self.draw_text(frame, confidence_text, (info_x, info_y + 25), 0.6, self.WHITE, 2, cached=True)
+                
+                # Match indicator
+                if target_emotion and detected_emotion == target_emotion and confidence > 0.6:
+                    self.draw_text(frame, "MATCH!", (info_x + 20, info_y + 50), 1.0, self.GREEN, 3, cached=True)
         
         # Center prompt for urgency
         if time_left < 1.0 and target_emotion:
             urgent_text = f"SHOW {target_emotion.upper()}!"
-            text_size = cv2.getTextSize(urgent_text, cv2.FONT_HERSHEY_SIMPLEX, 1.5, 3)[0]
+            text_size = cv2.getTextSize(urgent_text, FONT, 1.5, 3)[0]
             urgent_x = (width - text_size[0]) // 2
             urgent_y = height // 2 - 50
             
@@ -301,15 +407,14 @@ class UIRenderer:
             self.draw_text(frame, urgent_text, (urgent_x, urgent_y), 1.5, urgent_color, 3)
 
         if detected_emotion:
-         self.draw_text(
-             frame, 
-             f"{detected_emotion.upper()} ({confidence:.2f})", 
-             (20, height - 20), 
-             0.7, 
-             self.emotion_colors.get(detected_emotion, self.WHITE), 
-             2
-         )
-
+            self.draw_text(
+                frame,
+                f"{detected_emotion.upper()} ({confidence:.2f})",
+                (20, height - 20),
+                0.7,
+                self.emotion_colors.get(detected_emotion, self.WHITE),
+                2
+            )
         
         return frame
     
@@ -317,14 +422,25 @@ class UIRenderer:
         """Render the game over screen."""
         height, width = frame.shape[:2]
         
-        # Create semi-transparent overlay
-        overlay = frame.copy()
-        cv2.rectangle(overlay, (0, 0), (width, height), self.BLACK, -1)
-        frame = cv2.addWeighted(frame, 0.3, overlay, 0.7, 0)
+        # Dim the camera image under the results
+        darken(frame, OVERLAY_DIM)
+        
+        # The results do not change while the screen is shown
+        key = ('game_over', width, height, score, level, successful_matches, avg_reaction_time, max_streak)
+        sprite = self.layers.sprite(key, lambda: self._render_layer(
+            frame, lambda canvas: self._draw_game_over_text(
+                canvas, score, level, successful_matches, avg_reaction_time, max_streak)))
+        sprite.draw(frame)
+        
+        return frame
+    
+    def _draw_game_over_text(self, frame, score, level, successful_matches, avg_reaction_time, max_streak):
+        """Draw the title, results and instructions of the game over screen."""
+        height, width = frame.shape[:2]
         
         # Game Over title
         title = "GAME OVER"
-        title_size = cv2.getTextSize(title, cv2.FONT_HERSHEY_SIMPLEX, 2.0, 3)[0]
+        title_size = cv2.getTextSize(title, FONT, 2.0, 3)[0]
         title_x = (width - title_size[0]) // 2
         title_y = height // 4
         self.draw_text(frame, title, (title_x, title_y), 2.0, self.RED, 3)
@@ -340,7 +456,7 @@ class UIRenderer:
         ]
         
         for i, stat in enumerate(stats):
-            stat_size = cv2.getTextSize(stat, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+            stat_size = cv2.getTextSize(stat, FONT, 0.8, 2)[0]
             stat_x = (width - stat_size[0]) // 2
             self.draw_text(frame, stat, (stat_x, stats_y + i * 40), 0.8, self.WHITE, 2)
         
@@ -357,15 +473,13 @@ class UIRenderer:
                 perf_msg = "Keep Practicing! 💪"
                 perf_color = self.BLUE
             
-            perf_size = cv2.getTextSize(perf_msg, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)[0]
+            perf_size = cv2.getTextSize(perf_msg, FONT, 1.0, 2)[0]
             perf_x = (width - perf_size[0]) // 2
             self.draw_text(frame, perf_msg, (perf_x, perf_y), 1.0, perf_color, 2)
         
         # Restart instructions
         restart_y = height - 100
         restart_text = "Press SPACE to play again or ESC to quit"
-        restart_size = cv2.getTextSize(restart_text, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2)[0]
+        restart_size = cv2.getTextSize(restart_text, FONT, 0.7, 2)[0]
         restart_x = (width - restart_size[0]) // 2
         self.draw_text(frame, restart_text, (restart_x, restart_y), 0.7, self.WHITE, 2)
-        
-        return frame
@@ -4,22 +4,43 @@ Web-based Mood Blaster Game using Flask
 Compatible with Replit environment
 """
 
-from flask import Flask, render_template, request, jsonify, Response
+from flask import Flask, render_template, request, jsonify, Response, g
 import cv2
 import json
 import time
 import random
 import numpy as np
-import base64
-from io import BytesIO
-from PIL import Image
+import os
 import threading
+from detector_pool import DetectorPool, PoolExhausted
+from session_registry import SessionRegistry, SessionLimitReached
+from frame_decoder import FrameDecoder, FrameTooLarge, BINARY_IMAGE_TYPES, data_url_bytes
+from resolution_policy import ResolutionPolicy
+from landmark_codec import compact_faces, parse_landmark_indices
+from detection_result import FrameResult, is_clear_match
+from pacing import PacingController
+from temporal_cache import TemporalCache
+from micro_batcher import MicroBatcher
+from process_backend import ProcessDetector, in_worker_process
 from emotion_detector import EmotionDetector
+from detection_config import DetectionConfig
+from rule_classifier import RuleClassifier
+from learned_classifier import LearnedClassifier
+from metrics import metrics
 
 app = Flask(__name__)
 
 class WebMoodBlasterGame:
-    """Web-based version of Mood Blaster game."""
+    """Web-based version of Mood Blaster game (one instance per player session)."""
+    
+    # Slots keep per-session state small when hundreds of players are connected
+    __slots__ = (
+        'state', 'score', 'level', 'lives', 'current_target_emotion',
+        'prompt_start_time', 'prompt_duration', 'accuracy_streak',
+        'matches', 'total_reaction_time', 'game_running', 'last_seen', 'lock'
+    )
+    
+    emotions = ('happy', 'neutral', 'angry')
     
     def __init__(self):
         self.state = "menu"  # menu, playing, game_over
@@ -29,10 +50,13 @@ class WebMoodBlasterGame:
         self.current_target_emotion = None
         self.prompt_start_time = 0
         self.prompt_duration = 5.0
-        self.emotions = ['happy', 'neutral', 'angry']
         self.accuracy_streak = 0
-        self.reaction_times = []
+        # Reaction times are only ever averaged, so keep a count and a sum
+        self.matches = 0
+        self.total_reaction_time = 0.0
         self.game_running = False
+        self.last_seen = 0.0
+        self.lock = threading.Lock()
         
     def start_game(self):
         """Start a new game."""
@@ -41,7 +65,8 @@ class WebMoodBlasterGame:
         self.level = 1
         self.lives = 3
         self.accuracy_streak = 0
-        self.reaction_times = []
+        self.matches = 0
+        self.total_reaction_time = 0.0
         self.generate_new_prompt()
         self.game_running = True
         
@@ -64,10 +89,11 @@ class WebMoodBlasterGame:
             
             self.score += points
             self.accuracy_streak += 1
-            self.reaction_times.append(reaction_time)
+            self.matches += 1
+            self.total_reaction_time += reaction_time
             
             # Level up every 5 successful matches
-            if len(self.reaction_times) % 5 == 0:
+            if self.matches % 5 == 0:
                 self.level += 1
                 
             self.generate_new_prompt()
@@ -78,6 +104,11 @@ class WebMoodBlasterGame:
         """No timeout - game continues until correct emotion is detected."""
         return False
         
+    def reset(self):
+        """Return to the menu."""
+        self.state = "menu"
+        self.game_running = False
+        
     def get_game_state(self):
         """Get current game state for web interface."""
         return {
@@ -88,12 +119,162 @@ class WebMoodBlasterGame:
             'target_emotion': self.current_target_emotion,
             'time_left': 'No limit',
             'streak': self.accuracy_streak,
-            'avg_reaction_time': round(sum(self.reaction_times) / len(self.reaction_times), 2) if self.reaction_times else 0
+            'avg_reaction_time': round(self.total_reaction_time / self.matches, 2) if self.matches else 0
         }
 
-# Global game instance and emotion detector
-game = WebMoodBlasterGame()
-emotion_detector = EmotionDetector()
+def apply_detection(game, emotion, confidence, margin=0.0):
+    """Score a detection against the session's target emotion (server-side submit).
+
+    A detection counts when it is a clear match (see detection_result.is_clear_match).
+
+    Returns True/False for a played round, or None if no round was played.
+    """
+    if not emotion or not confidence:
+        return None
+    if not is_clear_match(confidence, margin):
+        return None
+    with game.lock:
+        if game.state != "playing":
+            return None
+        return game.check_emotion_match(emotion)
+
+def state_delta(previous, current):
+    """Return the game state fields that changed since `previous`."""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+# Detector pool sizing (one MediaPipe graph per concurrently processed frame)
+DETECTOR_POOL_SIZE = int(os.environ.get('MOODBLASTER_DETECTOR_POOL_SIZE', os.cpu_count() or 1))
+DETECTOR_MAX_WAITING = int(os.environ.get('MOODBLASTER_DETECTOR_MAX_WAITING', DETECTOR_POOL_SIZE * 2))
+DETECTOR_ACQUIRE_TIMEOUT = float(os.environ.get('MOODBLASTER_DETECTOR_ACQUIRE_TIMEOUT', 2.0))
+# Detection tier preset (see detection_config.DETECTION_TIERS)
+DETECTION_TIER = os.environ.get('MOODBLASTER_DETECTION_TIER', 'standard')
+# Emotion rule file (see rule_classifier); unset uses the built-in happy/angry/neutral rules
+EMOTION_RULES = os.environ.get('MOODBLASTER_EMOTION_RULES')
+# Trained emotion model (see learned_classifier); replaces the rules when set
+EMOTION_MODEL = os.environ.get('MOODBLASTER_EMOTION_MODEL')
+# Where detectors run: 'thread' (in this process) or 'process' (one worker process per detector)
+INFERENCE_BACKEND = os.environ.get('MOODBLASTER_INFERENCE_BACKEND', 'thread')
+# Micro-batching of frames from different players (max batch size 1 disables it)
+BATCH_MAX_SIZE = int(os.environ.get('MOODBLASTER_BATCH_MAX_SIZE', 1))
+BATCH_MAX_WAIT_MS = float(os.environ.get('MOODBLASTER_BATCH_MAX_WAIT_MS', 8))
+
+# Client capture pacing bounds (advised interval between frames)
+MIN_FRAME_INTERVAL_MS = int(os.environ.get('MOODBLASTER_MIN_FRAME_INTERVAL_MS', 200))
+MAX_FRAME_INTERVAL_MS = int(os.environ.get('MOODBLASTER_MAX_FRAME_INTERVAL_MS', 2000))
+
+# Reuse of results for unchanged frames (threshold 0 disables reuse) and score smoothing
+CACHE_THRESHOLD = float(os.environ.get('MOODBLASTER_CACHE_THRESHOLD', 5.0))
+CACHE_MAX_AGE_MS = float(os.environ.get('MOODBLASTER_CACHE_MAX_AGE_MS', 500))
+CACHE_MAX_REUSE = int(os.environ.get('MOODBLASTER_CACHE_MAX_REUSE', 5))
+EMOTION_SMOOTHING = float(os.environ.get('MOODBLASTER_EMOTION_SMOOTHING', 0.6))
+
+# Uploaded frames are decoded straight to RGB, the channel order MediaPipe needs
+FRAME_COLOR = 'rgb'
+# Longest frame side the detector sees; larger uploads are scaled down while decoding (0 = no limit)
+INFERENCE_MAX_SIDE = int(os.environ.get('MOODBLASTER_INFERENCE_MAX_SIDE', 640))
+
+# Session limits
+SESSION_COOKIE = 'mb_session'
+MAX_SESSIONS = int(os.environ.get('MOODBLASTER_MAX_SESSIONS', 500))
+SESSION_IDLE_TIMEOUT = float(os.environ.get('MOODBLASTER_SESSION_IDLE_TIMEOUT', 900))
+
+# One classifier shared by every detector (and pickled to worker processes)
+if EMOTION_MODEL:
+    emotion_classifier = LearnedClassifier.load(EMOTION_MODEL)
+else:
+    emotion_classifier = RuleClassifier.load(EMOTION_RULES) if EMOTION_RULES else RuleClassifier()
+# Prompts cover every emotion the classifier can report
+WebMoodBlasterGame.emotions = emotion_classifier.emotions
+
+def create_detector():
+    """Build one pool detector for the configured backend, detection tier and emotion classifier."""
+    # Batches mix players, so batching detectors must not track faces between frames
+    overrides = {'static_image_mode': BATCH_MAX_SIZE > 1}
+    if INFERENCE_BACKEND == 'process':
+        return ProcessDetector(DETECTION_TIER, overrides, emotion_classifier)
+    return EmotionDetector(use_camera=False, config=DetectionConfig.preset(DETECTION_TIER, **overrides),
+                           classifier=emotion_classifier)
+
+# Per-player game sessions and the shared emotion detector pool
+sessions = SessionRegistry(WebMoodBlasterGame, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT)
+detector_pool = DetectorPool(
+    size=DETECTOR_POOL_SIZE,
+    max_waiting=DETECTOR_MAX_WAITING,
+    acquire_timeout=DETECTOR_ACQUIRE_TIMEOUT,
+    factory=create_detector
+)
+batcher = MicroBatcher(detector_pool, BATCH_MAX_SIZE, BATCH_MAX_WAIT_MS / 1000, FRAME_COLOR) if BATCH_MAX_SIZE > 1 else None
+if in_worker_process():
+    # Imported again inside a process backend worker (as __mp_main__): workers need no detectors of their own
+    _first_detector = None
+else:
+    # Build one detector up front to find out whether MediaPipe is usable here
+    _first_detector = detector_pool.prewarm(1)
+mediapipe_available = bool(_first_detector and _first_detector.face_mesh)
+frame_decoder = FrameDecoder(policy=ResolutionPolicy(INFERENCE_MAX_SIDE) if INFERENCE_MAX_SIDE > 0 else None)
+temporal_cache = TemporalCache(
+    threshold=CACHE_THRESHOLD,
+    max_age=CACHE_MAX_AGE_MS / 1000,
+    max_reuse=CACHE_MAX_REUSE,
+    smoothing=EMOTION_SMOOTHING,
+    min_confidence=emotion_classifier.min_confidence
+)
+pacing = PacingController(
+    capacity=DETECTOR_POOL_SIZE,
+    min_interval_ms=MIN_FRAME_INTERVAL_MS,
+    max_interval_ms=MAX_FRAME_INTERVAL_MS,
+    max_frame_side=INFERENCE_MAX_SIDE or None
+)
+
+# State reported to clients that have not started a game yet
+MENU_STATE = WebMoodBlasterGame().get_game_state()
+
+def session_token():
+    """Return the session token sent by the client (cookie or X-Session-Token header)."""
+    return request.cookies.get(SESSION_COOKIE) or request.headers.get('X-Session-Token')
+
+def current_game(create=False):
+    """Resolve the caller's game session, optionally creating one.
+
+    Raises:
+        SessionLimitReached: If a session must be created but the server is full.
+    """
+    token = session_token()
+    if not create:
+        return sessions.get(token)
+    token, session, created = sessions.get_or_create(token)
+    if created:
+        g.new_session_token = token
+    return session
+
+@app.before_request
+def start_request_timing():
+    """Collect the stage timings of this request for its Server-Timing header."""
+    metrics.begin_request()
+
+@app.after_request
+def attach_server_timing(response):
+    """Report the request's stage timings (ms) in the Server-Timing header."""
+    timings = metrics.end_request(request.endpoint)
+    if timings is not None:
+        response.headers['Server-Timing'] = timings.header()
+    return response
+
+@app.after_request
+def attach_session_cookie(response):
+    """Hand newly created session tokens back to the browser."""
+    token = g.pop('new_session_token', None)
+    if token:
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, samesite='Lax')
+        response.headers['X-Session-Token'] = token
+    return response
+
+@app.errorhandler(SessionLimitReached)
+def handle_session_limit(error):
+    """Tell clients to retry later when every session slot is taken."""
+    response = jsonify({'error': 'Server full', 'success': False})
+    response.headers['Retry-After'] = '30'
+    return response, 503
 
 @app.route('/')
 def index():
@@ -103,118 +284,312 @@ def index():
 @app.route('/api/game_state')
 def get_game_state():
     """Get current game state."""
-    game.check_timeout()  # Check for timeouts
-    return jsonify(game.get_game_state())
+    game = current_game()
+    if game is None:
+        return jsonify(MENU_STATE)
+    with game.lock:
+        game.check_timeout()  # Check for timeouts
+        return jsonify(game.get_game_state())
 
 @app.route('/api/start_game', methods=['POST'])
 def start_game():
     """Start a new game."""
-    game.start_game()
+    game = current_game(create=True)
+    with game.lock:
+        game.start_game()
     return jsonify({'success': True})
 
 @app.route('/api/submit_emotion', methods=['POST'])
 def submit_emotion():
     """Submit an emotion guess."""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     detected_emotion = data.get('emotion')
+    game = current_game()
     
-    if game.state == "playing" and detected_emotion:
-        match = game.check_emotion_match(detected_emotion)
-        return jsonify({
-            'success': True,
-            'match': match,
-            'game_state': game.get_game_state()
-        })
+    if game is not None and detected_emotion:
+        with game.lock:
+            if game.state == "playing":
+                match = game.check_emotion_match(detected_emotion)
+                return jsonify({
+                    'success': True,
+                    'match': match,
+                    'game_state': game.get_game_state()
+                })
     
     return jsonify({'success': False})
 
 @app.route('/api/reset_game', methods=['POST'])
 def reset_game():
     """Reset game to menu."""
-    game.state = "menu"
-    game.game_running = False
+    game = current_game()
+    if game is not None:
+        with game.lock:
+            game.reset()
     return jsonify({'success': True})
 
-@app.route('/api/analyze_frame', methods=['POST'])
-def analyze_frame():
-    """Analyze a camera frame for emotion detection."""
+@app.route('/api/detector_stats')
+def get_detector_stats():
+    """Get detector pool occupancy and session counts."""
+    stats = detector_pool.stats()
+    stats['backend'] = INFERENCE_BACKEND
+    stats['sessions'] = sessions.stats()
+    stats['pacing'] = pacing.stats()
+    stats['temporal_cache'] = temporal_cache.stats()
+    if batcher is not None:
+        stats['batching'] = batcher.stats()
+    stats['stages'] = metrics.stats()
+    return jsonify(stats)
+
+@app.route('/metrics')
+def get_metrics():
+    """Stage timing histograms and pool gauges in the Prometheus text format."""
+    pool = detector_pool.stats()
+    gauges = {
+        'detectors_in_use': (pool['in_use'], 'Detectors currently analyzing a frame'),
+        'detectors_waiting': (pool['waiting'], 'Requests queued for a detector'),
+        'sessions_active': (sessions.stats()['active'], 'Game sessions currently held'),
+    }
+    return Response(metrics.render_prometheus(gauges=gauges), mimetype='text/plain; version=0.0.4')
+
+def stream_key():
+    """Identify the camera stream a request belongs to (frame pacing, cache and detector affinity).
+
+    Clients send a per-stream X-Stream-Id; the session token is the
+    fallback. Returns None for requests with neither: the remote address may
+    be shared by many players behind one NAT or proxy.
+    """
+    return request.headers.get('X-Stream-Id') or session_token()
+
+def response_format():
+    """Return the requested analyze_frame response format ('full' or 'compact')."""
+    return request.args.get('format') or request.headers.get('X-Response-Format') or 'full'
+
+def frame_seq():
+    """Return the client's frame sequence number (X-Frame-Seq header or ?seq=), if any."""
+    value = request.headers.get('X-Frame-Seq') or request.args.get('seq')
     try:
-        data = request.get_json()
-        image_data = data.get('image')
-        
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+def superseded_response():
+    """Payload for a frame dropped because a newer one from the same stream arrived."""
+    payload = {'error': 'Superseded by a newer frame', 'superseded': True, 'success': False}
+    payload.update(pacing.advice())
+    return payload, 200, {}
+
+def capture_shape(value, source_shape):
+    """Return the (height, width) a client says it captured at ("WxH"), if it fits the frame.
+
+    Clients that scale frames down before uploading report their camera size,
+    so pixel-based features are measured at the same scale as the camera's.
+    Sizes whose aspect ratio does not match the uploaded frame are ignored.
+    """
+    try:
+        width, height = (int(v) for v in str(value).lower().split('x'))
+    except (TypeError, ValueError):
+        return source_shape
+    frame_height, frame_width = source_shape
+    if width <= 0 or height <= 0 or abs(width / height - frame_width / frame_height) > 0.05 * width / height:
+        return source_shape
+    return height, width
+
+def read_request_frame():
+    """Decode the uploaded frame from a binary, multipart or legacy JSON request.
+
+    Returns a (frame, source_shape, error_message) tuple. Frames are in
+    FRAME_COLOR order and at most INFERENCE_MAX_SIDE large; source_shape is
+    the (height, width) they were captured at.
+    """
+    if request.mimetype in BINARY_IMAGE_TYPES:
+        # Raw encoded image body - decoded straight from the reusable upload buffer
+        data = frame_decoder.read_stream(request.stream, request.content_length)
+    elif request.mimetype == 'multipart/form-data':
+        upload = request.files.get('frame') or request.files.get('image')
+        if upload is None:
+            return None, None, 'No image data provided'
+        data = frame_decoder.read_stream(upload.stream)
+    else:
+        # Legacy clients send a base64 data URL inside JSON
+        body = request.get_json(silent=True) or {}
+        image_data = body.get('image')
         if not image_data:
-            return jsonify({'error': 'No image data provided'})
-        
-        # Remove data URL prefix
-        if ',' in image_data:
-            image_data = image_data.split(',')[1]
+            return None, None, 'No image data provided'
+        data = data_url_bytes(image_data)
+
+    frame, source_shape = frame_decoder.decode_frame(data, FRAME_COLOR)
+    if frame is None:
+        return None, None, 'Could not decode image'
+    return frame, capture_shape(request.headers.get('X-Capture-Size'), source_shape), None
+
+def analyze_decoded_frame(frame, stream, response_format='full', landmark_param=None, seq=None, source_shape=None):
+    """Run emotion detection on a decoded frame (FRAME_COLOR order) and build the analyze_frame payload.
+
+    Shared by the HTTP route and the WebSocket stream. Every successful
+    payload carries the pacing advice (queue_depth, latency_ms, interval_ms,
+    jpeg_quality). Frames older than the newest `seq` seen for `stream` are
+    dropped rather than analyzed, and frames that look like the stream's
+    previous one reuse its (smoothed) result (`cached: true`). Frames without
+    a stream (None) are analyzed on their own: no superseding, reuse or
+    smoothing. `source_shape` is the (height, width) the frame was captured
+    at, if it was scaled down.
+
+    Returns:
+        (payload, status, headers) tuple.
+    """
+    # Detect emotion using our emotion detector (now supports multiple faces)
+    if not mediapipe_available:
+        # Fallback: simple mock detection based on current time for demo
+        emotions = WebMoodBlasterGame.emotions
+        mock_emotion = emotions[int(time.time()) % len(emotions)]
         
-        # Decode base64 image
-        image_bytes = base64.b64decode(image_data)
-        image = Image.open(BytesIO(image_bytes))
+        return {
+            'emotion': mock_emotion,
+            'confidence': 0.5,
+            'success': True,
+            'note': 'MediaPipe not available, using demo mode',
+            **pacing.advice()
+        }, 200, {}
+    
+    # Register the frame's seq before the cache lookup so cached frames
+    # also supersede older frames still waiting for a detector
+    if not pacing.register(stream, seq):
+        return superseded_response()
+    cached = None
+    if stream is not None:
+        with metrics.stage('cache_lookup'):
+            signature = temporal_cache.signature(frame, FRAME_COLOR)
+            cached = temporal_cache.lookup(stream, signature)
+    if cached is not None:
+        emotion, confidence, all_landmarks = cached
+    else:
+        with pacing.track(stream):
+            try:
+                if batcher is not None:
+                    # Analyzed together with frames from other players
+                    started = time.perf_counter()
+                    emotion, confidence, all_landmarks = batcher.submit(frame, source_shape)
+                    pacing.record_latency(time.perf_counter() - started)
+                    metrics.record('batch', time.perf_counter() - started)
+                else:
+                    queued = time.perf_counter()
+                    with detector_pool.detector(stream) as detector:
+                        started = time.perf_counter()
+                        metrics.record('queue', started - queued)
+                        # A newer frame from this stream may have come in while we waited for a detector
+                        if pacing.is_superseded(stream, seq):
+                            return superseded_response()
+                        emotion, confidence, all_landmarks = detector.detect_emotion(frame, FRAME_COLOR, source_shape)
+                        pacing.record_latency(time.perf_counter() - started)
+                        metrics.record('detect', time.perf_counter() - started)
+            except PoolExhausted:
+                payload = {'error': 'Server busy', 'success': False}
+                payload.update(pacing.advice())
+                return payload, 503, {'Retry-After': '1'}
+        if stream is not None:
+            emotion, confidence, all_landmarks = temporal_cache.store(
+                stream, signature, emotion, confidence, all_landmarks
+            )
+    
+    with metrics.stage('build_response'):
+        return build_analysis_payload(
+            emotion, confidence, all_landmarks, cached is not None, response_format, landmark_param
+        )
+
+def build_analysis_payload(emotion, confidence, all_landmarks, cached, response_format, landmark_param):
+    """Build the analyze_frame payload for a detection result.
+
+    Returns:
+        (payload, status, headers) tuple.
+    """
+    faces = all_landmarks or FrameResult.empty(emotion_classifier.emotions)
+    
+    # Emotion probabilities of the face the emotion comes from, and how far
+    # the reported emotion leads the others there
+    emotion_percentages = dict.fromkeys(faces.labels, 0.0)
+    margin = 0.0
+    primary = faces.primary
+    if primary is not None:
+        probabilities = faces.probabilities[primary].tolist()
+        emotion_percentages = {name: round(p * 100, 1) for name, p in zip(faces.labels, probabilities)}
+        if emotion:
+            # The smoothed emotion can lag behind the face's own; it then has no lead
+            margin = round(max(faces.margin(primary, emotion), 0.0), 3)
+    # Whether the emotion would count as a match, so clients need not copy the rule
+    clear = bool(emotion) and is_clear_match(confidence, margin)
+    
+    if response_format == 'compact':
+        # Bounding boxes (plus an optional packed landmark subset) instead of full landmark lists
+        try:
+            # Without faces there is no mesh to check the indices against; the payload has no landmarks anyway
+            indices = parse_landmark_indices(landmark_param, faces.num_landmarks if len(faces) else None)
+        except ValueError as e:
+            return {'error': str(e), 'success': False}, 400, {}
+        payload = compact_faces(faces.points, faces.emotions, faces.confidences, indices, bboxes=faces.bboxes)
+        payload.update({
+            'emotion': emotion,
+            'confidence': confidence if confidence else 0.0,
+            'percentages': emotion_percentages,
+            'margin': margin,
+            'clear': clear,
+            'face_count': len(faces),
+            'cached': cached,
+            'success': True
+        })
+        payload.update(pacing.advice())
+        return payload, 200, {}
+    
+    # Get face landmarks for drawing face boxes (supports multiple faces)
+    all_face_landmarks = []
+    if all_landmarks:
+        # Process all detected faces (coordinates of every face converted in one call)
+        for face_xy in all_landmarks.xy_lists():
+            face_data = [{'x': x, 'y': y} for x, y in face_xy]
+            all_face_landmarks.append(face_data)
+    
+    return {
+        'emotion': emotion,
+        'confidence': confidence if confidence else 0.0,
+        'percentages': emotion_percentages,
+        'margin': margin,
+        'clear': clear,
+        'face_landmarks': all_face_landmarks[0] if all_face_landmarks else None,
+        'all_faces': all_face_landmarks,
+        'face_count': len(all_face_landmarks),
+        'cached': cached,
+        'success': True,
+        **pacing.advice()
+    }, 200, {}
+
+@app.route('/api/analyze_frame', methods=['POST'])
+def analyze_frame():
+    """Analyze a camera frame for emotion detection.
+
+    Accepts a raw JPEG/WebP body, a multipart upload (field `frame`), or the
+    legacy JSON body `{"image": "<data URL>"}`.
+
+    With `?format=compact` the response carries one bounding box per face
+    instead of every landmark; `&landmarks=61,291,...` additionally returns
+    those landmarks packed as a base64 float16 array.
+
+    An increasing `X-Frame-Seq` header lets the server drop frames that a
+    newer one from the same client has superseded.
+    """
+    try:
+        try:
+            frame, source_shape, error = read_request_frame()
+        except FrameTooLarge:
+            return jsonify({'error': 'Frame too large', 'success': False}), 413
         
-        # Convert PIL image to OpenCV format
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        if error:
+            return jsonify({'error': error})
         
-        # Detect emotion using our emotion detector (now supports multiple faces)
-        if emotion_detector.face_mesh:
-            emotion, confidence, all_landmarks = emotion_detector.detect_emotion(frame)
-            
-            # Calculate emotion percentages for all emotions
-            emotion_percentages = {
-                'happy': 0.0,
-                'neutral': 0.0,
-                'angry': 0.0
-            }
-            
-            if emotion and confidence:
-                # Simulate more realistic percentages based on detected emotion
-                if emotion == 'happy':
-                    emotion_percentages['happy'] = confidence * 100
-                    emotion_percentages['neutral'] = max(0, (0.5 - confidence/2) * 100)
-                    emotion_percentages['angry'] = max(0, (0.2 - confidence/5) * 100)
-                elif emotion == 'neutral':
-                    emotion_percentages['neutral'] = confidence * 100
-                    emotion_percentages['happy'] = max(0, (0.4 - confidence/3) * 100)
-                    emotion_percentages['angry'] = max(0, (0.3 - confidence/4) * 100)
-                elif emotion == 'angry':
-                    emotion_percentages['angry'] = confidence * 100
-                    emotion_percentages['neutral'] = max(0, (0.3 - confidence/4) * 100)
-                    emotion_percentages['happy'] = max(0, (0.1 - confidence/10) * 100)
-            
-            # Get face landmarks for drawing face boxes (supports multiple faces)
-            all_face_landmarks = []
-            if all_landmarks:
-                # Process all detected faces
-                for face_landmarks in all_landmarks:
-                    face_data = []
-                    for landmark in face_landmarks:
-                        face_data.append({
-                            'x': landmark.x,
-                            'y': landmark.y
-                        })
-                    all_face_landmarks.append(face_data)
-            
-            return jsonify({
-                'emotion': emotion,
-                'confidence': confidence if confidence else 0.0,
-                'percentages': emotion_percentages,
-                'face_landmarks': all_face_landmarks[0] if all_face_landmarks else None,
-                'all_faces': all_face_landmarks,
-                'face_count': len(all_face_landmarks),
-                'success': True
-            })
-        else:
-            # Fallback: simple mock detection based on current time for demo
-            emotions = ['happy', 'neutral', 'angry']
-            mock_emotion = emotions[int(time.time()) % len(emotions)]
-            
-            return jsonify({
-                'emotion': mock_emotion,
-                'confidence': 0.5,
-                'success': True,
-                'note': 'MediaPipe not available, using demo mode'
-            })
+        payload, status, headers = analyze_decoded_frame(
+            frame, stream_key(), response_format(), request.args.get('landmarks'), frame_seq(), source_shape
+        )
+        with metrics.stage('serialize'):
+            response = jsonify(payload)
+        return response, status, headers
             
     except Exception as e:
         print(f"Error analyzing frame: {e}")
@@ -232,4 +607,4 @@ if __name__ == '__main__':
         os.makedirs('templates')
     
     # Run the Flask app
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
\ No newline at end of file